@@ -0,0 +1,177 @@
+"""Lastvergleich: Gunicorn mit Sync-Workern (WSGI) vs. Uvicorn-Workern (ASGI).
+
+Startet nacheinander beide Server-Varianten mit gleicher Worker-Anzahl gegen
+dieselbe Datenbank und erzeugt gemischte Last auf den öffentlichen Seiten:
+
+    - Kursliste (GET /)
+    - Kalender-Export (GET /ical/<id>/)
+    - Bestätigungsseite (GET /confirmation/<token>/)
+    - Anmeldeformular (GET /register/<id>/)
+    - Anmeldung absenden (POST /register/<id>/, inkl. Bestätigungsmail)
+
+Ausgegeben werden Durchsatz (Requests/s), p50/p99-Latenz und Fehler je
+Modus als JSON, damit sich Läufe vergleichen lassen.
+
+Voraussetzung: Datenbank mit mindestens einem offenen Kurs und einer
+Anmeldung sowie eine .env mit DEBUG=False. Mit ``--mail-delay`` wird ein
+langsamer Mailserver simuliert (wie ein träger Graph-API-Aufruf), ohne echte
+Mails zu verschicken.
+
+Verwendung:
+    python benchmarks/asgi_vs_wsgi.py --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+MODES = {
+    'wsgi': ['gunicorn', 'kursanmeldung.wsgi:application'],
+    'asgi': ['gunicorn', 'kursanmeldung.asgi:application',
+             '--worker-class', 'uvicorn.workers.UvicornWorker'],
+}
+
+# Gewichtung der Anfragearten (Summe 100)
+MIX = [
+    ('course_list', 45),
+    ('ical', 20),
+    ('confirmation', 15),
+    ('register_get', 15),
+    ('register_post', 5),
+]
+
+
+def _fixtures():
+    """Liest Kurs-ID und Storno-Token für die Lastszenarien aus der Datenbank."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kursanmeldung.settings')
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    django.setup()
+    from courses.models import Course, Registration
+
+    course = Course.objects.filter(is_closed=False).order_by('-end_date').first()
+    reg = Registration.objects.order_by('-created').first()
+    if course is None or reg is None:
+        sys.exit('Keine Testdaten: mindestens ein offener Kurs und eine Anmeldung nötig.')
+    return course.pk, str(reg.cancel_token)
+
+
+async def _request(client, kind, course_id, token, seq):
+    if kind == 'course_list':
+        return await client.get('/')
+    if kind == 'ical':
+        return await client.get(f'/ical/{course_id}/')
+    if kind == 'confirmation':
+        return await client.get(f'/confirmation/{token}/')
+    if kind == 'register_get':
+        return await client.get(f'/register/{course_id}/')
+    # POST inkl. CSRF-Token aus dem Formular
+    page = await client.get(f'/register/{course_id}/')
+    match = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page.text)
+    return await client.post(f'/register/{course_id}/', data={
+        'csrfmiddlewaretoken': match.group(1) if match else '',
+        'first_name': 'Last', 'last_name': f'Test{seq}',
+        'email': f'last{seq}-{time.time_ns()}@example.com',
+        'phone': '0123456', 'iban': 'DE89370400440532013000',
+        'account_holder': 'Last Test', 'accept_terms': 'on', 'accept_sepa': 'on',
+    })
+
+
+async def _run_load(base_url, total, concurrency, course_id, token):
+    kinds = [k for k, weight in MIX for _ in range(weight)]
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for seq in range(total):
+        queue.put_nowait(seq)
+
+    async def worker():
+        nonlocal errors
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            while True:
+                try:
+                    seq = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                kind = random.choice(kinds)
+                started = time.perf_counter()
+                try:
+                    resp = await _request(client, kind, course_id, token, seq)
+                    if resp.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': total,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(total / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+def _wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(base_url + '/', timeout=2)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.3)
+    raise RuntimeError(f'Server unter {base_url} nicht erreichbar.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--mail-delay', type=float, default=0.0,
+                        help='Simulierte Mail-Latenz in Sekunden (Mails werden verworfen)')
+    args = parser.parse_args()
+
+    course_id, token = _fixtures()
+    base_url = f'http://127.0.0.1:{args.port}'
+    env = dict(os.environ)
+    if args.mail_delay:
+        env['EMAIL_BACKEND'] = 'benchmarks.slow_email_backend.SlowEmailBackend'
+        env['BENCH_MAIL_DELAY'] = str(args.mail_delay)
+
+    results = {}
+    for mode in args.modes.split(','):
+        cmd = MODES[mode] + ['--workers', str(args.workers), '--bind', f'127.0.0.1:{args.port}']
+        proc = subprocess.Popen(cmd, cwd=BASE_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _wait_until_up(base_url)
+            results[mode] = asyncio.run(
+                _run_load(base_url, args.requests, args.concurrency, course_id, token)
+            )
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
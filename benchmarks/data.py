@@ -0,0 +1,85 @@
+"""Synthetische Testdaten für Benchmarks: Orte, Kurse (inkl. Einheiten) und Anmeldungen.
+
+Nur gegen eine Test-/Wegwerf-Datenbank verwenden – ``views_suite.py`` legt dafür
+eine eigene Test-Datenbank an.
+"""
+
+import random
+from datetime import date, time, timedelta
+
+DAYS = ['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa']
+STATUS_WEIGHTS = [('CONFIRMED', 80), ('WAITLIST', 12), ('CANCELLED', 8)]
+
+
+def generate(courses=40, registrations=1500, locations=6, archived=10, seed=1):
+    """Legt die Daten an und gibt ein dict mit den wichtigsten Objekten zurück.
+
+    ``archived`` Kurse liegen in der Vergangenheit (für die Archiv-Ansicht),
+    die übrigen beginnen in 2–6 Wochen. Einheiten erzeugt ``Course.save()``
+    wie im Admin automatisch.
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import Group
+
+    from courses.models import Course, Location, Registration
+
+    rng = random.Random(seed)
+    today = date.today()
+
+    admin = get_user_model().objects.create_superuser('bench-admin', 'bench@example.com', 'bench')
+    instructor = get_user_model().objects.create_user(
+        'bench-kursleitung', 'kl@example.com', 'bench', is_staff=True,
+    )
+    instructor.groups.add(Group.objects.get_or_create(name='Kursleitung')[0])
+
+    places = Location.objects.bulk_create(
+        [Location(name=f'Halle {i}') for i in range(locations)]
+    )
+
+    created_courses = []
+    for i in range(courses):
+        if i < archived:
+            start = today - timedelta(days=120 + i)
+        else:
+            start = today + timedelta(days=rng.randint(14, 42))
+        course = Course.objects.create(
+            name=f'Kurs {i:03d}',
+            description='Synthetischer Benchmark-Kurs',
+            start_date=start,
+            end_date=start + timedelta(days=rng.choice([42, 70, 84])),
+            start_time=time(rng.randint(8, 19), 0),
+            end_time=time(20, 30),
+            days=rng.sample(DAYS, rng.randint(1, 2)),
+            max_participants=rng.choice([8, 12, 15, 20]),
+            price_member=rng.choice([25, 30, 45]),
+            price_non_member=rng.choice([40, 55, 60]),
+            allow_half=rng.random() < 0.3,
+            instructor_user=instructor if i % 5 == 0 else None,
+        )
+        course.locations.set(rng.sample(places, rng.randint(1, 2)))
+        created_courses.append(course)
+
+    statuses = [s for s, weight in STATUS_WEIGHTS for _ in range(weight)]
+    Registration.objects.bulk_create([
+        Registration(
+            course=rng.choice(created_courses),
+            first_name=f'Vorname{n}',
+            last_name=f'Nachname{n}',
+            email=f'teilnehmer{n}@example.com',
+            phone='0123 456789',
+            iban='DE89370400440532013000',
+            account_holder=f'Vorname{n} Nachname{n}',
+            terms_accepted=True,
+            is_member=rng.random() < 0.6,
+            half_course=rng.random() < 0.1,
+            status=rng.choice(statuses),
+        )
+        for n in range(registrations)
+    ], batch_size=500)
+
+    return {
+        'admin': admin,
+        'instructor': instructor,
+        'courses': created_courses,
+        'open_course': created_courses[-1],
+    }
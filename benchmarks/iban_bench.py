@@ -0,0 +1,89 @@
+"""Mikrobenchmarks für IBAN-Prüfung, BIC-Suche und RegistrationForm-Aufbau.
+
+Vergleicht die frühere Inline-Prüfung aus ``RegistrationForm._validate_iban``
+(Regex und Längentabelle pro Aufruf, Prüfsumme über eine große Zahl) mit
+``courses/iban.py`` und misst die BIC-Suche in einer mmap-Tabelle mit
+``--entries`` Bankleitzahlen. Ausgabe: Mikrosekunden pro Aufruf als JSON.
+
+Verwendung:
+    python benchmarks/iban_bench.py --number 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+IBANS = ['DE89370400440532013000', 'AT611904300234573201', 'MT84MALT011000012345MTLCAST001S',
+         'DE89370400440532013001', 'FR1420041010050500013M02606']
+
+
+def legacy_validate(iban):
+    """Stand vor courses/iban.py (nur zum Vergleich)."""
+    import re
+    if not re.fullmatch(r'[A-Z]{2}[0-9]{2}[A-Z0-9]{11,30}', iban):
+        return 'format'
+    country_lengths = {
+        'DE': 22, 'AT': 20, 'CH': 21, 'NL': 18, 'BE': 16,
+        'FR': 27, 'ES': 24, 'IT': 27, 'PL': 28, 'GB': 22,
+    }
+    expected_len = country_lengths.get(iban[:2])
+    if expected_len and len(iban) != expected_len:
+        return 'length'
+    rearranged = iban[4:] + iban[:4]
+    numeric = ''.join(str(int(c, 36)) for c in rearranged)
+    if int(numeric) % 97 != 1:
+        return 'checksum'
+    return None
+
+
+def _us(stmt, number):
+    return round(min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000)
+    parser.add_argument('--entries', type=int, default=16000, help='Größe der BIC-Tabelle')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kursanmeldung.settings')
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    django.setup()
+    from django.test import override_settings
+
+    from courses import iban
+    from courses.forms import RegistrationForm
+
+    rng = random.Random(1)
+    entries = {('DE', f'{rng.randrange(10 ** 7, 10 ** 8)}'): 'TESTDEFFXXX' for _ in range(args.entries)}
+    entries[('DE', '37040044')] = 'COBADEFFXXX'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        table = os.path.join(tmp, 'bic_table.bin')
+        iban.write_table(table, entries)
+        with override_settings(BIC_TABLE=table):
+            iban.lookup_bic(IBANS[0])  # mmap einblenden
+            results = {
+                'legacy_validate_us': _us(lambda: [legacy_validate(i) for i in IBANS], args.number),
+                'validate_us': _us(lambda: [iban.validation_error(i) for i in IBANS], args.number),
+                'legacy_mod97_us': _us(lambda: int(''.join(str(int(c, 36)) for c in IBANS[2][4:] + IBANS[2][:4])) % 97,
+                                       args.number),
+                'mod97_us': _us(lambda: iban.mod97(IBANS[2]), args.number),
+                'lookup_bic_us': _us(lambda: iban.lookup_bic(IBANS[0]), args.number),
+                'form_init_us': _us(RegistrationForm, args.number // 10),
+            }
+            iban._mapped.cache_clear()
+    results['bic_table_entries'] = len(entries)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Simulation eines Anmeldestarts gegen den Warteraum (courses/admission.py).
+
+Spielt einen Ansturm mit virtueller Uhr gegen die echte SQLite-Warteschlange
+(``QueueStore``) in einer temporären Datei ab – ohne Server und ohne Warten:
+
+    - ``--users`` Besucher kommen innerhalb von ``--spike`` Sekunden an
+    - Wartende laden den Warteraum alle ``--poll`` Sekunden neu; ein Teil
+      (``--abandon``) schließt den Tab vorher
+    - Zugelassene füllen das Formular aus (im Mittel ``--session`` Sekunden);
+      ``--submit`` davon schicken es ab und geben den Platz frei, der Rest
+      lässt das Formular offen liegen (Platz erst nach ``--ttl`` wieder frei)
+
+Ausgegeben werden als JSON: maximale Zahl gleichzeitig offener Formulare
+(darf ``--slots`` nie überschreiten), Wartezeiten (p50/p95/max), Abweichung der
+ersten Wartezeit-Schätzung, Dauer bis alle bedient sind und die echte
+Laufzeit eines Warteschlangen-Zugriffs (p50/p99).
+
+Verwendung:
+    python benchmarks/launch_spike.py --users 600 --slots 25 --spike 30
+"""
+
+import argparse
+import heapq
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+COURSE_ID = 1
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def simulate(store, users, spike, poll, session, submit, abandon, seed):
+    rng = random.Random(seed)
+    events = []  # (virtuelle Zeit, Reihenfolge, Art, Besucher)
+    seq = 0
+
+    def push(at, kind, user):
+        nonlocal seq
+        seq += 1
+        heapq.heappush(events, (at, seq, kind, user))
+
+    arrivals = {}
+    for user in range(users):
+        arrivals[user] = rng.uniform(0, spike)
+        push(arrivals[user], 'visit', user)
+
+    leave_at = {user: arrivals[user] + rng.uniform(0, 10 * poll)
+                for user in range(users) if rng.random() < abandon}
+    first_eta, waits, enter_times = {}, [], []
+    in_form, max_in_form, served, gave_up, now = set(), 0, 0, 0, 0.0
+
+    while events:
+        now, _, kind, user = heapq.heappop(events)
+        ticket = f'u{user}'
+        if kind == 'visit':
+            if now >= leave_at.get(user, float('inf')):
+                gave_up += 1
+                continue
+            started = time.perf_counter()
+            status = store.enter(COURSE_ID, ticket, now=now)
+            enter_times.append(time.perf_counter() - started)
+            if not status.admitted:
+                first_eta.setdefault(user, status.eta)
+                push(now + poll * rng.uniform(0.9, 1.1), 'visit', user)
+                continue
+            waits.append((user, now - arrivals[user]))
+            in_form.add(user)
+            max_in_form = max(max_in_form, len(in_form))
+            push(now + rng.lognormvariate(0, 0.5) * session, 'done', user)
+        else:
+            in_form.discard(user)
+            if rng.random() < submit:
+                store.release(COURSE_ID, ticket, now=now)
+                served += 1
+            # sonst: Formular bleibt offen, Platz verfällt nach TTL
+
+    wait_values = [wait for _, wait in waits]
+    eta_errors = [abs(first_eta[user] - wait) for user, wait in waits if user in first_eta]
+    return {
+        'users': users,
+        'admitted': len(waits),
+        'registered': served,
+        'gave_up_waiting': gave_up,
+        'max_open_forms': max_in_form,
+        'wait_p50_s': round(_percentile(wait_values, 0.5) or 0, 1),
+        'wait_p95_s': round(_percentile(wait_values, 0.95) or 0, 1),
+        'wait_max_s': round(max(wait_values, default=0), 1),
+        'eta_error_p50_s': round(_percentile(eta_errors, 0.5) or 0, 1),
+        'makespan_s': round(now, 1),
+        'store_calls': len(enter_times),
+        'store_p50_ms': round(_percentile(enter_times, 0.5) * 1000, 3),
+        'store_p99_ms': round(_percentile(enter_times, 0.99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=600)
+    parser.add_argument('--spike', type=float, default=30, help='Ankunftsfenster in Sekunden')
+    parser.add_argument('--slots', type=int, default=25)
+    parser.add_argument('--ttl', type=int, default=900)
+    parser.add_argument('--poll', type=float, default=5)
+    parser.add_argument('--session', type=float, default=120, help='mittlere Ausfüllzeit in Sekunden')
+    parser.add_argument('--estimate', type=float, default=180, help='Startwert der Sitzungsschätzung')
+    parser.add_argument('--submit', type=float, default=0.9)
+    parser.add_argument('--abandon', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BASE_DIR))
+    from courses.admission import QueueStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = QueueStore(
+            os.path.join(tmp, 'admission.sqlite3'), args.slots, args.ttl,
+            idle_timeout=max(3 * args.poll, 15), session_estimate=args.estimate,
+        )
+        result = simulate(store, args.users, args.spike, args.poll, args.session,
+                          args.submit, args.abandon, args.seed)
+    result['slots'] = args.slots
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
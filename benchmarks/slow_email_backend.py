@@ -0,0 +1,25 @@
+"""E-Mail-Backend für Lasttests: verwirft Mails nach einer künstlichen Pause.
+
+Simuliert einen langsamen Mailserver (z.B. Graph API unter Last). Die Pause
+wird über die Umgebungsvariable BENCH_MAIL_DELAY (Sekunden) gesetzt.
+"""
+
+import asyncio
+import os
+import time
+
+from django.core.mail.backends.base import BaseEmailBackend
+
+
+def _delay():
+    return float(os.environ.get('BENCH_MAIL_DELAY', '0.5'))
+
+
+class SlowEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        time.sleep(_delay())
+        return len(email_messages)
+
+    async def asend_messages(self, email_messages):
+        await asyncio.sleep(_delay())
+        return len(email_messages)
@@ -0,0 +1,156 @@
+"""Lastvergleich der SQLite-Profile (``default`` vs. ``production``) unter Konkurrenz.
+
+Startet je Profil mehrere Lese- und Schreibprozesse (wie Gunicorn-Worker) gegen
+eine frisch angelegte Datenbankdatei:
+
+    - Leser:    Kursliste-ähnliche Abfrage (Kurse + Anzahl bestätigter Anmeldungen)
+    - Schreiber: Anmeldung in einer Transaktion – erst Platz prüfen (SELECT),
+                dann INSERT, wie ``_save_registration``
+
+Im ``default``-Profil (Rollback-Journal, BEGIN DEFERRED) blockieren Schreiber
+die Leser, und das Upgrade von Lese- auf Schreibsperre scheitert sofort mit
+"database is locked", ohne dass ``timeout`` greift. Im ``production``-Profil
+(WAL, BEGIN IMMEDIATE) lesen Leser ungestört weiter und Schreiber warten auf
+die Sperre.
+
+Ausgegeben werden je Profil und Rolle: Operationen, Lock-Fehler, p50/p99-Latenz
+als JSON.
+
+Verwendung:
+    python benchmarks/sqlite_contention.py --readers 6 --writers 4 --seconds 10
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+SCHEMA = """
+CREATE TABLE course (id INTEGER PRIMARY KEY, name TEXT, max_participants INTEGER);
+CREATE TABLE registration (
+    id INTEGER PRIMARY KEY, course_id INTEGER REFERENCES course(id),
+    email TEXT, status TEXT, created REAL
+);
+CREATE INDEX registration_course ON registration (course_id, status);
+"""
+
+READ_SQL = """
+SELECT c.id, c.name, COUNT(r.id)
+FROM course c LEFT JOIN registration r ON r.course_id = c.id AND r.status = 'CONFIRMED'
+GROUP BY c.id
+"""
+
+
+def _create_database(path, courses=40, registrations=4000):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany('INSERT INTO course VALUES (?, ?, ?)',
+                     [(i, f'Kurs {i}', 10 ** 6) for i in range(1, courses + 1)])
+    conn.executemany(
+        'INSERT INTO registration (course_id, email, status, created) VALUES (?, ?, ?, ?)',
+        [(i % courses + 1, f'seed{i}@example.com', 'CONFIRMED', time.time())
+         for i in range(registrations)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _worker(args):
+    role, path, profile, timeout, seconds, seq = args
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    from django.conf import settings
+    from kursanmeldung.database import sqlite_database
+    settings.configure(DATABASES={'default': sqlite_database(path, profile, timeout)})
+    django.setup()
+    from django.db import OperationalError, connection, transaction
+
+    latencies, errors = [], 0
+    deadline = time.monotonic() + seconds
+    n = 0
+    while time.monotonic() < deadline:
+        n += 1
+        started = time.perf_counter()
+        try:
+            if role == 'reader':
+                with connection.cursor() as cursor:
+                    cursor.execute(READ_SQL)
+                    cursor.fetchall()
+            else:
+                course_id = n % 40 + 1
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT COUNT(*) FROM registration WHERE course_id = %s AND status = 'CONFIRMED'",
+                        [course_id],
+                    )
+                    cursor.fetchone()
+                    cursor.execute(
+                        'INSERT INTO registration (course_id, email, status, created) '
+                        "VALUES (%s, %s, 'CONFIRMED', %s)",
+                        [course_id, f'w{seq}-{n}@example.com', time.time()],
+                    )
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    return role, latencies, errors
+
+
+def _summary(latencies, errors, seconds):
+    latencies.sort()
+    if not latencies:
+        return {'ops': 0, 'lock_errors': errors}
+    return {
+        'ops': len(latencies),
+        'ops_per_s': round(len(latencies) / seconds, 1),
+        'lock_errors': errors,
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p99_ms': round(latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000, 2),
+    }
+
+
+def run_profile(profile, readers, writers, seconds, timeout):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'contention.sqlite3')
+        _create_database(path)
+        jobs = ([('reader', path, profile, timeout, seconds, i) for i in range(readers)]
+                + [('writer', path, profile, timeout, seconds, i) for i in range(writers)])
+        with multiprocessing.get_context('spawn').Pool(len(jobs)) as pool:
+            results = pool.map(_worker, jobs)
+
+    summary = {}
+    for role in ('reader', 'writer'):
+        latencies = [lat for r, lats, _ in results if r == role for lat in lats]
+        errors = sum(err for r, _, err in results if r == role)
+        summary[role] = _summary(latencies, errors, seconds)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=6)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=5,
+                        help='SQLite busy timeout in Sekunden (Produktion: 20)')
+    parser.add_argument('--profiles', default='default,production')
+    args = parser.parse_args()
+
+    results = {
+        profile: run_profile(profile, args.readers, args.writers, args.seconds, args.timeout)
+        for profile in args.profiles.split(',')
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""Benchmark-Suite: Query-Anzahl, Laufzeit und Speicher-Peak aller Views und Admin-Aktionen.
+
+Legt eine eigene Test-Datenbank an (die echte db.sqlite3 bleibt unberührt),
+befüllt sie mit synthetischen Daten (``benchmarks/data.py``) und misst jedes
+Szenario ``--repeat`` Mal über den Django-Test-Client:
+
+    - öffentliche Seiten: Kursliste, Anmeldung (GET/POST), iCal, Storno (GET/POST)
+    - Admin: Changelists, Kursarchiv, Anwesenheitsliste (Direkt-Download)
+    - Admin-Aktionen: alle Exporte, Einheiten generieren, Kurs kopieren,
+      Warteliste bestätigen
+
+Pro Szenario: Anzahl SQL-Queries, Median-Laufzeit (ms) und Speicher-Peak
+(KiB, tracemalloc). Ergebnis als JSON auf stdout oder in ``--output``.
+
+Mit ``--baseline`` wird gegen gespeicherte Werte verglichen; Exit-Code 1 bei
+Regression (mehr Queries, oder Laufzeit/Speicher über der Toleranz). Neue
+Baseline schreiben: ``--save-baseline``.
+
+Verwendung:
+    python benchmarks/views_suite.py --baseline benchmarks/baseline.json
+    python benchmarks/views_suite.py --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kursanmeldung.settings')
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    django.setup()
+
+
+def _client_ip(n):
+    """Eigene IP je Wiederholung, damit das Rate-Limit (courses/ratelimit.py) nicht greift."""
+    return f'10.0.{n // 250}.{n % 250 + 1}'
+
+
+def _action(client, url, action, ids):
+    return client.post(url, {
+        'action': action, '_selected_action': [str(i) for i in ids], 'index': '0', 'select_across': '0',
+    })
+
+
+def build_scenarios(data):
+    """Gibt eine Liste (Name, Funktion(client, n)) zurück; n = laufende Wiederholung."""
+    from courses.models import Registration
+
+    course = data['open_course']
+    course_ids = [c.pk for c in data['courses'][-5:]]
+    reg_ids = list(Registration.objects.filter(course__in=course_ids).values_list('pk', flat=True))
+    waitlist_ids = list(
+        Registration.objects.filter(status='WAITLIST').values_list('pk', flat=True)[:20]
+    )
+    cancel_tokens = list(
+        Registration.objects.filter(course=course, status='CONFIRMED').values_list('cancel_token', flat=True)
+    )
+    course_changelist = '/admin/courses/course/'
+    reg_changelist = '/admin/courses/registration/'
+
+    def register_post(client, n):
+        return client.post(f'/register/{course.pk}/', {
+            'first_name': 'Bench', 'last_name': f'Mark{n}', 'email': f'bench{n}-{time.time_ns()}@example.com',
+            'phone': '0123', 'iban': 'DE89370400440532013000', 'account_holder': 'Bench Mark',
+            'accept_terms': 'on', 'accept_sepa': 'on',
+        }, REMOTE_ADDR=_client_ip(n))
+
+    def cancel_post(client, n):
+        # Jede Wiederholung storniert eine andere Anmeldung
+        return client.post(f'/cancel/{cancel_tokens[n % len(cancel_tokens)]}/', REMOTE_ADDR=_client_ip(n))
+
+    def confirm_and_notify(client, n):
+        # Auswahl vor jeder Wiederholung wieder auf die Warteliste setzen
+        Registration.objects.filter(pk__in=waitlist_ids).update(status='WAITLIST')
+        return _action(client, reg_changelist, 'confirm_and_notify', waitlist_ids)
+
+    return [
+        ('course_list', lambda c, n: c.get('/')),
+        ('register_get', lambda c, n: c.get(f'/register/{course.pk}/')),
+        ('register_post', register_post),
+        ('course_ical', lambda c, n: c.get(f'/ical/{course.pk}/')),
+        ('course_cancel_get', lambda c, n: c.get(f'/cancel/{cancel_tokens[-1]}/')),
+        ('course_cancel_post', cancel_post),
+        ('admin_course_changelist', lambda c, n: c.get(course_changelist)),
+        ('admin_registration_changelist', lambda c, n: c.get(reg_changelist)),
+        ('admin_registration_search', lambda c, n: c.get(reg_changelist, {'q': 'mark'})),
+        ('admin_session_changelist', lambda c, n: c.get('/admin/courses/coursesession/')),
+        ('admin_archive', lambda c, n: c.get(f'{course_changelist}archiv/')),
+        ('admin_export_attendance_direct',
+         lambda c, n: c.get(f'{course_changelist}{course.pk}/export-attendance/')),
+        ('action_export_attendance_list',
+         lambda c, n: _action(c, course_changelist, 'export_attendance_list', course_ids)),
+        ('action_export_sepa_from_course',
+         lambda c, n: _action(c, course_changelist, 'export_sepa_from_course', course_ids)),
+        ('action_generate_sessions',
+         lambda c, n: _action(c, course_changelist, 'generate_sessions_action', course_ids)),
+        ('action_copy_course',
+         lambda c, n: _action(c, course_changelist, 'copy_course_with_participants', [course.pk])),
+        ('action_export_as_csv',
+         lambda c, n: _action(c, reg_changelist, 'export_as_csv', reg_ids)),
+        ('action_export_wiso_meinverein',
+         lambda c, n: _action(c, reg_changelist, 'export_wiso_meinverein', reg_ids)),
+        ('action_confirm_and_notify', confirm_and_notify),
+    ]
+
+
+def measure(client, func, repeat):
+    """Misst Queries und Median-Laufzeit über ``repeat`` Läufe, den Speicher-Peak
+    in einem zusätzlichen Lauf (tracemalloc verfälscht sonst die Laufzeit)."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def call(n):
+        response = func(client, n)
+        if response.status_code >= 400:
+            raise RuntimeError(f'HTTP {response.status_code}')
+
+    timings, queries = [], 0
+    for n in range(1, repeat + 1):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            call(n)
+            timings.append(time.perf_counter() - started)
+        queries = max(queries, len(ctx.captured_queries))
+
+    tracemalloc.start()
+    try:
+        call(repeat + 1)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'queries': queries,
+        'median_ms': round(statistics.median(timings) * 1000, 2),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run(courses, registrations, repeat):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from benchmarks.data import generate
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        data = generate(courses=courses, registrations=registrations)
+        client = Client()
+        client.force_login(data['admin'])
+        results = {}
+        for name, func in build_scenarios(data):
+            # Ein Aufwärmlauf (Template-Cache, Imports), dann messen
+            func(client, 0)
+            results[name] = measure(client, func, repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    return results
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """Gibt eine Liste lesbarer Regressionen gegenüber der Baseline zurück."""
+    regressions = []
+    for name, base in baseline.get('results', {}).items():
+        current = results.get(name)
+        if current is None:
+            regressions.append(f'{name}: Szenario fehlt')
+            continue
+        if current['queries'] > base['queries']:
+            regressions.append(f'{name}: {current["queries"]} Queries (Baseline {base["queries"]})')
+        # Kleine absolute Schwankungen (< 5 ms) ignorieren
+        if current['median_ms'] > max(base['median_ms'] * (1 + time_tolerance), base['median_ms'] + 5):
+            regressions.append(f'{name}: {current["median_ms"]} ms (Baseline {base["median_ms"]} ms)')
+        if current['peak_kib'] > base['peak_kib'] * (1 + memory_tolerance) + 64:
+            regressions.append(f'{name}: {current["peak_kib"]} KiB (Baseline {base["peak_kib"]} KiB)')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--courses', type=int, default=40)
+    parser.add_argument('--registrations', type=int, default=1500)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Ergebnis-JSON zusätzlich in diese Datei schreiben')
+    parser.add_argument('--baseline', help='Gegen diese Baseline vergleichen')
+    parser.add_argument('--save-baseline', metavar='PATH', help='Ergebnis als neue Baseline speichern')
+    parser.add_argument('--time-tolerance', type=float, default=0.5,
+                        help='Erlaubte relative Verschlechterung der Laufzeit (Standard 0.5 = +50%%)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    _setup_django()
+    report = {
+        'params': {'courses': args.courses, 'registrations': args.registrations, 'repeat': args.repeat},
+        'results': run(args.courses, args.registrations, args.repeat),
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    for path in filter(None, [args.output, args.save_baseline]):
+        Path(path).write_text(output + '\n', encoding='utf-8')
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        if baseline.get('params') != report['params']:
+            sys.exit('Parameter weichen von der Baseline ab – Vergleich nicht aussagekräftig.')
+        regressions = compare(report['results'], baseline, args.time_tolerance, args.memory_tolerance)
+        if regressions:
+            print('\nRegressionen gegenüber Baseline:', file=sys.stderr)
+            for line in regressions:
+                print(f'  - {line}', file=sys.stderr)
+            sys.exit(1)
+        print('\nKeine Regression gegenüber Baseline.', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
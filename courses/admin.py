@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
 from django.contrib.auth.admin import UserAdmin, GroupAdmin
 from django.contrib.auth.models import User, Group
 from django.utils.translation import gettext_lazy as _
@@ -6,7 +7,10 @@ from django.utils.html import format_html
 from django.urls import reverse, path
 from django.utils.http import urlencode
 from django.http import HttpResponseRedirect, HttpResponse
-from .models import Location, Course, CourseSession, Registration
+from kursanmeldung import metrics
+from .models import (
+    Location, Course, CourseSession, Registration, OutboxEmail, ScheduledJob, SessionNotification, week_days,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -77,8 +81,9 @@ class RegistrationInline(admin.TabularInline):
 @admin.register(CourseSession)
 class CourseSessionAdmin(admin.ModelAdmin):
     """Direkte Verwaltung einzelner Einheiten (optional)."""
-    list_display = ('course', 'date', 'is_cancelled', 'note')
+    list_display = ('course', 'date', 'is_cancelled', 'cancelled_at', 'note')
     list_filter = ('course', 'is_cancelled')
+    readonly_fields = ('cancelled_at',)
     ordering = ('course', 'date')
 
     def has_view_permission(self, request, obj=None):
@@ -92,6 +97,20 @@ class CourseSessionAdmin(admin.ModelAdmin):
         return request.user.is_active and request.user.is_staff
 
 
+class WeekdayFilter(admin.SimpleListFilter):
+    """Filter auf einen Wochentag (auch Kurse mit mehreren Tagen, per days_mask)."""
+    title = _('Wochentage')
+    parameter_name = 'weekday'
+
+    def lookups(self, request, model_admin):
+        return week_days()
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.on_weekday(self.value())
+        return queryset
+
+
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     list_display = (
@@ -100,10 +119,10 @@ class CourseAdmin(admin.ModelAdmin):
         'utilization_display', 'registrations_link', 'attendance_export_link', 'is_closed', 'close_on_start',
     )
     list_editable = ('is_closed', 'close_on_start')
-    list_filter = ('is_closed', 'course_type', 'session_mode', 'days', 'locations', 'start_date', 'instructor_user')
+    list_filter = ('is_closed', 'course_type', 'session_mode', WeekdayFilter, 'locations', 'start_date', 'instructor_user')
     inlines = [CourseSessionInline, RegistrationInline]
     readonly_fields = ('session_count_display',)
-    actions = ['export_attendance_list', 'generate_sessions_action', 'copy_course_with_participants', 'export_sepa_from_course']
+    actions = ['export_attendance_list', 'generate_sessions_action', 'copy_course_with_participants', 'rollover_courses', 'export_sepa_from_course']
 
     fieldsets = (
         (_('Allgemein'), {
@@ -183,9 +202,55 @@ class CourseAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.archive_view),
                 name='courses_course_archiv',
             ),
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='courses_course_import',
+            ),
         ]
         return custom + urls
 
+    def import_view(self, request):
+        """Admin-Ansicht: Kurse oder Anmeldungen aus CSV/XLSX importieren."""
+        from django.contrib import messages as msg
+        from django.core.exceptions import PermissionDenied
+        from django.shortcuts import render as django_render
+        from .forms import ImportForm
+        from .importer import ImportFileError, import_file
+
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        result = None
+        form = ImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_file(
+                    upload.file, upload.name, form.cleaned_data['kind'],
+                    course=form.cleaned_data['course'], status=form.cleaned_data['status'],
+                    skip_invalid=form.cleaned_data['skip_invalid'], dry_run=form.cleaned_data['dry_run'],
+                )
+            except ImportFileError as exc:
+                form.add_error('file', str(exc))
+            else:
+                summary = _('%(created)d angelegt, %(duplicates)d Dubletten übersprungen, %(errors)d Fehler.') % {
+                    'created': result.created, 'duplicates': len(result.duplicates), 'errors': len(result.errors),
+                }
+                if result.committed:
+                    self.message_user(request, summary, msg.SUCCESS)
+                elif form.cleaned_data['dry_run']:
+                    self.message_user(request, _('Probelauf, nichts gespeichert: ') + summary, msg.INFO)
+                else:
+                    self.message_user(request, _('Nichts importiert: ') + summary, msg.ERROR)
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Import',
+            'form': form,
+            'result': result,
+            'opts': self.model._meta,
+        }
+        return django_render(request, 'admin/courses/course/import.html', context)
+
     def archive_view(self, request):
         """Admin-Ansicht: abgelaufene Kurse im Archiv."""
         from datetime import date
@@ -217,8 +282,14 @@ class CourseAdmin(admin.ModelAdmin):
         qs = Course.objects.filter(pk=course_id)
         return self.export_attendance_list(request, qs)
 
+    def get_changelist_formset(self, request, **kwargs):
+        from .forms import ChangelistFormSet
+        kwargs.setdefault('formset', ChangelistFormSet)
+        return super().get_changelist_formset(request, **kwargs)
+
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
+        # _has_sessions: Speichern per list_editable braucht keine exists()-Query pro Zeile
+        qs = super().get_queryset(request).with_session_flag()
         if request.user.groups.filter(name='Kursleitung').exists():
             return qs.filter(instructor_user=request.user)
         return qs
@@ -234,9 +305,18 @@ class CourseAdmin(admin.ModelAdmin):
         return request.user.is_active and request.user.is_staff
 
     def has_add_permission(self, request):
-        if request.user.groups.filter(name__in=['Kursleitung', 'Kassierer']).exists():
-            return False
-        return request.user.is_active and request.user.is_staff
+        # Einmal je Request: die Aktion "Saisonwechsel" fragt zusaetzlich zur Seite ab
+        allowed = getattr(request, '_course_add_permission', None)
+        if allowed is None:
+            allowed = request._course_add_permission = (
+                not request.user.groups.filter(name__in=['Kursleitung', 'Kassierer']).exists()
+                and request.user.is_active and request.user.is_staff
+            )
+        return allowed
+
+    def has_rollover_permission(self, request):
+        # Wird bei jeder Aktion geprueft; Superuser ohne Gruppenabfrage
+        return request.user.is_superuser or self.has_add_permission(request)
 
     def has_change_permission(self, request, obj=None):
         if request.user.groups.filter(name='Kursleitung').exists():
@@ -275,65 +355,21 @@ class CourseAdmin(admin.ModelAdmin):
     generate_sessions_action.short_description = _('Einheiten generieren (NRW-Feiertage überspringen)')
 
     def copy_course_with_participants(self, request, queryset):
-        """Kopiert einen Kurs inkl. aller aktiven Teilnehmer (als Warteliste)."""
-        import uuid as uuid_lib
-        if queryset.count() != 1:
+        """Kopiert Kurse inkl. aller aktiven Teilnehmer (als Warteliste), ohne Daten."""
+        from .rollover import rollover
+        result = rollover(queryset)
+        if len(result.courses) != 1:
             self.message_user(
                 request,
-                _('Bitte genau einen Kurs auswählen.'),
-                level='error',
+                _('%(courses)d Folgekurse angelegt mit %(regs)d Teilnehmern auf der Warteliste.') % {
+                    'courses': len(result.courses), 'regs': result.registrations,
+                },
             )
-            return
-
-        original = queryset.first()
-
-        # Kurs duplizieren
-        new_course = Course(
-            name=f'{original.name} (Folgekurs)',
-            description=original.description,
-            start_date=None,   # muss vom Admin gesetzt werden
-            end_date=None,
-            start_time=original.start_time,
-            end_time=original.end_time,
-            days=original.days,
-            max_participants=original.max_participants,
-            price_member=original.price_member,
-            price_non_member=original.price_non_member,
-            allow_half=original.allow_half,
-            is_closed=True,  # geschlossen bis Admin alles eingerichtet hat
-            instructor=original.instructor,
-            instructor_user=original.instructor_user,
-            session_mode=original.session_mode,
-            num_sessions=original.num_sessions,
-            course_type=original.course_type,
-        )
-        new_course.save()
-        new_course.locations.set(original.locations.all())
-
-        # Alle aktiven Teilnehmer uebernehmen (CANCELLED ausschliessen)
-        source_regs = original.registration_set.exclude(status='CANCELLED')
-        new_regs = []
-        for reg in source_regs:
-            new_regs.append(Registration(
-                course=new_course,
-                first_name=reg.first_name,
-                last_name=reg.last_name,
-                email=reg.email,
-                phone=reg.phone,
-                iban=reg.iban,
-                bic=reg.bic,
-                account_holder=reg.account_holder,
-                terms_accepted=reg.terms_accepted,
-                is_member=reg.is_member,
-                half_course=reg.half_course,
-                status='WAITLIST',  # alle erstmal auf Warteliste
-                cancel_token=uuid_lib.uuid4(),
-            ))
-        Registration.objects.bulk_create(new_regs)
-
+            return None
+        new_course = result.courses[0]
         self.message_user(
             request,
-            _(f'Folgekurs "{new_course.name}" angelegt mit {len(new_regs)} Teilnehmern auf der '
+            _(f'Folgekurs "{new_course.name}" angelegt mit {result.registrations} Teilnehmern auf der '
               f'Warteliste. Bitte Datum setzen, unerwünschte Teilnehmer löschen und '
               f'dann "Bestätigen und Info-Mail senden" ausführen.'),
         )
@@ -342,6 +378,38 @@ class CourseAdmin(admin.ModelAdmin):
         )
     copy_course_with_participants.short_description = _('Kurs kopieren (Folgekurs mit allen Teilnehmern als Warteliste)')
 
+    def rollover_courses(self, request, queryset):
+        """Saisonwechsel: Folgekurse fuer die ganze Auswahl, Daten optional um N Wochen verschoben."""
+        from datetime import timedelta
+        from django.contrib.admin import helpers
+        from django.shortcuts import render as django_render
+        from .forms import RolloverForm
+        from .rollover import rollover
+
+        form = RolloverForm(request.POST if 'apply' in request.POST else None)
+        if form.is_bound and form.is_valid():
+            weeks = form.cleaned_data['weeks']
+            result = rollover(queryset, offset=timedelta(weeks=weeks) if weeks else None)
+            self.message_user(
+                request,
+                _('%(courses)d Folgekurse angelegt (gesperrt), %(regs)d Teilnehmer auf der Warteliste, '
+                  '%(sessions)d Einheiten geplant.') % {
+                    'courses': len(result.courses), 'regs': result.registrations, 'sessions': result.sessions,
+                },
+            )
+            return None
+        context = {
+            **self.admin_site.each_context(request),
+            'title': _('Saisonwechsel'),
+            'form': form,
+            'courses': queryset.order_by('start_date', 'pk'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'opts': self.model._meta,
+        }
+        return django_render(request, 'admin/courses/course/rollover.html', context)
+    rollover_courses.short_description = _('Saisonwechsel: Folgekurse für Auswahl anlegen')
+    rollover_courses.allowed_permissions = ('rollover',)
+
     def export_sepa_from_course(self, request, queryset):
         """WISO MeinVerein SEPA-CSV für alle bestätigten Anmeldungen der gewählten Kurse."""
         import csv, io, zipfile
@@ -408,7 +476,7 @@ class CourseAdmin(admin.ModelAdmin):
 
             dates     = course.session_dates()
             locations = ', '.join(l.name for l in course.locations.all()) or '-'
-            days_str  = ', '.join(course.days) if course.days else '-'
+            days_str  = course.days_label or '-'
             last_col  = get_column_letter(3 + len(dates))
 
             ws.merge_cells(f'A1:{last_col}1')
@@ -510,6 +578,16 @@ class CourseAdmin(admin.ModelAdmin):
     export_attendance_list.short_description = str(_("Anwesenheitsliste als Excel exportieren"))
 
 
+class RankedChangeList(ChangeList):
+    """Suchtreffer nach Relevanz sortieren, solange keine Spalte gewaehlt ist."""
+
+    def get_ordering(self, request, queryset):
+        from . import search
+        if ORDER_VAR not in self.params and search.is_ranked(queryset):
+            return ['-search_rank', '-pk']
+        return super().get_ordering(request, queryset)
+
+
 @admin.register(Registration)
 class RegistrationAdmin(admin.ModelAdmin):
     list_display = ('course', 'last_name', 'first_name', 'email', 'phone', 'status', 'custom_price_display')
@@ -541,6 +619,16 @@ class RegistrationAdmin(admin.ModelAdmin):
         return f'Platz {pos} auf der Warteliste'
     waitlist_position_display.short_description = _('Wartelisten-Position')
 
+    def get_search_results(self, request, queryset, search_term):
+        """Volltextsuche (courses/search.py) statt icontains ueber alle Anmeldungen."""
+        from . import search
+        if search.terms(search_term) and search.available(queryset.db):
+            return search.search(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
+    def get_changelist(self, request, **kwargs):
+        return RankedChangeList
+
     def changelist_view(self, request, extra_context=None):
         if (
             request.user.groups.filter(name='Kursleitung').exists()
@@ -568,18 +656,24 @@ class RegistrationAdmin(admin.ModelAdmin):
         return actions
 
     def confirm_and_notify(self, request, queryset):
-        """Setzt ausgewaehlte WAITLIST-Anmeldungen auf CONFIRMED und sendet Info-Mail."""
-        from .models import _send_waitlist_promotion_email
-        count = 0
-        for reg in queryset.filter(status='WAITLIST'):
-            reg.status = 'CONFIRMED'
-            reg.save(update_fields=['status'])
-            _send_waitlist_promotion_email(reg)
-            count += 1
+        """Bestaetigt ausgewaehlte WAITLIST-Anmeldungen (soweit Plaetze frei) und sendet die Info-Mails gesammelt."""
+        from django.contrib import messages as msg
+        from .models import confirm_waitlisted, send_waitlist_promotion_emails
+        selected = queryset.filter(status='WAITLIST').count()
+        confirmed = confirm_waitlisted(queryset)
+        send_waitlist_promotion_emails(confirmed)
+        count = len(confirmed)
+        metrics.inc_promotions('admin', count)
         self.message_user(
             request,
-            _(f'{count} Anmeldung(en) bestätigt und Info-Mail gesendet.'),
+            _('%(count)d Anmeldung(en) bestätigt und Info-Mail gesendet.') % {'count': count},
         )
+        if count < selected:
+            self.message_user(
+                request,
+                _('%(rest)d Anmeldung(en) bleiben auf der Warteliste – der Kurs ist voll.') % {'rest': selected - count},
+                msg.WARNING,
+            )
     confirm_and_notify.short_description = _('Auswahl bestätigen + Info-Mail senden (Folgekurs)')
 
     def export_as_csv(self, request, queryset):
@@ -662,3 +756,62 @@ class RegistrationAdmin(admin.ModelAdmin):
         if request.user.groups.filter(name__in=['Kursleitung', 'Kassierer']).exists():
             return False
         return request.user.is_active and request.user.is_staff
+
+
+class SuperuserOnlyAdmin(admin.ModelAdmin):
+    """Technische Tabellen: nur fuer Superuser sichtbar, nicht bearbeitbar."""
+
+    def has_module_permission(self, request):
+        return request.user.is_active and request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_active and request.user.is_superuser
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ScheduledJob)
+class ScheduledJobAdmin(SuperuserOnlyAdmin):
+    """Stand der Hintergrund-Jobs (python manage.py run_scheduler)."""
+    list_display = ('name', 'last_run', 'last_duration', 'last_result', 'ok', 'next_run', 'run_count')
+    readonly_fields = ('name', 'last_run', 'last_duration', 'last_result', 'last_error', 'next_run', 'run_count')
+
+    def ok(self, obj):
+        return not obj.last_error
+    ok.boolean = True
+    ok.short_description = _('OK')
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(SuperuserOnlyAdmin):
+    """Postausgang (courses/outbox.py): offene, versendete und fehlgeschlagene Mails."""
+    list_display = ('created', 'subject', 'recipients', 'sent_at', 'attempts', 'next_attempt')
+    list_filter = (('sent_at', admin.EmptyFieldListFilter),)
+    search_fields = ('recipients', 'subject')
+    readonly_fields = ('created', 'subject', 'recipients', 'attempts', 'next_attempt', 'sent_at', 'last_error')
+    exclude = ('message',)
+    actions = ['retry_now']
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_active and request.user.is_superuser
+
+    def retry_now(self, request, queryset):
+        from django.utils import timezone
+        count = queryset.filter(sent_at__isnull=True).update(attempts=0, next_attempt=timezone.now())
+        self.message_user(request, _('%(count)d Mail(s) werden beim nächsten Lauf erneut versendet.') % {'count': count})
+    retry_now.short_description = _('Erneut versenden (nächster Scheduler-Lauf)')
+    retry_now.allowed_permissions = ('delete',)
+
+
+@admin.register(SessionNotification)
+class SessionNotificationAdmin(SuperuserOnlyAdmin):
+    """Versandte Ausfall-/Erinnerungsmails (courses/notifications.py)."""
+    list_display = ('created', 'kind', 'date', 'registration')
+    list_filter = ('kind',)
+    list_select_related = ('registration__course',)
+    search_fields = ('registration__email', 'registration__last_name', 'registration__course__name')
+    readonly_fields = ('created', 'kind', 'date', 'registration')
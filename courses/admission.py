@@ -0,0 +1,272 @@
+"""
+Warteraum für den Anmeldestart beliebter Kurse.
+
+Pro Kurs dürfen höchstens ``ADMISSION_SLOTS`` Besucher gleichzeitig das
+Anmeldeformular ausfüllen. Wer danach kommt, landet im Warteraum und sieht
+seine Position und die geschätzte Wartezeit; die Seite lädt sich alle
+``ADMISSION_POLL`` Sekunden neu. Ist ein Platz frei, rückt der nächste nach
+(Reihenfolge nach Ankunft).
+
+Zugelassene Besucher bekommen ein signiertes Cookie (``adm_<kurs>``,
+django.core.signing). ``register`` prüft beim Absenden nur diese Signatur –
+kein Zugriff auf Datenbank oder Warteschlange. Die Zulassung gilt
+``ADMISSION_TTL`` Sekunden; nach erfolgreicher Anmeldung wird der Platz sofort
+freigegeben.
+
+Die Warteschlange liegt in einer eigenen SQLite-Datei (``ADMISSION_STORE``,
+WAL + BEGIN IMMEDIATE) und ist damit für alle Gunicorn-Worker auf dem Server
+dieselbe, ohne die Anmelde-Datenbank zu belasten. Solange weniger Besucher als
+Plätze da sind, merkt niemand etwas vom Warteraum.
+
+Aktivierung per .env:
+    ADMISSION_ENABLED=True
+    ADMISSION_SLOTS=25
+
+Simulation eines Anmeldestarts: ``python benchmarks/launch_spike.py``.
+"""
+
+import math
+import secrets
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS admission (
+    course_id INTEGER NOT NULL,
+    ticket TEXT NOT NULL,
+    joined REAL NOT NULL,
+    seen REAL NOT NULL,
+    admitted REAL,
+    PRIMARY KEY (course_id, ticket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS admission_queue ON admission (course_id, admitted, joined);
+CREATE TABLE IF NOT EXISTS admission_session (
+    course_id INTEGER PRIMARY KEY,
+    seconds REAL NOT NULL
+);
+"""
+
+TOKEN_SALT = 'courses.admission'
+TICKET_COOKIE = 'admq_{}'
+TOKEN_COOKIE = 'adm_{}'
+
+
+@dataclass
+class Status:
+    admitted: bool
+    position: int = 0       # 1 = als Nächstes dran
+    waiting: int = 0        # Länge der Warteschlange
+    eta: int = 0            # geschätzte Wartezeit in Sekunden
+
+
+class QueueStore:
+    """Warteschlange je Kurs in einer lokalen SQLite-Datei.
+
+    ``now`` ist nur für die Simulation überschreibbar (virtuelle Uhr).
+    """
+
+    def __init__(self, path, slots, ttl, idle_timeout, session_estimate):
+        self.path = str(path)
+        self.slots = slots
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+        self.session_estimate = session_estimate
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _expire(self, conn, course_id, now):
+        """Abgelaufene Zulassungen und verlassene Warteplätze entfernen.
+
+        Verlassen = Warteraum seit ``idle_timeout`` nicht mehr neu geladen, bzw.
+        zugelassen, aber das Formular nie abgeholt.
+        """
+        conn.execute(
+            'DELETE FROM admission WHERE course_id = ? AND ('
+            ' (admitted IS NOT NULL AND admitted < ?)'
+            ' OR (seen < ? AND (admitted IS NULL OR seen < admitted)))',
+            [course_id, now - self.ttl, now - self.idle_timeout],
+        )
+
+    def enter(self, course_id, ticket, now=None):
+        """Meldet einen Besuch an (neu oder erneut) und gibt seinen Status zurück."""
+        now = time.time() if now is None else now
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._expire(conn, course_id, now)
+            previous = conn.execute(
+                'SELECT seen FROM admission WHERE course_id = ? AND ticket = ?', [course_id, ticket],
+            ).fetchone()
+            conn.execute(
+                'INSERT INTO admission (course_id, ticket, joined, seen) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (course_id, ticket) DO UPDATE SET seen = excluded.seen',
+                [course_id, ticket, now, now],
+            )
+            (active,) = conn.execute(
+                'SELECT COUNT(*) FROM admission WHERE course_id = ? AND admitted IS NOT NULL',
+                [course_id],
+            ).fetchone()
+            free = self.slots - active
+            if free > 0:
+                conn.execute(
+                    'UPDATE admission SET admitted = ? WHERE course_id = ? AND ticket IN ('
+                    ' SELECT ticket FROM admission WHERE course_id = ? AND admitted IS NULL'
+                    ' ORDER BY joined, ticket LIMIT ?)',
+                    [now, course_id, course_id, free],
+                )
+            joined, admitted = conn.execute(
+                'SELECT joined, admitted FROM admission WHERE course_id = ? AND ticket = ?',
+                [course_id, ticket],
+            ).fetchone()
+            if admitted is not None:
+                if previous is not None and previous[0] < admitted:
+                    # Zulassung wird jetzt erst abgeholt: Frist ab hier, passend zum Token
+                    conn.execute(
+                        'UPDATE admission SET admitted = ? WHERE course_id = ? AND ticket = ?',
+                        [now, course_id, ticket],
+                    )
+                conn.execute('COMMIT')
+                return Status(admitted=True)
+            (position,) = conn.execute(
+                'SELECT COUNT(*) FROM admission WHERE course_id = ? AND admitted IS NULL'
+                ' AND (joined < ? OR (joined = ? AND ticket <= ?))',
+                [course_id, joined, joined, ticket],
+            ).fetchone()
+            (waiting,) = conn.execute(
+                'SELECT COUNT(*) FROM admission WHERE course_id = ? AND admitted IS NULL',
+                [course_id],
+            ).fetchone()
+            session = self._session_seconds(conn, course_id)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        eta = math.ceil(position / max(self.slots, 1)) * session
+        return Status(admitted=False, position=position, waiting=waiting, eta=int(eta))
+
+    def release(self, course_id, ticket, now=None):
+        """Gibt den Platz nach der Anmeldung frei und lernt daraus die Sitzungsdauer."""
+        now = time.time() if now is None else now
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT admitted FROM admission WHERE course_id = ? AND ticket = ?',
+                [course_id, ticket],
+            ).fetchone()
+            conn.execute('DELETE FROM admission WHERE course_id = ? AND ticket = ?', [course_id, ticket])
+            if row and row[0] is not None:
+                # Gleitender Mittelwert, damit die Schätzung dem aktuellen Ansturm folgt
+                seconds = 0.8 * self._session_seconds(conn, course_id) + 0.2 * (now - row[0])
+                conn.execute(
+                    'INSERT INTO admission_session (course_id, seconds) VALUES (?, ?) '
+                    'ON CONFLICT (course_id) DO UPDATE SET seconds = excluded.seconds',
+                    [course_id, seconds],
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def prune(self, now=None):
+        """Abgelaufene Einträge aller Kurse löschen (Scheduler-Job, courses/jobs.py)."""
+        now = time.time() if now is None else now
+        conn = self._connection()
+        cursor = conn.execute(
+            'DELETE FROM admission WHERE'
+            ' (admitted IS NOT NULL AND admitted < ?)'
+            ' OR (seen < ? AND (admitted IS NULL OR seen < admitted))',
+            [now - self.ttl, now - self.idle_timeout],
+        )
+        return cursor.rowcount
+
+    def _session_seconds(self, conn, course_id):
+        row = conn.execute(
+            'SELECT seconds FROM admission_session WHERE course_id = ?', [course_id],
+        ).fetchone()
+        return row[0] if row else self.session_estimate
+
+
+# ── Django-Anbindung ──────────────────────────────────────────────────────────
+
+def enabled():
+    return getattr(settings, 'ADMISSION_ENABLED', False)
+
+
+def poll_interval():
+    return getattr(settings, 'ADMISSION_POLL', 5)
+
+
+def _ttl():
+    return getattr(settings, 'ADMISSION_TTL', 900)
+
+
+@lru_cache(maxsize=4)
+def _store(path, slots, ttl, idle_timeout, session_estimate):
+    return QueueStore(path, slots, ttl, idle_timeout, session_estimate)
+
+
+def get_store():
+    return _store(
+        str(settings.ADMISSION_STORE),
+        getattr(settings, 'ADMISSION_SLOTS', 25),
+        _ttl(),
+        # Drei verpasste Reloads gelten als "Tab geschlossen"
+        max(3 * poll_interval(), 15),
+        getattr(settings, 'ADMISSION_SESSION_ESTIMATE', 180),
+    )
+
+
+def new_ticket(request, course_id):
+    """Warteschlangen-Ticket aus dem Cookie oder ein neues."""
+    return request.COOKIES.get(TICKET_COOKIE.format(course_id)) or secrets.token_urlsafe(16)
+
+
+def issue_token(course_id, ticket):
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(f'{course_id}:{ticket}')
+
+
+def admitted_ticket(request, course_id):
+    """Prüft das Zulassungs-Cookie (nur Signatur und Alter). Gibt das Ticket zurück oder None."""
+    value = request.COOKIES.get(TOKEN_COOKIE.format(course_id))
+    if not value:
+        return None
+    try:
+        payload = signing.TimestampSigner(salt=TOKEN_SALT).unsign(value, max_age=_ttl())
+    except signing.BadSignature:
+        return None
+    token_course, _, ticket = payload.partition(':')
+    return ticket if token_course == str(course_id) else None
+
+
+def set_cookies(response, course_id, ticket, path, token=None):
+    options = {'max_age': _ttl(), 'path': path, 'httponly': True, 'samesite': 'Lax',
+               'secure': getattr(settings, 'SESSION_COOKIE_SECURE', False)}
+    response.set_cookie(TICKET_COOKIE.format(course_id), ticket, **options)
+    if token:
+        response.set_cookie(TOKEN_COOKIE.format(course_id), token, **options)
+    return response
+
+
+def clear_cookies(response, course_id, path):
+    """Nach der Anmeldung: Zulassung verbraucht, nächster Besuch stellt sich neu an."""
+    for name in (TICKET_COOKIE, TOKEN_COOKIE):
+        response.delete_cookie(name.format(course_id), path=path, samesite='Lax')
+    return response
@@ -6,3 +6,17 @@ class CoursesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'courses'
     verbose_name = _('Kurse')
+
+    def ready(self):
+        from django.contrib.auth.models import Group
+        from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+        from . import clubauth, emails, search
+        from .models import Course, Location
+        post_delete.connect(clubauth.clear_group_cache, sender=Group)
+        # Kurs-Kontext der Mail-Vorlagen bei Aenderungen verwerfen
+        for signal in (post_save, post_delete):
+            signal.connect(emails.invalidate_course, sender=Course)
+            signal.connect(emails.clear_cache, sender=Location)
+        m2m_changed.connect(emails.locations_changed, sender=Course.locations.through)
+        # Volltextsuche (FTS5/pg_trgm) nach jedem migrate anlegen bzw. reparieren
+        post_migrate.connect(search.install, sender=self)
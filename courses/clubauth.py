@@ -0,0 +1,430 @@
+"""Client für ClubAuth (OIDC-Provider und User-Verwaltung des Vereins).
+
+- Ein HTTP-Client mit Keep-Alive-Pool pro Event-Loop, statt für jeden Login
+  eine neue Verbindung zu ClubAuth aufzubauen.
+- Optional wird das ID-Token gegen den JWKS von ClubAuth geprüft
+  (OIDC_VALIDATE_ID_TOKEN). Enthält es bereits E-Mail und Rollen, entfällt
+  der Aufruf von /o/userinfo/ – ein Login kostet dann genau einen Roundtrip.
+  Der JWKS wird pro Prozess zwischengespeichert.
+- upsert_staff_user() legt den Django-User inkl. Gruppen in einer
+  Transaktion mit wenigen Queries an; die Gruppen-IDs werden gecacht.
+- UserSyncPlan gleicht eine komplette User-Liste von ClubAuth per Diff ab
+  (sync_kursleiter): zwei Lese-Queries, Schreiben per bulk_create/bulk_update.
+"""
+
+import asyncio
+import time
+import weakref
+
+import httpx
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from kursanmeldung import instrumentation, metrics
+
+# Gruppen, deren Mitgliedschaft von ClubAuth gesteuert wird (Rolle -> Gruppe)
+ROLE_GROUPS = {
+    'kursleitung': 'Kursleitung',
+    'kassierer':   'Kassierer',
+}
+
+JWKS_CACHE_SECONDS = 3600
+
+_async_clients = weakref.WeakKeyDictionary()
+_sync_client = None
+_jwks_cache = {'keys': {}, 'fetched_at': 0.0}
+_group_ids = {}
+
+
+class ClubAuthError(Exception):
+    """ClubAuth nicht erreichbar oder Antwort unbrauchbar."""
+
+
+def internal_url():
+    """Interne Basis-URL für Server-zu-Server-Aufrufe (Fallback: OIDC_BASE_URL)."""
+    return (getattr(settings, 'OIDC_INTERNAL_URL', '')
+            or getattr(settings, 'OIDC_BASE_URL', '')).rstrip('/')
+
+
+def _async_client():
+    """Gepoolter AsyncClient für den laufenden Event-Loop (Keep-Alive)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
+            event_hooks=instrumentation.httpx_event_hooks('clubauth', is_async=True),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _client():
+    """Gepoolter synchroner Client (Management-Commands)."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = httpx.Client(
+            timeout=10, event_hooks=instrumentation.httpx_event_hooks('clubauth'),
+        )
+    return _sync_client
+
+
+def fetch_app_users():
+    """Ruft alle User der App 'kursanmeldung' von ClubAuth ab."""
+    api_key = getattr(settings, 'INTERNAL_API_KEY', '')
+    try:
+        resp = _client().get(
+            f'{internal_url()}/api/app-users/',
+            params={'app': 'kursanmeldung'},
+            headers={'Authorization': f'Bearer {api_key}'},
+        )
+        resp.raise_for_status()
+        return resp.json().get('users', [])
+    except (httpx.HTTPError, ValueError) as exc:
+        raise ClubAuthError(str(exc))
+
+
+# ---------------------------------------------------------------------------
+# OIDC
+# ---------------------------------------------------------------------------
+
+async def _signing_key(client, kid):
+    """Liefert den öffentlichen Schlüssel zu ``kid`` aus dem gecachten JWKS."""
+    import jwt
+
+    expired = time.monotonic() - _jwks_cache['fetched_at'] > JWKS_CACHE_SECONDS
+    if expired or kid not in _jwks_cache['keys']:
+        resp = await client.get(f'{internal_url()}/o/.well-known/jwks.json')
+        resp.raise_for_status()
+        _jwks_cache['keys'] = {
+            jwk.get('kid'): jwt.PyJWK(jwk).key for jwk in resp.json().get('keys', [])
+        }
+        _jwks_cache['fetched_at'] = time.monotonic()
+    try:
+        return _jwks_cache['keys'][kid]
+    except KeyError:
+        raise ClubAuthError(f'Unbekannter Schlüssel im ID-Token: {kid}')
+
+
+async def _validated_id_token_claims(client, id_token):
+    import jwt
+
+    try:
+        header = jwt.get_unverified_header(id_token)
+        key = await _signing_key(client, header.get('kid'))
+        issuer = getattr(settings, 'OIDC_ISSUER', '')
+        return jwt.decode(
+            id_token,
+            key=key,
+            algorithms=['RS256'],
+            audience=getattr(settings, 'OIDC_CLIENT_ID', ''),
+            issuer=issuer or None,
+            options={'verify_iss': bool(issuer)},
+        )
+    except jwt.PyJWTError as exc:
+        raise ClubAuthError(f'ID-Token ungültig: {exc}')
+
+
+async def exchange_code(code):
+    """Tauscht den Authorization-Code gegen die Claims des Users.
+
+    Gibt ein Dict mit mindestens ``email``, ``name`` und ``roles`` zurück.
+    """
+    started = time.perf_counter()
+    try:
+        claims = await _exchange_code(code)
+    except ClubAuthError:
+        metrics.observe_oidc('error', time.perf_counter() - started)
+        raise
+    metrics.observe_oidc('ok', time.perf_counter() - started)
+    return claims
+
+
+async def _exchange_code(code):
+    client = _async_client()
+    base_url = internal_url()
+    try:
+        token_resp = await client.post(
+            f'{base_url}/o/token/',
+            data={
+                'grant_type': 'authorization_code',
+                'code': code,
+                'redirect_uri': getattr(settings, 'OIDC_REDIRECT_URI', ''),
+                'client_id': getattr(settings, 'OIDC_CLIENT_ID', ''),
+                'client_secret': getattr(settings, 'OIDC_CLIENT_SECRET', ''),
+            },
+        )
+        token_resp.raise_for_status()
+        tokens = token_resp.json()
+
+        id_token = tokens.get('id_token')
+        if id_token and getattr(settings, 'OIDC_VALIDATE_ID_TOKEN', False):
+            claims = await _validated_id_token_claims(client, id_token)
+            if 'email' in claims and 'roles' in claims:
+                return claims
+
+        userinfo_resp = await client.get(
+            f'{base_url}/o/userinfo/',
+            headers={'Authorization': f"Bearer {tokens.get('access_token', '')}"},
+        )
+        userinfo_resp.raise_for_status()
+        return userinfo_resp.json()
+    except (httpx.HTTPError, ValueError) as exc:
+        raise ClubAuthError(str(exc))
+
+
+# ---------------------------------------------------------------------------
+# Django-User und Gruppen
+# ---------------------------------------------------------------------------
+
+def group_ids():
+    """Gibt {Gruppenname: id} der ClubAuth-Gruppen zurück (pro Prozess gecacht)."""
+    if len(_group_ids) != len(ROLE_GROUPS):
+        from django.contrib.auth.models import Group
+        for name in ROLE_GROUPS.values():
+            group, _ = Group.objects.get_or_create(name=name)
+            _group_ids[name] = group.pk
+    return _group_ids
+
+
+def clear_group_cache(**kwargs):
+    """Verwirft die gecachten Gruppen-IDs (z.B. nach Löschen einer Gruppe)."""
+    _group_ids.clear()
+
+
+def set_role_groups(user_ids, role):
+    """Setzt die ClubAuth-Gruppen der User passend zur Rolle (zwei Queries).
+
+    Die Rollen 'admin' und 'verwaltung' (und alle unbekannten) bekommen
+    keine einschränkende Gruppe.
+    """
+    through = _user_groups_through()
+    ids = group_ids()
+    wanted = ids.get(ROLE_GROUPS.get(role))
+    managed = [gid for gid in ids.values() if gid != wanted]
+    through.objects.filter(user_id__in=user_ids, group_id__in=managed).delete()
+    if wanted:
+        through.objects.bulk_create(
+            [through(user_id=uid, group_id=wanted) for uid in user_ids],
+            ignore_conflicts=True,
+        )
+
+
+def _user_groups_through():
+    from django.contrib.auth.models import User
+    return User.groups.through
+
+
+def find_user(email):
+    """Sucht den User zur E-Mail mit einer Query.
+
+    Bevorzugt username=email (Sync-Konvention), sonst den ältesten User mit
+    dieser E-Mail (manuell angelegte Accounts mit anderem username).
+    """
+    from django.contrib.auth.models import User
+    candidates = list(
+        User.objects.filter(Q(username=email) | Q(email__iexact=email)).order_by('date_joined')
+    )
+    for user in candidates:
+        if user.username == email:
+            return user
+    return candidates[0] if candidates else None
+
+
+def upsert_staff_user(email, first_name, last_name, role, is_superuser=False):
+    """Legt den Staff-User zur ClubAuth-Identität an bzw. aktualisiert ihn.
+
+    Läuft in einer Transaktion: eine Suche, ein UPDATE bzw. INSERT und zwei
+    Queries für die Gruppen.
+    """
+    from django.contrib.auth.models import User
+
+    with transaction.atomic():
+        user = find_user(email)
+        if user is None:
+            user = User.objects.create_user(
+                username=email,
+                email=email,
+                first_name=first_name,
+                last_name=last_name,
+                is_staff=True,
+                is_active=True,
+                is_superuser=is_superuser,
+            )
+        else:
+            user.is_staff = True
+            user.is_active = True
+            user.is_superuser = is_superuser
+            user.first_name = first_name or user.first_name
+            user.last_name = last_name or user.last_name
+            User.objects.filter(pk=user.pk).update(
+                is_staff=True,
+                is_active=True,
+                is_superuser=is_superuser,
+                first_name=user.first_name,
+                last_name=user.last_name,
+            )
+        set_role_groups([user.pk], role)
+    return user
+
+
+class UserSyncPlan:
+    """Diff zwischen den Usern aus ClubAuth und den Django-Usern.
+
+    Liest alle User und die Mitgliedschaften in den ClubAuth-Gruppen mit je
+    einer Query, berechnet Anlagen, Änderungen und Gruppenwechsel im
+    Speicher und schreibt sie mit apply() gesammelt in einer Transaktion.
+
+    ``entries`` sind Dicts mit email, first_name, last_name und role.
+    ``removals`` (E-Mails) entzieht den passenden Usern den Zugriff,
+    ``deletions`` (E-Mails) löscht sie. Mit ``deactivate_missing`` wird
+    Staff-Usern, die in ``entries`` fehlen, der Zugriff entzogen
+    (Superuser ausgenommen, damit lokale Notfall-Accounts erhalten bleiben).
+
+    Ein zweiter Lauf mit denselben Daten schreibt nichts (idempotent).
+    """
+
+    USER_FIELDS = ('email', 'first_name', 'last_name', 'is_staff', 'is_active')
+
+    def __init__(self, entries, deactivate_missing=False, removals=(), deletions=()):
+        from django.contrib.auth.models import User
+
+        self.to_create = []
+        self.to_update = []
+        self.to_deactivate = []
+        self.to_delete = []
+        # E-Mail -> Status (created, updated, unchanged, removed, deleted)
+        self.results = {}
+        # (user, gewünschte Gruppen-ID oder None)
+        self._role_targets = []
+
+        users = list(
+            User.objects.only('id', 'username', 'date_joined', 'is_superuser', *self.USER_FIELDS)
+            .order_by('date_joined')
+        )
+
+        self._ids = group_ids()
+        through = _user_groups_through()
+        self._memberships = {
+            (user_id, group_id): pk
+            for pk, user_id, group_id in through.objects
+            .filter(group_id__in=self._ids.values())
+            .values_list('pk', 'user_id', 'group_id')
+        }
+
+        # Löschen und Entziehen treffen (wie bisher) alle User mit der E-Mail
+        deletions = {e.lower().strip() for e in deletions}
+        removals = {e.lower().strip() for e in removals} - deletions
+        for user in users:
+            email = user.email.lower()
+            if email in deletions:
+                self.to_delete.append(user)
+            elif email in removals and (user.is_staff or user.is_active):
+                self.to_deactivate.append(user)
+        self.results.update({email: 'deleted' for email in deletions})
+        self.results.update({email: 'removed' for email in removals})
+
+        entry_users = {}
+        deleted_pks = {u.pk for u in self.to_delete}
+        users = [u for u in users if u.pk not in deleted_pks]
+        by_username = {u.username: u for u in users}
+        by_email = {}
+        for u in users:
+            by_email.setdefault(u.email.lower(), u)
+
+        for entry in entries:
+            email = entry.get('email', '').lower().strip()
+            if not email or email in self.results:
+                continue
+            user = by_username.get(email) or by_email.get(email)
+            values = {
+                'email': email,
+                'first_name': entry.get('first_name', '') or (user.first_name if user else ''),
+                'last_name': entry.get('last_name', '') or (user.last_name if user else ''),
+                'is_staff': True,
+                'is_active': True,
+            }
+            if user is None:
+                user = User(username=email, **values)
+                user.set_unusable_password()
+                self.to_create.append(user)
+                status = 'created'
+            elif any(getattr(user, f) != v for f, v in values.items()):
+                for field, value in values.items():
+                    setattr(user, field, value)
+                self.to_update.append(user)
+                status = 'updated'
+            else:
+                status = 'unchanged'
+            self._role_targets.append((user, self._ids.get(ROLE_GROUPS.get(entry.get('role', '')))))
+            self.results[email] = status
+            entry_users[email] = user
+
+        if deactivate_missing:
+            matched = {u.pk for u, _ in self._role_targets if u.pk}
+            self.to_deactivate += [
+                u for u in users
+                if u.pk not in matched and not u.is_superuser and (u.is_staff or u.is_active)
+            ]
+
+        self.memberships_to_add, self.memberships_to_remove, changed = self._group_diff()
+        # Nur die Rolle hat sich geändert -> ebenfalls "updated"
+        for email, user in entry_users.items():
+            if self.results[email] == 'unchanged' and id(user) in changed:
+                self.results[email] = 'updated'
+
+    def _group_diff(self):
+        add, remove, changed = [], [], set()
+        targets = self._role_targets + [(u, None) for u in self.to_deactivate]
+        for user, wanted in targets:
+            for gid in self._ids.values():
+                pk = self._memberships.get((user.pk, gid)) if user.pk else None
+                if gid == wanted and pk is None:
+                    add.append((user, gid))
+                    changed.add(id(user))
+                elif gid != wanted and pk is not None:
+                    remove.append(pk)
+                    changed.add(id(user))
+        return add, remove, changed
+
+    def summary(self):
+        return {
+            'created': len(self.to_create),
+            'updated': len(self.to_update),
+            'unchanged': sum(1 for status in self.results.values() if status == 'unchanged'),
+            'deactivated': len(self.to_deactivate),
+            'deleted': len(self.to_delete),
+            'groups_added': len(self.memberships_to_add),
+            'groups_removed': len(self.memberships_to_remove),
+        }
+
+    def apply(self):
+        """Schreibt den Plan in einer Transaktion (konstante Anzahl Queries)."""
+        from django.contrib.auth.models import User
+
+        if not any([self.to_create, self.to_update, self.to_deactivate, self.to_delete,
+                    self.memberships_to_add, self.memberships_to_remove]):
+            return self.summary()
+
+        through = _user_groups_through()
+        with transaction.atomic():
+            if self.to_delete:
+                # FK zu Kursen (instructor_user) wird auf NULL gesetzt
+                User.objects.filter(pk__in=[u.pk for u in self.to_delete]).delete()
+            if self.to_create:
+                User.objects.bulk_create(self.to_create)
+            if self.to_update:
+                User.objects.bulk_update(self.to_update, self.USER_FIELDS)
+            if self.to_deactivate:
+                User.objects.filter(pk__in=[u.pk for u in self.to_deactivate]) \
+                    .update(is_staff=False, is_active=False)
+            if self.memberships_to_remove:
+                through.objects.filter(pk__in=self.memberships_to_remove).delete()
+            if self.memberships_to_add:
+                through.objects.bulk_create(
+                    [through(user_id=user.pk, group_id=gid) for user, gid in self.memberships_to_add],
+                    ignore_conflicts=True,
+                )
+        return self.summary()
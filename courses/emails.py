@@ -0,0 +1,165 @@
+"""
+E-Mails an Teilnehmer rendern: Vorlagen einmal je Prozess, Kursdaten einmal je Kurs.
+
+Jede Mail-Art (``confirmation``, ``waitlist_promotion``, ``session_cancelled``,
+``session_reminder``) besteht aus ``courses/email/<art>_subject.txt`` und
+``<art>_body.txt``. Die Vorlagen werden je Prozess einmal geladen und
+kompiliert (im DEBUG-Modus jedes Mal, damit Änderungen sofort greifen).
+
+Alles, was nur vom Kurs abhängt – Name, formatierte Daten und Uhrzeiten,
+Wochentage, Orte, iCal-Pfad – steckt in einem ``CourseMailContext``. Er wird
+je Prozess zwischengespeichert und verworfen, sobald der Kurs oder seine Orte
+gespeichert werden (Signale in apps.py). Andere Worker-Prozesse bemerken
+Kursänderungen über den Fingerabdruck der Kursfelder; geänderte Orte sehen sie
+spätestens nach ``CONTEXT_TTL`` Sekunden.
+
+    messages = emails.build_messages('waitlist_promotion', registrations)
+
+rendert einen ganzen Stapel: Betreff einmal je Kurs, Text je Anmeldung.
+"""
+
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db.models import prefetch_related_objects
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import formats
+
+CONTEXT_TTL = 300  # Sekunden
+
+# Kursfelder, die in den Kontext einfliessen (Fingerabdruck fuer andere Prozesse)
+CONTEXT_FIELDS = ('name', 'start_date', 'end_date', 'start_time', 'end_time', 'days_mask', 'instructor')
+
+
+@dataclass(frozen=True)
+class CourseMailContext:
+    """Vorformatierte Kursdaten für Mail-Vorlagen (``{{ course.* }}``)."""
+    pk: int
+    name: str
+    start_date: str
+    end_date: str
+    start_time: str
+    end_time: str
+    days: str
+    locations: str
+    instructor: str
+    ical_path: str
+
+
+# course.pk -> (Fingerabdruck, Ablaufzeit, CourseMailContext)
+_contexts = {}
+
+
+@lru_cache(maxsize=32)
+def _compiled(name):
+    return get_template(name)
+
+
+def template(name):
+    """Kompilierte Vorlage (je Prozess gecacht, außer mit DEBUG)."""
+    if settings.DEBUG:
+        return get_template(name)
+    return _compiled(name)
+
+
+def _fingerprint(course):
+    return tuple(getattr(course, field) for field in CONTEXT_FIELDS)
+
+
+def _format(value, formatter):
+    return formatter(value) if value else ''
+
+
+def _build(course):
+    return CourseMailContext(
+        pk=course.pk,
+        name=course.name,
+        start_date=_format(course.start_date, formats.date_format),
+        end_date=_format(course.end_date, formats.date_format),
+        start_time=_format(course.start_time, formats.time_format),
+        end_time=_format(course.end_time, formats.time_format),
+        days=course.days_label,
+        locations=', '.join(loc.name for loc in course.locations.all()),
+        instructor=course.instructor,
+        ical_path=reverse('course_ical', args=[course.pk]),
+    )
+
+
+def course_contexts(courses):
+    """{course.pk: CourseMailContext}; Orte fehlender Kurse mit einer Abfrage."""
+    now = time.monotonic()
+    result, missing = {}, {}
+    for course in courses:
+        cached = _contexts.get(course.pk)
+        if cached and cached[0] == _fingerprint(course) and cached[1] > now:
+            result[course.pk] = cached[2]
+        else:
+            missing[course.pk] = course
+    if missing:
+        prefetch_related_objects(list(missing.values()), 'locations')
+        for pk, course in missing.items():
+            context = _build(course)
+            _contexts[pk] = (_fingerprint(course), now + CONTEXT_TTL, context)
+            result[pk] = context
+    return result
+
+
+def course_context(course):
+    return course_contexts([course])[course.pk]
+
+
+def invalidate_course(sender=None, instance=None, **kwargs):
+    """Signal-Empfänger: Kontext eines gespeicherten/gelöschten Kurses verwerfen."""
+    _contexts.pop(getattr(instance, 'pk', None), None)
+
+
+def locations_changed(sender=None, instance=None, reverse=False, pk_set=None, **kwargs):
+    """m2m_changed von Course.locations: betroffene Kurse verwerfen."""
+    if reverse:  # von der Ort-Seite aus geändert
+        for pk in pk_set or list(_contexts):
+            _contexts.pop(pk, None)
+    else:
+        _contexts.pop(instance.pk, None)
+
+
+def clear_cache(**kwargs):
+    """Alle Kurs-Kontexte verwerfen (z. B. nach Umbenennen eines Orts)."""
+    _contexts.clear()
+
+
+def build_messages(kind, registrations, site_url=None, **extra):
+    """Baut die Mails ``kind`` für ``registrations``; ``extra`` gilt für alle (z. B. session).
+
+    Vorlagen-Kontext: ``course`` (CourseMailContext), ``registration``,
+    ``price``, ``cancel_url``, ``ical_url`` sowie ``extra``.
+    """
+    registrations = list(registrations)
+    if not registrations:
+        return []
+    site_url = (site_url or settings.SITE_URL).rstrip('/')
+    subject_template = template(f'courses/email/{kind}_subject.txt')
+    body_template = template(f'courses/email/{kind}_body.txt')
+    contexts = course_contexts({r.course_id: r.course for r in registrations}.values())
+    subjects = {}
+    messages = []
+    for registration in registrations:
+        course = contexts[registration.course_id]
+        shared = {'course': course, 'ical_url': site_url + course.ical_path, **extra}
+        if course.pk not in subjects:
+            subjects[course.pk] = subject_template.render(shared).strip()
+        messages.append(EmailMessage(
+            subject=subjects[course.pk],
+            body=body_template.render({
+                **shared,
+                'registration': registration,
+                'price': registration.total_price,
+                'cancel_url': site_url + reverse('course_cancel', args=[registration.cancel_token]),
+            }),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[registration.email],
+        ))
+    return messages
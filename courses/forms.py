@@ -1,12 +1,28 @@
+import uuid
 from django import forms
+from django.utils.functional import lazy
 from django.utils.translation import gettext_lazy as _
-from django.urls import reverse_lazy
-from django.utils.safestring import mark_safe
+from django.urls import reverse
+from django.utils.safestring import SafeString, mark_safe
+from . import iban as iban_utils
 from .models import Registration
 
 
+def _terms_label():
+    return mark_safe(
+        _("Ich habe die <a href='%(url)s' target='_blank'>Datenschutzbestimmungen</a> gelesen und akzeptiere diese.")
+        % {'url': reverse('privacy')}
+    )
+
+
 class RegistrationForm(forms.ModelForm):
-    accept_terms = forms.BooleanField(required=True)
+    # Idempotenz-Schluessel: wird beim Anzeigen erzeugt und bei jedem Absenden
+    # desselben Formulars mitgeschickt (siehe register()). Bewusst kein
+    # Modellfeld im Formular, damit is_valid() keine Unique-Abfrage ausfuehrt.
+    submission_key = forms.UUIDField(required=False, widget=forms.HiddenInput)
+    # Label erst beim Rendern aufloesen (URL-Reverse, aktuelle Sprache),
+    # aber nicht bei jeder Formular-Instanz neu bauen
+    accept_terms = forms.BooleanField(required=True, label=lazy(_terms_label, SafeString)())
     accept_sepa = forms.BooleanField(
         required=True,
         label=_(
@@ -21,12 +37,8 @@ class RegistrationForm(forms.ModelForm):
 
     def __init__(self, *args, course=None, **kwargs):
         super().__init__(*args, **kwargs)
-        # set label lazily to avoid url reverse at import
-        url = reverse_lazy('privacy')
-        self.fields['accept_terms'].label = mark_safe(
-            _("Ich habe die <a href='%(url)s' target='_blank'>Datenschutzbestimmungen</a> gelesen und akzeptiere diese.")
-            % {'url': url}
-        )
+        if not self.is_bound:
+            self.initial.setdefault('submission_key', uuid.uuid4())
         # Halben Kurs nur anbieten, wenn der Kurs es erlaubt
         if course is not None and not course.allow_half:
             self.fields.pop('half_course', None)
@@ -45,42 +57,86 @@ class RegistrationForm(forms.ModelForm):
             'is_member':       _('Ich bin Vereinsmitglied'),
             'half_course':     _('Halber Kurs (50 %)'),
         }
+        help_texts = {
+            'bic': _('Kann bei deutschen IBANs leer bleiben – wird automatisch ergänzt.'),
+        }
 
     def clean(self):
         cleaned = super().clean()
         if not cleaned.get('accept_terms'):
             raise forms.ValidationError(_("Bitte akzeptiere die Datenschutzbestimmungen."))
-        # IBAN-Validierung
+        # IBAN-Validierung, BIC aus der Bankleitzahl ergaenzen
         iban = cleaned.get('iban')
         if iban:
-            iban_clean = iban.replace(' ', '').upper()
+            iban_clean = iban_utils.normalize(iban)
             cleaned['iban'] = iban_clean
-            error = self._validate_iban(iban_clean)
+            error = iban_utils.validation_error(iban_clean)
             if error:
                 self.add_error('iban', error)
+            else:
+                bic = iban_utils.normalize(cleaned.get('bic'))
+                cleaned['bic'] = bic or iban_utils.lookup_bic(iban_clean) or ''
         return cleaned
 
-    @staticmethod
-    def _validate_iban(iban):
-        """Gibt eine Fehlermeldung zurueck oder None wenn die IBAN gueltig ist."""
-        import re
-        # Grundformat: 2 Buchstaben (Laendercode) + 2 Ziffern (Pruefziffer) + bis 30 alphanumerisch
-        if not re.fullmatch(r'[A-Z]{2}[0-9]{2}[A-Z0-9]{11,30}', iban):
-            return _('Ungültige IBAN – Format: Ländercode (z. B. DE) + 2 Prüfziffern + Kontonummer.')
-        country = iban[:2]
-        # Bekannte Längenregeln
-        country_lengths = {
-            'DE': 22, 'AT': 20, 'CH': 21, 'NL': 18, 'BE': 16,
-            'FR': 27, 'ES': 24, 'IT': 27, 'PL': 28, 'GB': 22,
-        }
-        expected_len = country_lengths.get(country)
-        if expected_len and len(iban) != expected_len:
-            return _(
-                'IBAN für %(country)s muss genau %(n)d Zeichen lang sein (eingegeben: %(given)d).'
-            ) % {'country': country, 'n': expected_len, 'given': len(iban)}
-        # Mod-97-Prüfsumme (ISO 13616)
-        rearranged = iban[4:] + iban[:4]
-        numeric = ''.join(str(int(c, 36)) for c in rearranged)
-        if int(numeric) % 97 != 1:
-            return _('Die IBAN-Prüfziffer ist ungültig. Bitte Eingabe prüfen.')
-        return None
+
+class ImportForm(forms.Form):
+    """Admin-Upload fuer courses/importer.py."""
+    kind = forms.ChoiceField(
+        label=_('Inhalt'),
+        choices=[('registrations', _('Anmeldungen')), ('courses', _('Kurse'))],
+    )
+    file = forms.FileField(label=_('Datei (CSV oder XLSX)'))
+    course = forms.ModelChoiceField(
+        queryset=None, required=False, label=_('Kurs'),
+        help_text=_('Nur für Anmeldungen ohne Spalte "Kurs".'),
+    )
+    status = forms.ChoiceField(
+        label=_('Status'), choices=Registration.STATUS_CHOICES, initial='CONFIRMED',
+        help_text=_('Nur für Anmeldungen ohne Spalte "Status".'),
+    )
+    skip_invalid = forms.BooleanField(label=_('Fehlerhafte Zeilen überspringen'), required=False)
+    dry_run = forms.BooleanField(label=_('Nur prüfen (nichts speichern)'), required=False)
+
+    def __init__(self, *args, **kwargs):
+        from .models import Course
+        super().__init__(*args, **kwargs)
+        self.fields['course'].queryset = Course.objects.order_by('-start_date')
+
+
+class RolloverForm(forms.Form):
+    """Admin-Aktion Saisonwechsel (courses/rollover.py)."""
+    weeks = forms.IntegerField(
+        label=_('Termine verschieben um (Wochen)'), required=False, min_value=1, max_value=104,
+        help_text=_('Z. B. 26 für ein halbes Jahr. Leer = Folgekurse ohne Daten anlegen.'),
+    )
+
+
+class _LoadedInstanceChoiceField(forms.ModelChoiceField):
+    """PK-Feld einer Formset-Zeile: die Instanz kommt schon aus dem Formset-Queryset."""
+
+    def __init__(self, instance, *args, **kwargs):
+        self.instance = instance
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value not in self.empty_values and str(value) == str(self.instance.pk):
+            return self.instance
+        return super().to_python(value)
+
+
+class ChangelistFormSet(forms.BaseModelFormSet):
+    """list_editable ohne SELECT pro Zeile.
+
+    Django prueft die versteckte ID jeder Zeile mit einer eigenen
+    ``queryset.get(pk=...)``-Abfrage, obwohl die Instanz bereits aus dem
+    (berechtigungsgefilterten) Changelist-Queryset geladen wurde.
+    """
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        name = self._pk_field.name
+        field = form.fields[name]
+        if form.is_bound and form.instance.pk is not None and isinstance(field, forms.ModelChoiceField):
+            form.fields[name] = _LoadedInstanceChoiceField(
+                form.instance, field.queryset, initial=field.initial, required=False, widget=field.widget,
+            )
@@ -0,0 +1,472 @@
+"""
+Massenimport von Kursen und Anmeldungen aus CSV oder Excel (XLSX).
+
+Aufruf per Kommando (``python manage.py import_data``) oder im Admin
+(Kurse -> "Import"). Ablauf:
+
+1. Zeilen werden gestreamt gelesen – CSV mit erkanntem Trennzeichen,
+   XLSX über openpyxl im read-only-Modus. Die erste Zeile enthält die
+   Spaltennamen (deutsch wie im Admin oder Feldnamen, siehe ``COLUMNS``).
+2. Je Block von ``chunk_size`` Zeilen: Werte umwandeln und per
+   ``full_clean`` prüfen (ohne Unique-/FK-Abfragen), IBANs über
+   ``courses.iban`` prüfen (jede IBAN nur einmal) und BIC ergänzen.
+3. Dubletten gegen den Bestand mit einer Abfrage je Block (Kurs + E-Mail
+   bzw. Kursname + Beginn) und gegen frühere Zeilen der Datei. Dubletten
+   werden übersprungen, nicht als Fehler gewertet – ein erneuter Import
+   derselben Datei legt also nichts doppelt an.
+4. ``bulk_create`` je Block, alles in einer Transaktion. Gibt es fehlerhafte
+   Zeilen, wird ohne ``skip_invalid`` nichts übernommen.
+
+Es werden keine Mails verschickt und keine Signale ausgelöst.
+"""
+
+import csv
+import io
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from . import iban as iban_utils
+from .models import Course, Location, Registration, week_days
+
+KINDS = ('registrations', 'courses')
+
+# Spaltenname (klein, ohne Leerzeichen am Rand) -> Feld
+COLUMNS = {
+    'registrations': {
+        'kurs': 'course', 'kurs-id': 'course', 'course': 'course',
+        'vorname': 'first_name', 'first_name': 'first_name',
+        'nachname': 'last_name', 'last_name': 'last_name',
+        'e-mail': 'email', 'email': 'email',
+        'handy / telefon': 'phone', 'telefon': 'phone', 'handy': 'phone', 'phone': 'phone',
+        'iban': 'iban', 'bic': 'bic',
+        'kontoinhaber': 'account_holder', 'account_holder': 'account_holder',
+        'mitglied': 'is_member', 'is_member': 'is_member',
+        'halber kurs': 'half_course', 'half_course': 'half_course',
+        'status': 'status',
+        'individualbetrag': 'custom_price', 'custom_price': 'custom_price',
+        'bedingungen akzeptiert': 'terms_accepted', 'terms_accepted': 'terms_accepted',
+        'erstellt am': 'created', 'created': 'created',
+    },
+    'courses': {
+        'kursname': 'name', 'name': 'name',
+        'beschreibung': 'description', 'description': 'description',
+        'orte': 'locations', 'ort': 'locations', 'locations': 'locations',
+        'beginn': 'start_date', 'start_date': 'start_date',
+        'ende': 'end_date', 'end_date': 'end_date',
+        'startzeit': 'start_time', 'start_time': 'start_time',
+        'endzeit': 'end_time', 'end_time': 'end_time',
+        'wochentage': 'days', 'days': 'days',
+        'maximale teilnehmer': 'max_participants', 'max_participants': 'max_participants',
+        'preis mitglied': 'price_member', 'price_member': 'price_member',
+        'preis nicht-mitglied': 'price_non_member', 'price_non_member': 'price_non_member',
+        'halber kurs erlaubt': 'allow_half', 'allow_half': 'allow_half',
+        'anmeldung gesperrt': 'is_closed', 'is_closed': 'is_closed',
+        'kursleitung': 'instructor', 'instructor': 'instructor',
+        'einheitenmodus': 'session_mode', 'session_mode': 'session_mode',
+        'anzahl einheiten': 'num_sessions', 'num_sessions': 'num_sessions',
+        'kurstyp': 'course_type', 'course_type': 'course_type',
+        'sichtbar ab': 'publish_from', 'publish_from': 'publish_from',
+    },
+}
+
+REQUIRED = {
+    'registrations': {'first_name', 'last_name', 'email', 'iban'},
+    'courses': {'name', 'start_time', 'end_time', 'max_participants', 'price_member', 'price_non_member'},
+}
+
+
+class ImportFileError(Exception):
+    """Datei als Ganzes unlesbar (Format, Kopfzeile)."""
+
+
+@dataclass
+class RowError:
+    line: int
+    column: str
+    message: str
+
+
+@dataclass
+class ImportResult:
+    kind: str
+    created: int = 0
+    duplicates: list = field(default_factory=list)   # Zeilennummern
+    errors: list = field(default_factory=list)       # RowError
+    committed: bool = False
+
+
+class _Rollback(Exception):
+    pass
+
+
+class _Semicolon(csv.excel):
+    delimiter = ';'
+
+
+# ── Lesen ─────────────────────────────────────────────────────────────────────
+
+def read_rows(fileobj, filename, kind):
+    """Liefert (Zeilennummer, {Feld: Wert}) für jede nicht-leere Datenzeile."""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        rows = _xlsx_rows(fileobj)
+    elif filename.lower().endswith(('.csv', '.txt')):
+        rows = _csv_rows(fileobj)
+    else:
+        raise ImportFileError(_('Nur CSV- oder XLSX-Dateien können importiert werden.'))
+
+    header = next(rows, None)
+    if not header:
+        raise ImportFileError(_('Die Datei ist leer.'))
+    columns = [COLUMNS[kind].get(str(name or '').strip().lower()) for name in header]
+    missing = REQUIRED[kind] - set(columns)
+    if missing:
+        raise ImportFileError(
+            _('Pflichtspalten fehlen: %(columns)s') % {'columns': ', '.join(sorted(missing))}
+        )
+    for line, values in enumerate(rows, start=2):
+        row = {col: value for col, value in zip(columns, values) if col}
+        if any(value not in (None, '') for value in row.values()):
+            yield line, row
+
+
+def _csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+    except csv.Error:
+        dialect = _Semicolon
+    yield from csv.reader(text, dialect)
+
+
+def _xlsx_rows(fileobj):
+    from openpyxl import load_workbook
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as exc:
+        raise ImportFileError(_('Excel-Datei kann nicht gelesen werden: %(error)s') % {'error': exc})
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+# ── Werte umwandeln ───────────────────────────────────────────────────────────
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _bool(value):
+    return _text(value).lower() in ('1', 'x', 'ja', 'j', 'yes', 'true', 'wahr')
+
+
+def _decimal(value):
+    text = _text(value)
+    if not text:
+        return None
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        raise ValueError(_('Keine gültige Zahl.'))
+
+
+def _int(value):
+    number = _decimal(value)
+    return None if number is None else int(number)
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date) or value in (None, ''):
+        return value or None
+    for fmt in ('%d.%m.%Y', '%Y-%m-%d', '%d.%m.%y'):
+        try:
+            return datetime.strptime(_text(value), fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(_('Kein gültiges Datum (TT.MM.JJJJ).'))
+
+
+def _time(value):
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, time) or value in (None, ''):
+        return value or None
+    for fmt in ('%H:%M', '%H:%M:%S', '%H.%M'):
+        try:
+            return datetime.strptime(_text(value), fmt).time()
+        except ValueError:
+            pass
+    raise ValueError(_('Keine gültige Uhrzeit (HH:MM).'))
+
+
+def _datetime(value):
+    if value in (None, ''):
+        return None
+    if not isinstance(value, datetime):
+        text = _text(value)
+        for fmt in ('%d.%m.%Y %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+            try:
+                value = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                pass
+        else:
+            value = datetime.combine(_date(text), time(0, 0))
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def _choice(value, choices, default):
+    """Akzeptiert Schlüssel ('WAITLIST') oder Anzeigetext ('Warteliste')."""
+    text = _text(value).lower()
+    if not text:
+        return default
+    for key, label in choices:
+        if text in (str(key).lower(), str(label).lower()):
+            return key
+    raise ValueError(_('Unbekannter Wert "%(value)s".') % {'value': _text(value)})
+
+
+def _days(value):
+    days = []
+    for part in _text(value).replace(';', ',').replace('/', ',').split(','):
+        part = part.strip()
+        if part:
+            days.append(_choice(part, week_days(), None))
+    return days
+
+
+def _convert(line, row, converters, errors):
+    values = {}
+    for name, converter in converters.items():
+        try:
+            values[name] = converter(row.get(name))
+        except ValueError as exc:
+            errors.append(RowError(line, name, str(exc)))
+    return values
+
+
+def _validate(line, obj, exclude, errors):
+    try:
+        obj.full_clean(exclude=exclude, validate_unique=False, validate_constraints=False)
+    except ValidationError as exc:
+        for name, messages in exc.message_dict.items():
+            errors.extend(RowError(line, name, message) for message in messages)
+        return False
+    return True
+
+
+# ── Anmeldungen ───────────────────────────────────────────────────────────────
+
+class _RegistrationImport:
+    converters = {
+        'first_name': _text, 'last_name': _text, 'email': _text, 'phone': _text,
+        'account_holder': _text, 'is_member': _bool, 'half_course': _bool,
+        'terms_accepted': _bool, 'custom_price': _decimal, 'created': _datetime,
+    }
+
+    def __init__(self, course=None, status='CONFIRMED'):
+        self.default_course = course
+        self.default_status = status or 'CONFIRMED'
+        self.courses = {}
+        for pk, name in Course.objects.values_list('pk', 'name'):
+            self.courses[str(pk)] = pk
+            self.courses.setdefault(name.strip().lower(), pk)
+        self.ibans = {}      # normalisierte IBAN -> (Fehler, BIC)
+        self.seen = set()    # (Kurs, E-Mail) aus früheren Zeilen
+
+    def _iban(self, value):
+        normalized = iban_utils.normalize(_text(value))
+        if normalized not in self.ibans:
+            error = iban_utils.validation_error(normalized)
+            bic = None if error else iban_utils.lookup_bic(normalized)
+            self.ibans[normalized] = (error, bic)
+        return (normalized, *self.ibans[normalized])
+
+    def build(self, line, row, errors):
+        values = _convert(line, row, self.converters, errors)
+        course_key = _text(row.get('course')).lower()
+        course_id = self.courses.get(course_key) if course_key else getattr(self.default_course, 'pk', None)
+        if course_id is None:
+            errors.append(RowError(line, 'course', _('Kurs nicht gefunden.') if course_key else _('Kein Kurs angegeben.')))
+        try:
+            status = _choice(row.get('status'), Registration.STATUS_CHOICES, self.default_status)
+        except ValueError as exc:
+            errors.append(RowError(line, 'status', str(exc)))
+            status = self.default_status
+        iban, iban_error, bic = self._iban(row.get('iban'))
+        if iban_error:
+            errors.append(RowError(line, 'iban', str(iban_error)))
+        if errors:
+            return None
+
+        created = values.pop('created')
+        if not values['account_holder']:
+            values['account_holder'] = f"{values['first_name']} {values['last_name']}".strip()
+        obj = Registration(
+            course_id=course_id, status=status, iban=iban,
+            bic=iban_utils.normalize(_text(row.get('bic'))) or bic or '', **values,
+        )
+        obj._import_created = created
+        if not _validate(line, obj, ['course', 'iban'], errors):
+            return None
+        return obj
+
+    @staticmethod
+    def _key(obj):
+        return obj.course_id, obj.email.lower()
+
+    def flush(self, pending, result):
+        """Dubletten (eine Abfrage) aussortieren, Rest per bulk_create anlegen."""
+        active = [(line, obj) for line, obj in pending if obj.status != 'CANCELLED']
+        existing = set()
+        if active:
+            existing = set(
+                Registration.objects.exclude(status='CANCELLED')
+                .annotate(email_lower=Lower('email'))
+                .filter(course_id__in={obj.course_id for _, obj in active},
+                        email_lower__in={obj.email.lower() for _, obj in active})
+                .values_list('course_id', 'email_lower')
+            )
+        objs = []
+        for line, obj in pending:
+            if obj.status != 'CANCELLED':
+                key = self._key(obj)
+                if key in existing or key in self.seen:
+                    result.duplicates.append(line)
+                    continue
+                self.seen.add(key)
+            objs.append(obj)
+        Registration.objects.bulk_create(objs)
+        # auto_now_add ueberschreibt "created" beim Anlegen; historische Werte nachziehen
+        historical = [obj for obj in objs if obj._import_created]
+        for obj in historical:
+            obj.created = obj._import_created
+        Registration.objects.bulk_update(historical, ['created'])
+        result.created += len(objs)
+
+
+# ── Kurse ─────────────────────────────────────────────────────────────────────
+
+class _CourseImport:
+    converters = {
+        'name': _text, 'description': _text, 'instructor': _text,
+        'start_date': _date, 'end_date': _date, 'publish_from': _date,
+        'start_time': _time, 'end_time': _time, 'days': _days,
+        'max_participants': _int, 'num_sessions': _int,
+        'price_member': _decimal, 'price_non_member': _decimal,
+        'allow_half': _bool, 'is_closed': _bool,
+    }
+
+    def __init__(self, **kwargs):
+        self.locations = {name.strip().lower(): pk for pk, name in Location.objects.values_list('pk', 'name')}
+        self.seen = set()
+
+    def build(self, line, row, errors):
+        values = _convert(line, row, self.converters, errors)
+        try:
+            values['session_mode'] = _choice(row.get('session_mode'), Course.SESSION_MODE_CHOICES, Course.SESSION_MODE_AUTO)
+            values['course_type'] = _choice(row.get('course_type'), Course.COURSE_TYPE_CHOICES, Course.TYPE_OTHER)
+        except ValueError as exc:
+            errors.append(RowError(line, 'course_type', str(exc)))
+        location_ids = []
+        for name in _text(row.get('locations')).replace(',', ';').split(';'):
+            if name.strip():
+                pk = self.locations.get(name.strip().lower())
+                if pk is None:
+                    errors.append(RowError(line, 'locations', _('Ort "%(name)s" unbekannt.') % {'name': name.strip()}))
+                location_ids.append(pk)
+        if errors:
+            return None
+        obj = Course(**values)
+        obj.sync_days_mask()  # bulk_create umgeht Course.save()
+        obj._import_locations = location_ids
+        if not _validate(line, obj, ['instructor_user', 'locations'], errors):
+            return None
+        return obj
+
+    def flush(self, pending, result):
+        existing = set(
+            Course.objects.annotate(name_lower=Lower('name'))
+            .filter(name_lower__in={obj.name.lower() for _, obj in pending})
+            .values_list('name_lower', 'start_date')
+        )
+        objs = []
+        for line, obj in pending:
+            key = (obj.name.lower(), obj.start_date)
+            if key in existing or key in self.seen:
+                result.duplicates.append(line)
+                continue
+            self.seen.add(key)
+            objs.append(obj)
+        Course.objects.bulk_create(objs)
+        Course.locations.through.objects.bulk_create([
+            Course.locations.through(course_id=obj.pk, location_id=pk)
+            for obj in objs for pk in obj._import_locations
+        ])
+        # bulk_create umgeht Course.save(): Einheiten hier erzeugen
+        for obj in objs:
+            obj.generate_sessions()
+        result.created += len(objs)
+
+
+_IMPORTERS = {'registrations': _RegistrationImport, 'courses': _CourseImport}
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def import_file(fileobj, filename, kind, *, course=None, status=None,
+                skip_invalid=False, dry_run=False, chunk_size=1000):
+    """Importiert eine Datei. Wirft ImportFileError, wenn sie als Ganzes unbrauchbar ist."""
+    result = ImportResult(kind=kind)
+    try:
+        with transaction.atomic():
+            importer = _IMPORTERS[kind](course=course, status=status)
+            for chunk in _chunks(read_rows(fileobj, filename, kind), chunk_size):
+                pending = []
+                for line, row in chunk:
+                    row_errors = []
+                    obj = importer.build(line, row, row_errors)
+                    if obj is None:
+                        result.errors.extend(row_errors)
+                    else:
+                        pending.append((line, obj))
+                if pending:
+                    importer.flush(pending, result)
+            if dry_run or (result.errors and not skip_invalid):
+                raise _Rollback
+    except _Rollback:
+        return result
+    result.committed = True
+    return result
+
+
+def write_report(result, fh):
+    """Fehler- und Dublettenliste als CSV (Zeile;Spalte;Meldung)."""
+    writer = csv.writer(fh, delimiter=';')
+    writer.writerow([_('Zeile'), _('Spalte'), _('Meldung')])
+    for error in result.errors:
+        writer.writerow([error.line, error.column, error.message])
+    for line in result.duplicates:
+        writer.writerow([line, '', _('Bereits vorhanden – übersprungen')])
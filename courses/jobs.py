@@ -0,0 +1,93 @@
+"""
+Periodische Jobs für den Scheduler (courses/scheduler.py).
+
+Jeder Job bekommt die aktuelle Zeit ``now`` und gibt ein kurzes Ergebnis
+zurück, das im Admin unter "Geplante Jobs" erscheint.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+
+from .scheduler import job
+
+
+@job('drain_outbox', every=15)
+def drain_outbox(now):
+    """Postausgang zustellen (courses/outbox.py)."""
+    from . import outbox
+    from .scheduler import renew_lease
+    total_sent = total_failed = 0
+    # In Bloecken, bis nichts Faelliges mehr da ist (max. 10 Bloecke je Lauf);
+    # zwischen den Bloecken die Leader-Lease verlaengern
+    for _ in range(10):
+        sent, failed = outbox.drain(limit=100, now=now)
+        total_sent += sent
+        total_failed += failed
+        if sent + failed < 100 or not renew_lease():
+            break
+    return f'{total_sent} versendet, {total_failed} fehlgeschlagen'
+
+
+@job('notify_cancelled_sessions', every=60)
+def notify_cancelled_sessions(now):
+    """Teilnehmer ausgefallener Einheiten benachrichtigen (courses/notifications.py)."""
+    from . import notifications
+    return f'{notifications.notify_cancelled_sessions(now)} Ausfall-Mails'
+
+
+@job('send_session_reminders', every=24 * 3600)
+def send_session_reminders(now):
+    """Erinnerung vor der ersten Einheit eines Kurses versenden."""
+    from . import notifications
+    return f'{notifications.send_session_reminders(now)} Erinnerungen'
+
+
+@job('expire_caches', every=600)
+def expire_caches(now):
+    """Abgelaufene Eintraege aus Datei-/DB-Caches, Warteraum und Rate-Limit-Store entfernen."""
+    from django.core.cache import caches
+    from django.core.cache.backends.db import DatabaseCache
+    from django.core.cache.backends.filebased import FileBasedCache
+    from django.db import connections, router
+
+    removed = 0
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        if isinstance(cache, FileBasedCache):
+            for path in cache._list_cache_files():
+                with open(path, 'rb') as fh:
+                    removed += cache._is_expired(fh)  # loescht abgelaufene Dateien selbst
+        elif isinstance(cache, DatabaseCache):
+            connection = connections[router.db_for_write(cache.cache_model_class)]
+            table = connection.ops.quote_name(cache._table)
+            expired = connection.ops.adapt_datetimefield_value(now.replace(microsecond=0))
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {table} WHERE expires < %s', [expired])
+                removed += cursor.rowcount
+    from . import admission, ratelimit
+    if admission.enabled():
+        removed += admission.get_store().prune()
+    store = ratelimit.get_store()
+    if store is not None:
+        removed += store.prune()
+    return removed
+
+
+@job('prune_old_data', every=24 * 3600)
+def prune_old_data(now):
+    """Abgelaufene Sessions, alte Postausgang-Mails und Stand entfernter Jobs loeschen."""
+    from importlib import import_module
+    from . import outbox
+    from .models import ScheduledJob
+    from .scheduler import JOBS
+
+    ScheduledJob.objects.exclude(name__in=list(JOBS)).delete()
+
+    engine = import_module(settings.SESSION_ENGINE)
+    try:
+        engine.SessionStore.clear_expired()
+    except NotImplementedError:
+        pass
+    days = getattr(settings, 'OUTBOX_RETENTION_DAYS', 30)
+    return f'{outbox.prune(timedelta(days=days), now=now)} alte Mails gelöscht'
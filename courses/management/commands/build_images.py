@@ -0,0 +1,120 @@
+"""
+Erzeugt responsive Varianten der statischen Bilder (Kursplan, Wappen).
+
+Je Quellbild und Breite entstehen AVIF, WebP und PNG (Fallback) mit
+Inhalts-Hash im Dateinamen, dazu ``manifest.json``. Der Template-Tag
+``{% picture %}`` (courses/templatetags/responsive_images.py) baut daraus
+``<picture>`` mit ``srcset``, ``width``/``height`` und ``loading="lazy"``.
+
+Beim Deploy vor collectstatic ausführen:
+
+    python manage.py build_images
+    python manage.py collectstatic --noinput
+
+Unveränderte Quellbilder werden übersprungen (``--force`` baut alles neu).
+"""
+
+import hashlib
+import io
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Quellbild (relativ zu STATICFILES_DIRS[0]) -> Zielbreiten in Pixeln.
+# Kursplan: max. 960 px breit dargestellt (1x/Handy/2x), Wappen: 80 px hoch (1x–3x).
+IMAGES = {
+    'courses/img/kursplan.png': (360, 720, 1080),
+    'courses/img/kursplan2.png': (360, 720, 1080),
+    'courses/img/wappen-farbig.png': (60, 120, 180),
+}
+
+FORMATS = {
+    'avif': {'quality': 55, 'speed': 6},
+    'webp': {'quality': 80, 'method': 6},
+    'png': {'optimize': True},
+}
+
+
+def _encode(image, fmt):
+    buf = io.BytesIO()
+    image.save(buf, format=fmt.upper(), **FORMATS[fmt])
+    return buf.getvalue()
+
+
+class Command(BaseCommand):
+    help = 'Erzeugt AVIF/WebP/PNG-Varianten der statischen Bilder für <picture>/srcset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Auch unveränderte Bilder neu erzeugen')
+
+    def handle(self, *args, **options):
+        try:
+            from PIL import Image
+        except ImportError:
+            raise CommandError('Pillow ist nicht installiert (pip install -r requirements.txt).')
+
+        source_root = Path(settings.STATICFILES_DIRS[0])
+        build_dir = Path(settings.RESPONSIVE_IMAGES_DIR)
+        build_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = build_dir / 'manifest.json'
+        manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+        static_prefix = build_dir.relative_to(source_root).as_posix()
+
+        for name, widths in IMAGES.items():
+            source = source_root / name
+            if not source.exists():
+                raise CommandError(f'Quellbild fehlt: {source}')
+            digest = hashlib.sha256(source.read_bytes()).hexdigest()
+            entry = manifest.get(name)
+            if (
+                entry and entry['source'] == digest and not options['force']
+                and all((source_root / path).exists()
+                        for variants in entry['variants'].values() for _, path in variants)
+            ):
+                self.stdout.write(f'{name}: unverändert')
+                continue
+
+            with Image.open(source) as original:
+                original.load()
+            # Vollständig deckender Alphakanal kostet nur Bytes
+            if original.mode == 'RGBA' and original.getchannel('A').getextrema() == (255, 255):
+                original = original.convert('RGB')
+
+            variants = {fmt: [] for fmt in FORMATS}
+            before = source.stat().st_size
+            sizes = []
+            for width in sorted({min(w, original.width) for w in widths}):
+                height = round(original.height * width / original.width)
+                resized = original.resize((width, height), Image.LANCZOS)
+                for fmt in FORMATS:
+                    data = _encode(resized, fmt)
+                    if fmt == 'png' and len(data) >= before:
+                        continue  # Original ist kleiner (Palette), siehe unten
+                    file_name = f'{source.stem}-{width}w.{hashlib.sha256(data).hexdigest()[:10]}.{fmt}'
+                    (build_dir / file_name).write_bytes(data)
+                    variants[fmt].append((width, f'{static_prefix}/{file_name}'))
+                    sizes.append(f'{fmt} {width}w {len(data) // 1024} KB')
+            # Das Original bleibt groesste PNG-Stufe und src fuer alte Browser
+            if not variants['png'] or variants['png'][-1][0] < original.width:
+                variants['png'].append((original.width, name))
+            manifest[name] = {
+                'source': digest,
+                'width': original.width,
+                'height': original.height,
+                'variants': variants,
+            }
+            self.stdout.write(f'{name} ({before // 1024} KB): ' + ', '.join(sizes))
+
+        manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        self._remove_stale(build_dir, manifest)
+        self.stdout.write(self.style.SUCCESS(f'Manifest geschrieben: {manifest_path}'))
+
+    def _remove_stale(self, build_dir, manifest):
+        """Varianten aus früheren Builds löschen (Namen ändern sich mit dem Inhalt)."""
+        current = {Path(path).name for entry in manifest.values()
+                   for variants in entry['variants'].values() for _, path in variants}
+        for path in build_dir.iterdir():
+            if path.suffix.lstrip('.') in FORMATS and path.name not in current:
+                path.unlink()
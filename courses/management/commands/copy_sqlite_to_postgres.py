@@ -0,0 +1,120 @@
+"""
+Kopiert eine bestehende SQLite-Datenbank (db.sqlite3) in die PostgreSQL-
+Datenbank aus DATABASE_URL.
+
+Ablauf auf dem Server:
+    DATABASE_URL=postgres://... python manage.py migrate
+    DATABASE_URL=postgres://... python manage.py copy_sqlite_to_postgres --source db.sqlite3
+
+Die Zieltabellen werden per ``migrate`` angelegt; das Kommando leert sie
+(TRUNCATE) und überträgt alle Zeilen tabellenweise per COPY in Batches.
+Alles läuft in einer Transaktion – Fremdschlüssel sind in PostgreSQL
+DEFERRABLE und werden erst beim Commit geprüft, die Tabellenreihenfolge spielt
+also keine Rolle. Danach werden die ID-Sequenzen auf den Höchstwert gesetzt.
+"""
+
+import sqlite3
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+# Werden von migrate im Ziel automatisch befüllt und dürfen überschrieben werden
+AUTO_FILLED_TABLES = {'django_content_type', 'auth_permission'}
+
+
+class Command(BaseCommand):
+    help = 'Kopiert alle Daten aus einer SQLite-Datei in die PostgreSQL-Datenbank (DATABASE_URL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=str(Path(settings.BASE_DIR) / 'db.sqlite3'),
+                            help='Pfad zur SQLite-Datei (Standard: db.sqlite3)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Zeilen pro Lese-/COPY-Batch')
+        parser.add_argument('--truncate', action='store_true',
+                            help='Ziel auch dann überschreiben, wenn es bereits Daten enthält')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Ziel ist keine PostgreSQL-Datenbank – DATABASE_URL setzen.')
+        source = Path(options['source'])
+        if not source.exists():
+            raise CommandError(f'SQLite-Datei nicht gefunden: {source}')
+
+        src = sqlite3.connect(f'file:{source}?mode=ro', uri=True)
+        try:
+            source_tables = {
+                row[0] for row in src.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+            models = self._models(source_tables)
+            if not options['truncate']:
+                self._ensure_target_empty(models)
+
+            with transaction.atomic():
+                self._truncate(models)
+                for model in models:
+                    copied = self._copy_table(src, model, options['batch_size'])
+                    self.stdout.write(f'{model._meta.db_table}: {copied} Zeilen')
+                self._reset_sequences(models)
+        finally:
+            src.close()
+
+        self.stdout.write(self.style.SUCCESS(f'{len(models)} Tabellen übertragen.'))
+
+    def _models(self, source_tables):
+        """Alle verwalteten Modelle (inkl. M2M-Tabellen), deren Tabelle in der Quelle existiert."""
+        models, seen = [], set()
+        for model in apps.get_models(include_auto_created=True):
+            table = model._meta.db_table
+            if not model._meta.managed or model._meta.proxy or table in seen:
+                continue
+            seen.add(table)
+            if table not in source_tables:
+                self.stdout.write(self.style.WARNING(f'{table}: fehlt in der Quelle, übersprungen'))
+                continue
+            models.append(model)
+        return models
+
+    def _ensure_target_empty(self, models):
+        filled = [
+            model._meta.db_table for model in models
+            if model._meta.db_table not in AUTO_FILLED_TABLES and model._default_manager.exists()
+        ]
+        if filled:
+            raise CommandError(
+                'Ziel enthält bereits Daten (' + ', '.join(filled) + '). '
+                'Mit --truncate überschreiben.'
+            )
+
+    def _truncate(self, models):
+        tables = ', '.join(connection.ops.quote_name(m._meta.db_table) for m in models)
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {tables} RESTART IDENTITY CASCADE')
+
+    def _copy_table(self, src, model, batch_size):
+        qn = connection.ops.quote_name
+        table = model._meta.db_table
+        source_columns = {row[1] for row in src.execute(f'PRAGMA table_info("{table}")')}
+        columns = [f.column for f in model._meta.local_concrete_fields if f.column in source_columns]
+
+        rows = src.execute(
+            'SELECT ' + ', '.join(f'"{c}"' for c in columns) + f' FROM "{table}"'
+        )
+        copied = 0
+        with connection.cursor() as cursor:
+            # Rohen psycopg-Cursor für COPY ... FROM STDIN verwenden
+            copy_sql = f'COPY {qn(table)} ({", ".join(qn(c) for c in columns)}) FROM STDIN'
+            with cursor.cursor.copy(copy_sql) as copy:
+                while batch := rows.fetchmany(batch_size):
+                    for row in batch:
+                        copy.write_row(row)
+                    copied += len(batch)
+        return copied
+
+    def _reset_sequences(self, models):
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
@@ -0,0 +1,68 @@
+"""
+Erzeugt die BIC-Tabelle (settings.BIC_TABLE) aus der Bankleitzahlendatei der
+Deutschen Bundesbank.
+
+Download (vierteljährlich aktualisiert) unter bundesbank.de ->
+Aufgaben -> Unbarer Zahlungsverkehr -> Bankleitzahlen, Format TXT oder CSV:
+
+    python manage.py import_bic_table blz-aktuell-txt-data.txt
+
+Im TXT-Format (feste Spaltenbreite, ISO-8859-1) steht die BLZ in Spalte 1–8,
+das Merkmal in Spalte 9 und der BIC in Spalte 140–150. Nachgeordnete
+Filialen (Merkmal 2) haben oft keinen BIC; dann gilt der BIC des
+Hauptsatzes (Merkmal 1) derselben BLZ.
+"""
+
+import csv
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import iban
+
+
+def _parse_txt(lines):
+    for line in lines:
+        if len(line) >= 150:
+            yield line[0:8], line[8], line[139:150].strip()
+
+
+def _parse_csv(lines):
+    reader = csv.DictReader(lines, delimiter=';')
+    for row in reader:
+        yield row.get('Bankleitzahl', ''), row.get('Merkmal', ''), (row.get('BIC') or '').strip()
+
+
+class Command(BaseCommand):
+    help = 'Importiert die Bankleitzahlendatei der Bundesbank als BIC-Tabelle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Bankleitzahlendatei (TXT oder CSV)')
+        parser.add_argument('--output', default=None,
+                            help='Zieldatei (Standard: settings.BIC_TABLE)')
+
+    def handle(self, *args, **options):
+        source = Path(options['source'])
+        if not source.exists():
+            raise CommandError(f'Datei nicht gefunden: {source}')
+        output = options['output'] or str(settings.BIC_TABLE)
+
+        with open(source, encoding='iso-8859-1', newline='') as fh:
+            first = fh.readline()
+            fh.seek(0)
+            rows = _parse_csv(fh) if ';' in first else _parse_txt(fh)
+            entries = {}
+            for blz, merkmal, bic in rows:
+                if not (blz.isdigit() and len(blz) == 8 and bic):
+                    continue
+                if not iban.BIC_FORMAT.fullmatch(bic):
+                    continue
+                # Hauptsatz hat Vorrang vor Filialen
+                if merkmal == '1' or ('DE', blz) not in entries:
+                    entries[('DE', blz)] = bic
+
+        if not entries:
+            raise CommandError('Keine Einträge mit BIC gefunden – falsches Dateiformat?')
+        count = iban.write_table(output, entries)
+        self.stdout.write(self.style.SUCCESS(f'{count} Bankleitzahlen nach {output} geschrieben.'))
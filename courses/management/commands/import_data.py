@@ -0,0 +1,73 @@
+"""
+Importiert Kurse oder Anmeldungen aus einer CSV- oder XLSX-Datei
+(Details und Spaltennamen: courses/importer.py).
+
+    python manage.py import_data courses kurse.xlsx
+    python manage.py import_data registrations alt.csv --course 12 --status WAITLIST
+    python manage.py import_data registrations alt.xlsx --dry-run --report fehler.csv
+"""
+
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.importer import KINDS, ImportFileError, import_file, write_report
+from courses.models import Course, Registration
+
+
+class Command(BaseCommand):
+    help = 'Importiert Kurse oder Anmeldungen aus CSV/XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS)
+        parser.add_argument('path', help='CSV- oder XLSX-Datei')
+        parser.add_argument('--course', type=int,
+                            help='Kurs-ID für Anmeldungen ohne Spalte "Kurs"')
+        parser.add_argument('--status', choices=[key for key, _ in Registration.STATUS_CHOICES],
+                            help='Status für Anmeldungen ohne Spalte "Status" (Standard: CONFIRMED)')
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help='Fehlerhafte Zeilen überspringen statt nichts zu importieren')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Nur prüfen, nichts speichern')
+        parser.add_argument('--report', help='Fehlerliste als CSV schreiben ("-" = Ausgabe)')
+
+    def handle(self, *args, **options):
+        course = None
+        if options['course']:
+            course = Course.objects.filter(pk=options['course']).first()
+            if course is None:
+                raise CommandError(f'Kurs {options["course"]} nicht gefunden.')
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as fh:
+                result = import_file(
+                    fh, options['path'], options['kind'], course=course, status=options['status'],
+                    skip_invalid=options['skip_invalid'], dry_run=options['dry_run'],
+                )
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        if options['report'] == '-':
+            write_report(result, sys.stdout)
+        elif options['report']:
+            with open(options['report'], 'w', encoding='utf-8-sig', newline='') as fh:
+                write_report(result, fh)
+        else:
+            for error in result.errors[:20]:
+                self.stderr.write(f'Zeile {error.line}, {error.column}: {error.message}')
+            if len(result.errors) > 20:
+                self.stderr.write(f'... {len(result.errors) - 20} weitere (--report für alle)')
+
+        summary = (
+            f'{result.created} angelegt, {len(result.duplicates)} Dubletten übersprungen, '
+            f'{len(result.errors)} Fehler ({elapsed:.1f} s)'
+        )
+        if result.committed:
+            self.stdout.write(self.style.SUCCESS(summary))
+        elif options['dry_run']:
+            self.stdout.write(f'Probelauf, nichts gespeichert: {summary}')
+        else:
+            raise CommandError(f'Nichts importiert (fehlerhafte Zeilen, siehe oben): {summary}')
@@ -0,0 +1,55 @@
+"""
+Startet den Scheduler für zeitabhängige Aufgaben (courses/scheduler.py).
+
+    python manage.py run_scheduler              # Dauerbetrieb (systemd)
+    python manage.py run_scheduler --once       # fällige Jobs einmal ausführen (Cron/Test)
+    python manage.py run_scheduler --run drain_outbox   # einen Job sofort ausführen
+    python manage.py run_scheduler --list
+
+Mehrere Prozesse sind erlaubt; Jobs führt nur der Inhaber der Leader-Lease aus.
+"""
+
+import signal
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import scheduler
+
+
+class Command(BaseCommand):
+    help = 'Führt periodische Jobs aus (Postausgang, Einheiten-Mails, Aufräumen)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Fällige Jobs einmal ausführen und beenden')
+        parser.add_argument('--run', action='append', metavar='JOB', help='Diesen Job sofort ausführen (mehrfach möglich)')
+        parser.add_argument('--list', action='store_true', help='Jobs und Intervalle anzeigen')
+        parser.add_argument('--tick', type=int, help='Sekunden zwischen zwei Durchläufen (Standard: SCHEDULER_TICK)')
+
+    def handle(self, *args, **options):
+        jobs = scheduler.load_jobs()
+        if options['list']:
+            for spec in jobs.values():
+                self.stdout.write(f'{spec.name:<24} alle {int(spec.interval.total_seconds()):>6} s  {spec.description}')
+            return
+        if options['once'] or options['run']:
+            unknown = set(options['run'] or ()) - set(jobs)
+            if unknown:
+                raise CommandError(f'Unbekannte Jobs: {", ".join(sorted(unknown))}')
+            holder = scheduler.holder_id()
+            if not scheduler.acquire_lease(holder, timedelta(minutes=5)):
+                raise CommandError('Ein anderer Scheduler-Prozess ist gerade Leader.')
+            try:
+                results = scheduler.run_due(only=options['run'])
+            finally:
+                scheduler.release_lease(holder)
+            for name, result in results.items():
+                self.stdout.write(f'{name}: {result}')
+            return
+
+        stopping = []
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: stopping.append(True))
+        self.stdout.write(f'Scheduler gestartet ({len(jobs)} Jobs), Beenden mit Strg+C')
+        scheduler.run_forever(tick=options['tick'], stop=lambda: bool(stopping), log=self.stdout.write)
+        self.stdout.write('Scheduler beendet.')
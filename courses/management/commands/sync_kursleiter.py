@@ -1,94 +1,80 @@
 """Management Command: Synchronisiert Kursanmeldungs-User aus ClubAuth.
 
-Ruft den ClubAuth-Endpoint /api/app-users/?app=kursanmeldung ab und legt
-fehlende Django-User in der Kursanmeldungs-Datenbank an (oder aktualisiert sie).
+Ruft den ClubAuth-Endpoint /api/app-users/?app=kursanmeldung ab und gleicht
+die Django-User per Diff ab: fehlende User werden angelegt, geänderte
+aktualisiert, Gruppen (Kursleitung/Kassierer) passend zur Rolle gesetzt und
+Staff-User, die ClubAuth nicht mehr liefert, deaktiviert.
 So können Kursleiter als instructor_user hinterlegt werden, bevor sie sich
 das erste Mal eingeloggt haben.
 
+Unabhängig von der Anzahl der User sind es nur wenige Queries
+(siehe courses.clubauth.UserSyncPlan).
+
 Verwendung auf dem Server:
     python manage.py sync_kursleiter
+    python manage.py sync_kursleiter --dry-run      # nur anzeigen, nichts schreiben
+    python manage.py sync_kursleiter -v 2           # jede Änderung einzeln ausgeben
 """
 
-import requests
 from django.core.management.base import BaseCommand, CommandError
-from django.contrib.auth.models import User, Group
 from django.conf import settings
 
+from courses import clubauth
+
 
 class Command(BaseCommand):
     help = "Synchronisiert Kursanmeldungs-User aus ClubAuth"
 
-    def handle(self, *args, **options):
-        base_url = getattr(settings, "OIDC_INTERNAL_URL",
-                           getattr(settings, "OIDC_BASE_URL", "")).rstrip("/")
-        api_key = getattr(settings, "INTERNAL_API_KEY", "")
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Nur die geplanten Änderungen zusammenfassen, nichts speichern.",
+        )
+        parser.add_argument(
+            "--keep-missing",
+            action="store_true",
+            help="User, die ClubAuth nicht mehr liefert, nicht deaktivieren.",
+        )
 
-        if not base_url or not api_key:
+    def handle(self, *args, **options):
+        if not clubauth.internal_url() or not getattr(settings, "INTERNAL_API_KEY", ""):
             raise CommandError(
                 "OIDC_BASE_URL (oder OIDC_INTERNAL_URL) und INTERNAL_API_KEY "
                 "müssen in den Settings gesetzt sein."
             )
 
-        url = f"{base_url}/api/app-users/?app=kursanmeldung"
         try:
-            resp = requests.get(
-                url,
-                headers={"Authorization": f"Bearer {api_key}"},
-                timeout=10,
-            )
-            resp.raise_for_status()
-        except requests.RequestException as e:
+            users_data = clubauth.fetch_app_users()
+        except clubauth.ClubAuthError as e:
             raise CommandError(f"Fehler beim Abruf von ClubAuth: {e}")
 
-        users_data = resp.json().get("users", [])
         if not users_data:
+            # Leere Antwort nie als "alle deaktivieren" interpretieren
             self.stdout.write(self.style.WARNING("Keine User von ClubAuth erhalten."))
             return
 
-        kursleitung_group, _ = Group.objects.get_or_create(name="Kursleitung")
-        kassierer_group, _   = Group.objects.get_or_create(name="Kassierer")
-
-        created = updated = 0
-        for entry in users_data:
-            email      = entry.get("email", "").lower().strip()
-            first_name = entry.get("first_name", "")
-            last_name  = entry.get("last_name", "")
-            role       = entry.get("role", "")
-
-            if not email:
-                continue
-
-            user, is_new = User.objects.update_or_create(
-                username=email,
-                defaults={
-                    "email":      email,
-                    "first_name": first_name,
-                    "last_name":  last_name,
-                    "is_staff":   True,
-                    "is_active":  True,
-                },
-            )
+        plan = clubauth.UserSyncPlan(users_data, deactivate_missing=not options["keep_missing"])
 
-            # Gruppen synchronisieren
-            if role == "kursleitung":
-                user.groups.add(kursleitung_group)
-                user.groups.remove(kassierer_group)
-            elif role == "kassierer":
-                user.groups.add(kassierer_group)
-                user.groups.remove(kursleitung_group)
-            elif role in ("verwaltung", "admin"):
-                user.groups.remove(kursleitung_group)
-                user.groups.remove(kassierer_group)
+        if options["verbosity"] >= 2:
+            for user in plan.to_create:
+                self.stdout.write(f"  Neu angelegt: {user.email}")
+            for user in plan.to_update:
+                self.stdout.write(f"  Aktualisiert: {user.email}")
+            for user in plan.to_deactivate:
+                self.stdout.write(f"  Deaktiviert:  {user.email or user.username}")
 
-            if is_new:
-                created += 1
-                self.stdout.write(f"  Neu angelegt: {email} ({role})")
-            else:
-                updated += 1
-                self.stdout.write(f"  Aktualisiert: {email} ({role})")
+        if options["dry_run"]:
+            summary = plan.summary()
+            prefix = "Dry-Run (nichts gespeichert)"
+        else:
+            summary = plan.apply()
+            prefix = "Fertig"
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Fertig: {created} angelegt, {updated} aktualisiert."
+                f"{prefix}: {summary['created']} angelegt, {summary['updated']} aktualisiert, "
+                f"{summary['unchanged']} unverändert, {summary['deactivated']} deaktiviert, "
+                f"Gruppen +{summary['groups_added']}/-{summary['groups_removed']}."
             )
         )
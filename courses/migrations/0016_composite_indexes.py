@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0015_add_close_on_start'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['end_date', 'publish_from'], name='course_end_publish_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursesession',
+            index=models.Index(condition=models.Q(('is_cancelled', False)), fields=['course', 'date'], name='session_course_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['course', 'status', 'created'], name='reg_course_status_created_idx'),
+        ),
+    ]
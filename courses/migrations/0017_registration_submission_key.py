@@ -0,0 +1,56 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+def check_duplicate_registrations(apps, schema_editor):
+    """Vor dem Unique-Constraint (0018): bricht ab, wenn ein Kurs mehrere aktive
+    Anmeldungen mit derselben E-Mail hat.
+
+    Dubletten werden bewusst nicht automatisch storniert – eine stornierte
+    Anmeldung wird nicht mehr abgerechnet. Gruppiert wird mit derselben
+    ``Lower('email')``-Funktion der Datenbank wie im Constraint, damit genau die
+    Faelle gemeldet werden, an denen der Constraint scheitern wuerde.
+    """
+    from django.db.models import Count
+    from django.db.models.functions import Lower
+
+    Registration = apps.get_model('courses', 'Registration')
+    active = Registration.objects.exclude(status='CANCELLED').annotate(email_lower=Lower('email'))
+    groups = (
+        active.values('course_id', 'email_lower')
+        .annotate(count=Count('pk')).filter(count__gt=1).order_by()
+        .values_list('course_id', 'email_lower')
+    )
+    conflicts = []
+    for course_id, email_lower in groups:
+        rows = (
+            active.filter(course_id=course_id, email_lower=email_lower)
+            .order_by('created', 'pk').values_list('pk', 'email', 'status')
+        )
+        conflicts.append(
+            f'  Kurs {course_id}: ' + ', '.join(f'#{pk} {email} ({status})' for pk, email, status in rows)
+        )
+    if conflicts:
+        raise RuntimeError(
+            'Mehrere aktive Anmeldungen mit derselben E-Mail im selben Kurs:\n'
+            + '\n'.join(conflicts)
+            + '\nBitte im Admin pruefen und ueberzaehlige Anmeldungen stornieren, '
+            'danach "manage.py migrate" erneut ausfuehren.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0016_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='submission_key',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True, verbose_name='Formular-Schlüssel'),
+        ),
+        migrations.RunPython(check_duplicate_registrations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:20
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Getrennt von 0017, damit Datenbereinigung und Schema-Aenderung nicht in
+    derselben Transaktion laufen (PostgreSQL: "pending trigger events")."""
+
+    dependencies = [
+        ('courses', '0017_registration_submission_key'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='registration',
+            constraint=models.UniqueConstraint(models.F('course'), django.db.models.functions.text.Lower('email'), condition=models.Q(('status', 'CANCELLED'), _negated=True), name='reg_active_email_per_course_uniq', violation_error_message='Mit dieser E-Mail-Adresse besteht bereits eine Anmeldung für diesen Kurs.'),
+        ),
+    ]
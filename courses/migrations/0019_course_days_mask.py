@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:39
+
+from django.db import migrations, models
+
+# Stand dieser Migration (entspricht courses.models.WEEKDAY_BITS)
+WEEKDAY_BITS = {'Mo': 1, 'Di': 2, 'Mi': 4, 'Do': 8, 'Fr': 16, 'Sa': 32, 'So': 64}
+
+
+def fill_days_mask(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    courses = []
+    for course in Course.objects.only('pk', 'days'):
+        days = course.days.split(',') if isinstance(course.days, str) else course.days or []
+        course.days_mask = sum({WEEKDAY_BITS.get(code.strip(), 0) for code in days})
+        courses.append(course)
+    Course.objects.bulk_update(courses, ['days_mask'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0018_registration_unique_active_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='days_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Wochentage (Bitmaske)'),
+        ),
+        migrations.RunPython(fill_days_mask, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['days_mask'], name='course_days_mask_idx'),
+        ),
+    ]
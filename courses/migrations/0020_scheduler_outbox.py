@@ -0,0 +1,63 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0019_course_days_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Job')),
+                ('next_run', models.DateTimeField(blank=True, null=True, verbose_name='Nächster Lauf')),
+                ('last_run', models.DateTimeField(blank=True, null=True, verbose_name='Letzter Lauf')),
+                ('last_duration', models.FloatField(blank=True, null=True, verbose_name='Dauer (s)')),
+                ('last_result', models.CharField(blank=True, max_length=200, verbose_name='Ergebnis')),
+                ('last_error', models.TextField(blank=True, verbose_name='Letzter Fehler')),
+                ('run_count', models.PositiveIntegerField(default=0, verbose_name='Läufe')),
+            ],
+            options={
+                'verbose_name': 'Geplanter Job',
+                'verbose_name_plural': 'Geplante Jobs',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SchedulerLease',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('holder', models.CharField(max_length=200)),
+                ('expires', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Scheduler-Lease',
+                'verbose_name_plural': 'Scheduler-Leases',
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Erstellt am')),
+                ('subject', models.CharField(max_length=255, verbose_name='Betreff')),
+                ('recipients', models.TextField(verbose_name='Empfänger')),
+                ('message', models.BinaryField()),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Versuche')),
+                ('next_attempt', models.DateTimeField(verbose_name='Nächster Versuch')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Versendet am')),
+                ('last_error', models.TextField(blank=True, verbose_name='Letzter Fehler')),
+            ],
+            options={
+                'verbose_name': 'E-Mail (Postausgang)',
+                'verbose_name_plural': 'E-Mails (Postausgang)',
+                'ordering': ['-created'],
+                'indexes': [models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['next_attempt'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0020_scheduler_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursesession',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Ausgefallen seit'),
+        ),
+        migrations.CreateModel(
+            name='SessionNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('CANCELLED', 'Ausfall'), ('REMINDER', 'Erinnerung')], max_length=10, verbose_name='Art')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Erstellt am')),
+                ('date', models.DateField(verbose_name='Datum der Einheit')),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_notifications', to='courses.registration', verbose_name='Anmeldung')),
+            ],
+            options={
+                'verbose_name': 'Einheiten-Benachrichtigung',
+                'verbose_name_plural': 'Einheiten-Benachrichtigungen',
+                'ordering': ['-created'],
+                'constraints': [models.UniqueConstraint(fields=('registration', 'date', 'kind'), name='session_notification_once')],
+            },
+        ),
+    ]
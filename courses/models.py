@@ -1,5 +1,8 @@
 import uuid
+from functools import lru_cache
+
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 from multiselectfield import MultiSelectField
 
@@ -28,6 +31,65 @@ def week_days():
     ]
 
 
+# Wochentage als Bitmaske: Bit n = date.weekday() n (Mo = 1, Di = 2, Mi = 4, ... So = 64)
+WEEKDAY_BITS = {code: 1 << index for index, (code, _label) in enumerate(week_days())}
+_DAY_CODES = tuple(WEEKDAY_BITS)
+
+
+def days_to_mask(days):
+    """['Mo', 'Mi'] (oder 'Mo,Mi') -> 0b101; unbekannte Codes werden ignoriert."""
+    if isinstance(days, str):
+        days = days.split(',')
+    mask = 0
+    for code in days or ():
+        mask |= WEEKDAY_BITS.get(code.strip(), 0)
+    return mask
+
+
+def mask_to_days(mask):
+    """0b101 -> ['Mo', 'Mi'] in Wochenreihenfolge."""
+    return [code for index, code in enumerate(_DAY_CODES) if mask >> index & 1]
+
+
+def masks_with_day(bit):
+    """Alle 7-Bit-Masken, die ``bit`` enthalten (für ``days_mask__in`` über den Index)."""
+    return [mask for mask in range(1 << len(_DAY_CODES)) if mask & bit]
+
+
+@lru_cache(maxsize=16)
+def nrw_holidays(first_year, last_year):
+    """NRW-Feiertage der Jahre first_year bis last_year (einschliesslich), einmal je Prozess."""
+    try:
+        import holidays as hol_lib
+        return frozenset(hol_lib.Germany(state='NW', years=range(first_year, last_year + 1)))
+    except Exception:
+        return frozenset()
+
+
+class CourseQuerySet(models.QuerySet):
+    def on_weekday(self, *days):
+        """Kurse, die an mindestens einem der Tage stattfinden: on_weekday('Mi') oder on_weekday(2).
+
+        Statt ``days__contains`` (LIKE-Scan, 'o' passt auf Mo/Do/So) wird gegen die
+        Menge aller Masken mit dem Bit gefiltert – das nutzt ``course_days_mask_idx``.
+        """
+        bit = 0
+        for day in days:
+            if isinstance(day, int):
+                bit |= 1 << day if 0 <= day < len(_DAY_CODES) else 0
+            else:
+                bit |= WEEKDAY_BITS.get(day, 0)
+        if not bit:
+            return self.none()
+        return self.filter(days_mask__in=masks_with_day(bit))
+
+    def with_session_flag(self):
+        """Annotiert _has_sessions, damit Course.save() ohne eigene exists()-Query auskommt."""
+        return self.annotate(_has_sessions=models.Exists(
+            CourseSession.objects.filter(course=models.OuterRef('pk'))
+        ))
+
+
 class Course(models.Model):
     # ── Einheitenmodus ─────────────────────────────────────────────────────────
     SESSION_MODE_AUTO   = 'AUTO'
@@ -57,6 +119,8 @@ class Course(models.Model):
     start_time = models.TimeField(verbose_name=_('Startzeit'))
     end_time = models.TimeField(verbose_name=_('Endzeit'))
     days = MultiSelectField(choices=week_days(), verbose_name=_('Wochentage'), blank=True)
+    # Aus days abgeleitet (save()), siehe WEEKDAY_BITS
+    days_mask = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name=_('Wochentage (Bitmaske)'))
     max_participants = models.PositiveIntegerField(verbose_name=_('Maximale Teilnehmer'))
     price_member = models.DecimalField(max_digits=6, decimal_places=2, verbose_name=_('Preis Mitglied'))
     price_non_member = models.DecimalField(max_digits=6, decimal_places=2, verbose_name=_('Preis Nicht-Mitglied'))
@@ -109,10 +173,91 @@ class Course(models.Model):
         help_text=_('Leer = sofort sichtbar. Sonst wird der Kurs erst ab diesem Datum angezeigt.'),
     )
 
+    objects = CourseQuerySet.as_manager()
+
+    # Änderungen an diesen Feldern erzeugen die Einheiten neu (save())
+    SCHEDULE_FIELDS = ('start_date', 'end_date', 'days', 'session_mode', 'num_sessions')
+    # Stand der SCHEDULE_FIELDS beim Laden; None = unbekannt (neu oder Felder deferred)
+    _loaded_schedule = None
+
     def __str__(self):
         return f"{self.name} ({self.start_date}\u2013{self.end_date})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_schedule()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot_schedule()
+
+    def _schedule_state(self):
+        return {f: str(getattr(self, f) or '') for f in self.SCHEDULE_FIELDS}
+
+    def _snapshot_schedule(self):
+        # Deferred Felder nicht anfassen (getattr würde nachladen)
+        if self.get_deferred_fields().intersection(self.SCHEDULE_FIELDS):
+            self._loaded_schedule = None
+        else:
+            self._loaded_schedule = self._schedule_state()
+
+    def schedule_changed(self):
+        """True, wenn sich Start/Ende/Tage/Modus/Anzahl seit dem Laden geändert haben.
+
+        Vergleicht mit dem Stand aus from_db() im Speicher; nur wenn der fehlt
+        (Instanz ohne from_db, deferred Felder), wird der DB-Stand gelesen.
+        """
+        if self.pk is None:
+            return True
+        old = self._loaded_schedule
+        if old is None:
+            old = Course.objects.filter(pk=self.pk).values(*self.SCHEDULE_FIELDS).first()
+            if old is None:
+                return False
+            old = {f: str(value or '') for f, value in old.items()}
+        return self._schedule_state() != old
+
+    def _sessions_exist(self):
+        """Gibt es Einheiten? Nutzt _has_sessions (with_session_flag) oder Prefetch, sonst eine Query."""
+        has_sessions = getattr(self, '_has_sessions', None)
+        if has_sessions is not None:
+            return has_sessions
+        if 'sessions' in getattr(self, '_prefetched_objects_cache', {}):
+            return bool(self.sessions.all())
+        return self.sessions.exists()
+
+    def sync_days_mask(self):
+        """days_mask aus days neu berechnen (save() macht das automatisch, bulk_create nicht)."""
+        self.days_mask = days_to_mask(self.days)
+
+    def runs_on(self, day):
+        """True, wenn der Kurs an diesem Datum (bzw. date.weekday()) stattfindet."""
+        weekday = day if isinstance(day, int) else day.weekday()
+        return bool(self.days_mask >> weekday & 1)
+
+    @property
+    def closed_by_start(self):
+        """Automatisch gesperrt: "bei Kursbeginn sperren" aktiv und Starttag erreicht."""
+        from datetime import date
+        return bool(self.close_on_start and self.start_date and self.start_date <= date.today())
+
+    @property
+    def registration_closed(self):
+        """Manuell (is_closed) oder automatisch bei Kursbeginn gesperrt."""
+        return self.is_closed or self.closed_by_start
+
+    @property
+    def days_label(self):
+        """'Mo, Mi' – Wochentage in fester Reihenfolge für Templates und Exporte."""
+        return ', '.join(mask_to_days(self.days_mask))
+
     def current_registrations(self):
+        # Annotation aus der Kursliste (confirmed_count) spart die Zaehl-Query pro Kurs
+        confirmed = getattr(self, 'confirmed_count', None)
+        if confirmed is not None:
+            return confirmed
         return self.registration_set.filter(status='CONFIRMED').count()
 
     def is_full(self):
@@ -129,10 +274,18 @@ class Course(models.Model):
         1. CourseSession-Objekte vorhanden -> diese verwenden
            (gilt fuer alle Modi nach generate_sessions() oder manuellem Eintrag)
         2. Fallback fuer AUTO ohne generierte Sessions -> on-the-fly berechnen
+
+        Wurden die Einheiten per prefetch_related('sessions') geladen, wird
+        keine weitere Query ausgefuehrt.
         """
-        db_sessions = self.sessions.filter(is_cancelled=False).order_by('date')
-        if db_sessions.exists():
-            return [s.date for s in db_sessions]
+        if 'sessions' in getattr(self, '_prefetched_objects_cache', {}):
+            dates = sorted(s.date for s in self.sessions.all() if not s.is_cancelled)
+        else:
+            dates = list(
+                self.sessions.filter(is_cancelled=False).order_by('date').values_list('date', flat=True)
+            )
+        if dates:
+            return dates
         # Fallback: bisheriges Verhalten fuer bestehende Kurse ohne Sessions
         if self.session_mode == self.SESSION_MODE_AUTO:
             return self._calc_auto_dates()
@@ -143,14 +296,12 @@ class Course(models.Model):
         from datetime import timedelta
         if not (self.start_date and self.end_date):
             return []
-        day_map = {'Mo': 0, 'Di': 1, 'Mi': 2, 'Do': 3, 'Fr': 4, 'Sa': 5, 'So': 6}
-        desired = {day_map[d] for d in self.days if d in day_map} if self.days else set()
-        if not desired:
+        if not self.days_mask:
             return []
         dates = []
         current = self.start_date
         while current <= self.end_date:
-            if current.weekday() in desired:
+            if self.runs_on(current):
                 dates.append(current)
             current += timedelta(days=1)
         return dates
@@ -159,80 +310,83 @@ class Course(models.Model):
         """Anzahl der Kurs-Einheiten."""
         return len(self.session_dates())
 
-    def generate_sessions(self, skip_holidays=True):
-        """Generiert CourseSession-Objekte basierend auf dem Modus.
+    def plan_sessions(self, holidays=frozenset()):
+        """Berechnet die Einheiten (ungespeichert) nach Modus; None = nichts zu tun.
 
-        - AUTO:   iteriert von start_date bis end_date, ueberspringt NRW-Feiertage
-        - COUNT:  generiert num_sessions Einheiten vorwaerts ab start_date, setzt end_date
-        - MANUAL: nichts tun - Sessions muessen manuell ueber Admin eingetragen werden
+        - AUTO:   iteriert von start_date bis end_date, ueberspringt ``holidays``
+        - COUNT:  num_sessions Einheiten vorwaerts ab start_date, setzt self.end_date
+        - MANUAL: None - Sessions werden manuell ueber Admin eingetragen
         """
-        from datetime import timedelta, date as date_type
-
-        if self.session_mode == self.SESSION_MODE_MANUAL:
-            return  # Manuelle Sessions werden nicht ueberschrieben
-
-        nrw_holidays: set = set()
-        if skip_holidays:
-            try:
-                import holidays as hol_lib
-                start_year = self.start_date.year if self.start_date else date_type.today().year
-                end_year = start_year + 2
-                nrw_holidays = set(hol_lib.Germany(state='NW', years=range(start_year, end_year)))
-            except Exception:
-                pass
-
-        day_map = {'Mo': 0, 'Di': 1, 'Mi': 2, 'Do': 3, 'Fr': 4, 'Sa': 5, 'So': 6}
-        desired = {day_map[d] for d in self.days if d in day_map} if self.days else set()
+        from datetime import timedelta
 
-        sessions_to_create = []
+        self.sync_days_mask()
+        sessions = []
 
         if self.session_mode == self.SESSION_MODE_AUTO:
             if not (self.start_date and self.end_date):
-                return
+                return None
             current = self.start_date
             while current <= self.end_date:
-                if current.weekday() in desired and current not in nrw_holidays:
-                    sessions_to_create.append(CourseSession(course=self, date=current))
+                if self.runs_on(current) and current not in holidays:
+                    sessions.append(CourseSession(course=self, date=current))
                 current += timedelta(days=1)
 
         elif self.session_mode == self.SESSION_MODE_COUNT:
-            if not self.start_date or not self.num_sessions or not desired:
-                return
-            count = 0
+            if not self.start_date or not self.num_sessions or not self.days_mask:
+                return None
             current = self.start_date
             safety = self.start_date.replace(year=self.start_date.year + 6)
-            while count < self.num_sessions and current < safety:
-                if current.weekday() in desired and current not in nrw_holidays:
-                    sessions_to_create.append(CourseSession(course=self, date=current))
-                    count += 1
+            while len(sessions) < self.num_sessions and current < safety:
+                if self.runs_on(current) and current not in holidays:
+                    sessions.append(CourseSession(course=self, date=current))
                 current += timedelta(days=1)
-            if sessions_to_create:
-                Course.objects.filter(pk=self.pk).update(end_date=sessions_to_create[-1].date)
-                self.end_date = sessions_to_create[-1].date
+            if sessions:
+                self.end_date = sessions[-1].date
+
+        else:
+            return None
+        return sessions
+
+    def generate_sessions(self, skip_holidays=True, holidays=None):
+        """Generiert CourseSession-Objekte basierend auf dem Modus (siehe plan_sessions).
+
+        ``holidays`` erlaubt eine gemeinsame Feiertagsmenge fuer viele Kurse
+        (courses/rollover.py); sonst werden die NRW-Feiertage ab start_date geladen.
+        """
+        from datetime import date as date_type
+
+        if holidays is None:
+            holidays = frozenset()
+            if skip_holidays:
+                start_year = self.start_date.year if self.start_date else date_type.today().year
+                holidays = nrw_holidays(start_year, start_year + 1)
+
+        old_end_date = self.end_date
+        sessions_to_create = self.plan_sessions(holidays)
+        if sessions_to_create is None:
+            return
+        if self.end_date != old_end_date:
+            Course.objects.filter(pk=self.pk).update(end_date=self.end_date)
 
         self.sessions.all().delete()
         CourseSession.objects.bulk_create(sessions_to_create)
+        self._has_sessions = bool(sessions_to_create)
+        self._snapshot_schedule()  # end_date kann sich (COUNT) geändert haben
 
     def save(self, *args, **kwargs):
-        _schedule_fields = ('start_date', 'end_date', 'days', 'session_mode', 'num_sessions')
-        is_new = self.pk is None
-        regenerate = False
-        if self.session_mode != self.SESSION_MODE_MANUAL:
-            if is_new:
-                regenerate = True
-            else:
-                old = Course.objects.filter(pk=self.pk).values(*_schedule_fields).first()
-                if old:
-                    regenerate = any(
-                        str(getattr(self, f) or '') != str(old[f] or '')
-                        for f in _schedule_fields
-                    )
+        regenerate = self.session_mode != self.SESSION_MODE_MANUAL and self.schedule_changed()
+        self.sync_days_mask()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'days' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'days_mask'}
         super().save(*args, **kwargs)
         if regenerate:
             self.generate_sessions()
-        elif self.session_mode != self.SESSION_MODE_MANUAL and not self.sessions.exists():
+        elif self.session_mode != self.SESSION_MODE_MANUAL and not self._sessions_exist():
             # Bestehende Kurse ohne Einheiten beim naechsten Speichern nachholen
             self.generate_sessions()
+        else:
+            self._snapshot_schedule()
 
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -244,6 +398,12 @@ class Course(models.Model):
     class Meta:
         verbose_name = _('Kurs')
         verbose_name_plural = _('Kurse')
+        indexes = [
+            # Kursliste: end_date >= heute, publish_from leer oder <= heute
+            models.Index(fields=['end_date', 'publish_from'], name='course_end_publish_idx'),
+            # on_weekday(): days_mask IN (alle Masken mit dem Tages-Bit)
+            models.Index(fields=['days_mask'], name='course_days_mask_idx'),
+        ]
 
 
 class CourseSession(models.Model):
@@ -261,16 +421,39 @@ class CourseSession(models.Model):
         help_text=_('Einheit fällt aus (z.B. nachträglicher Feiertag, Ausnahme.'),
     )
     note = models.CharField(max_length=200, blank=True, verbose_name=_('Hinweis'))
+    # Gesetzt, sobald die Einheit als ausgefallen markiert wird; der Job
+    # notify_cancelled_sessions benachrichtigt daraufhin die Teilnehmer
+    cancelled_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name=_('Ausgefallen seit'))
 
     class Meta:
         ordering = ['date']
         verbose_name = _('Einheit')
         verbose_name_plural = _('Einheiten')
+        indexes = [
+            # session_dates(): aktive Termine eines Kurses nach Datum. Partieller Index,
+            # weil Django is_cancelled=False als "NOT is_cancelled" abfragt – ein
+            # (course, is_cancelled, date)-Index waere dafuer nicht nutzbar.
+            models.Index(
+                fields=['course', 'date'], condition=models.Q(is_cancelled=False),
+                name='session_course_active_idx',
+            ),
+        ]
 
     def __str__(self):
         status = ' [ausgefallen]' if self.is_cancelled else ''
         return f"{self.course.name} \u2013 {self.date.strftime('%d.%m.%Y')}{status}"
 
+    def save(self, *args, **kwargs):
+        if self.is_cancelled and self.cancelled_at is None:
+            from django.utils import timezone
+            self.cancelled_at = timezone.now()
+        elif not self.is_cancelled:
+            self.cancelled_at = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'is_cancelled' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'cancelled_at'}
+        super().save(*args, **kwargs)
+
 
 class Registration(models.Model):
     STATUS_CHOICES = [
@@ -304,10 +487,26 @@ class Registration(models.Model):
     )
     created = models.DateTimeField(auto_now_add=True, verbose_name=_('Erstellt am'))
     cancel_token = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name=_('Storno-Token'))
+    # Idempotenz-Schluessel aus dem Anmeldeformular: erneutes Absenden desselben
+    # Formulars liefert die urspruengliche Anmeldung statt einer neuen
+    submission_key = models.UUIDField(null=True, blank=True, unique=True, editable=False, verbose_name=_('Formular-Schlüssel'))
 
     class Meta:
         verbose_name = _('Anmeldung')
         verbose_name_plural = _('Anmeldungen')
+        indexes = [
+            # Belegung (course, status) und Warteliste (course, status, created)
+            models.Index(fields=['course', 'status', 'created'], name='reg_course_status_created_idx'),
+        ]
+        constraints = [
+            # Eine aktive Anmeldung je Kurs und E-Mail (Gross-/Kleinschreibung egal).
+            # Der Unique-Index dient zugleich der Dublettenpruefung in register().
+            models.UniqueConstraint(
+                'course', Lower('email'), condition=~models.Q(status='CANCELLED'),
+                name='reg_active_email_per_course_uniq',
+                violation_error_message=_('Mit dieser E-Mail-Adresse besteht bereits eine Anmeldung für diesen Kurs.'),
+            ),
+        ]
 
     def price(self):
         """Effektiver Preis. Individualbetrag hat hoechste Prioritaet."""
@@ -335,9 +534,103 @@ class Registration(models.Model):
         return f"{self.first_name} {self.last_name} - {self.course.name}"
 
 
+class ScheduledJob(models.Model):
+    """Stand eines periodischen Jobs (courses/scheduler.py): wann zuletzt/als Naechstes."""
+    name = models.CharField(max_length=100, unique=True, verbose_name=_('Job'))
+    next_run = models.DateTimeField(null=True, blank=True, verbose_name=_('Nächster Lauf'))
+    last_run = models.DateTimeField(null=True, blank=True, verbose_name=_('Letzter Lauf'))
+    last_duration = models.FloatField(null=True, blank=True, verbose_name=_('Dauer (s)'))
+    last_result = models.CharField(max_length=200, blank=True, verbose_name=_('Ergebnis'))
+    last_error = models.TextField(blank=True, verbose_name=_('Letzter Fehler'))
+    run_count = models.PositiveIntegerField(default=0, verbose_name=_('Läufe'))
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = _('Geplanter Job')
+        verbose_name_plural = _('Geplante Jobs')
+
+    def __str__(self):
+        return self.name
+
+
+class SchedulerLease(models.Model):
+    """Leader-Lease: nur der Scheduler-Prozess, der die Zeile haelt, fuehrt Jobs aus."""
+    name = models.CharField(max_length=50, primary_key=True)
+    holder = models.CharField(max_length=200)
+    expires = models.DateTimeField()
+
+    class Meta:
+        verbose_name = _('Scheduler-Lease')
+        verbose_name_plural = _('Scheduler-Leases')
+
+    def __str__(self):
+        return f'{self.name}: {self.holder}'
+
+
+class OutboxEmail(models.Model):
+    """Zu versendende E-Mail (courses/outbox.py); der Scheduler stellt sie zu."""
+    created = models.DateTimeField(auto_now_add=True, verbose_name=_('Erstellt am'))
+    subject = models.CharField(max_length=255, verbose_name=_('Betreff'))
+    recipients = models.TextField(verbose_name=_('Empfänger'))
+    # Gepickelte EmailMessage (inkl. Anhaengen und Alternativen)
+    message = models.BinaryField()
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name=_('Versuche'))
+    next_attempt = models.DateTimeField(verbose_name=_('Nächster Versuch'))
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Versendet am'))
+    last_error = models.TextField(blank=True, verbose_name=_('Letzter Fehler'))
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = _('E-Mail (Postausgang)')
+        verbose_name_plural = _('E-Mails (Postausgang)')
+        indexes = [
+            # drain(): offene Nachrichten nach Faelligkeit
+            models.Index(
+                fields=['next_attempt'], condition=models.Q(sent_at__isnull=True),
+                name='outbox_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} → {self.recipients}'
+
+
+class SessionNotification(models.Model):
+    """Versandte Einheiten-Mail (Ausfall/Erinnerung); verhindert doppelte Benachrichtigung.
+
+    Bezieht sich auf Anmeldung (und damit Kurs) und Datum der Einheit, nicht auf
+    die CourseSession-Zeile: generate_sessions() legt die Einheiten neu an, der
+    Merker bleibt dabei erhalten.
+    """
+    KIND_CANCELLED = 'CANCELLED'
+    KIND_REMINDER = 'REMINDER'
+    KIND_CHOICES = [
+        (KIND_CANCELLED, _('Ausfall')),
+        (KIND_REMINDER, _('Erinnerung')),
+    ]
+
+    registration = models.ForeignKey(Registration, on_delete=models.CASCADE, related_name='session_notifications', verbose_name=_('Anmeldung'))
+    date = models.DateField(verbose_name=_('Datum der Einheit'))
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name=_('Art'))
+    created = models.DateTimeField(auto_now_add=True, verbose_name=_('Erstellt am'))
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = _('Einheiten-Benachrichtigung')
+        verbose_name_plural = _('Einheiten-Benachrichtigungen')
+        constraints = [
+            models.UniqueConstraint(fields=['registration', 'date', 'kind'], name='session_notification_once'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()}: {self.registration} ({self.date})'
+
+
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from kursanmeldung import metrics
+
 
 def _promote_next_from_waitlist(course):
     """Rueckt den aeltesten Wartelistenplatz nach wenn Kapazitaet frei ist."""
@@ -352,6 +645,7 @@ def _promote_next_from_waitlist(course):
     if next_waiting:
         next_waiting.status = 'CONFIRMED'
         next_waiting.save(update_fields=['status'])
+        metrics.inc_promotions('auto')
         _send_waitlist_promotion_email(next_waiting)
 
 
@@ -373,38 +667,61 @@ def promote_from_waitlist_on_cancel(sender, instance, created, **kwargs):
     _promote_next_from_waitlist(instance.course)
 
 
-def _send_waitlist_promotion_email(registration):
-    """Benachrichtigt einen Wartelistenplatz-Nachrücker per E-Mail."""
-    from django.core.mail import send_mail
-    from django.template.loader import render_to_string
-    from django.conf import settings as django_settings
-    from django.urls import reverse
-
-    cancel_url = (
-        django_settings.SITE_URL.rstrip('/')
-        + reverse('course_cancel', args=[registration.cancel_token])
-    )
-    days = ', '.join(registration.course.days)
-    locations = ', '.join(loc.name for loc in registration.course.locations.all())
+def confirm_waitlisted(registrations):
+    """Bestaetigt Wartelisten-Anmeldungen, soweit die Kurse Platz haben.
 
-    ical_url = (
-        django_settings.SITE_URL.rstrip('/')
-        + reverse('course_ical', args=[registration.course.id])
-    )
+    Ein einziges UPDATE: je Kurs werden die aeltesten Wartenden bis zur Zahl
+    freier Plaetze (max_participants - bestaetigte) gesetzt, der Rest bleibt
+    auf der Warteliste. Die Kurszeilen sind waehrenddessen gesperrt (wie in
+    register()). post_save-Signale laufen bewusst nicht, sie reagieren nur auf
+    Stornierungen. Gibt die bestaetigten Anmeldungen (mit Kurs und Orten) zurueck.
+    """
+    from django.db import transaction
+    from django.db.models import Count, F, OuterRef, Subquery, Window
+    from django.db.models.functions import Coalesce, RowNumber
 
-    subject = render_to_string(
-        'courses/email/waitlist_promotion_subject.txt',
-        {'registration': registration},
-    ).strip()
-    body = render_to_string(
-        'courses/email/waitlist_promotion_body.txt',
-        {'registration': registration, 'cancel_url': cancel_url,
-         'days': days, 'locations': locations, 'ical_url': ical_url},
+    waiting = list(registrations.filter(status='WAITLIST').values_list('pk', 'course_id'))
+    if not waiting:
+        return []
+    ids = [pk for pk, _course in waiting]
+    confirmed = (
+        Registration.objects.filter(course=OuterRef('course'), status='CONFIRMED')
+        .order_by().values('course').annotate(n=Count('pk')).values('n')
+    )
+    within_capacity = (
+        Registration.objects.filter(pk__in=ids, status='WAITLIST')
+        .annotate(
+            rank=Window(RowNumber(), partition_by=[F('course')], order_by=[F('created').asc(), F('pk').asc()]),
+            free=F('course__max_participants') - Coalesce(Subquery(confirmed), 0),
+        )
+        .filter(rank__lte=F('free'))
+        .values('pk')
     )
-    send_mail(
-        subject,
-        body,
-        django_settings.DEFAULT_FROM_EMAIL,
-        [registration.email],
-        fail_silently=True,
+    with transaction.atomic():
+        list(Course.objects.select_for_update().filter(pk__in={c for _pk, c in waiting}).values_list('pk'))
+        Registration.objects.filter(pk__in=within_capacity).update(status='CONFIRMED')
+    return list(
+        Registration.objects.filter(pk__in=ids, status='CONFIRMED')
+        .select_related('course').prefetch_related('course__locations')
+        .order_by('course_id', 'created')
     )
+
+
+def waitlist_promotion_messages(registrations):
+    """Baut die Nachruecker-Mails (courses/emails.py: Kursdaten einmal je Kurs)."""
+    from . import emails
+    return emails.build_messages('waitlist_promotion', registrations)
+
+
+def send_waitlist_promotion_emails(registrations):
+    """Versendet alle Nachruecker-Mails ueber eine Backend-Verbindung (ein Batch)."""
+    from django.core.mail import get_connection
+    messages = waitlist_promotion_messages(registrations)
+    if not messages:
+        return 0
+    return get_connection(fail_silently=True).send_messages(messages) or 0
+
+
+def _send_waitlist_promotion_email(registration):
+    """Benachrichtigt einen Wartelistenplatz-Nachrücker per E-Mail."""
+    send_waitlist_promotion_emails([registration])
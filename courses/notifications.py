@@ -0,0 +1,131 @@
+"""
+Einheiten-Benachrichtigungen: Ausfall-Hinweise und Erinnerung vor Kursbeginn.
+
+Markiert die Verwaltung eine Einheit als ausgefallen (``is_cancelled``, z. B.
+weil das Bad geschlossen ist), setzt ``CourseSession.save()`` den Zeitpunkt
+``cancelled_at``. Der Scheduler-Job ``notify_cancelled_sessions`` schreibt
+daraufhin allen bestätigten Teilnehmern eine Mail; der tägliche Job
+``send_session_reminders`` erinnert ``SESSION_REMINDER_DAYS`` Tage vor der
+ersten Einheit eines Kurses. Im Admin-Request passiert dabei nichts weiter.
+
+Ablauf je Lauf (unabhängig von der Zahl der Teilnehmer):
+  * betroffene Einheiten mit Kurs laden,
+  * Empfänger aller betroffenen Kurse mit einer Abfrage,
+  * bereits Benachrichtigte (``SessionNotification``) mit einer Abfrage,
+  * Mails mit courses/emails.py rendern (Vorlagen einmal je Prozess,
+    Kursdaten wie Tage und Orte einmal je Kurs),
+  * Merker und Mails in derselben Transaktion speichern – die Mails gehen in
+    den Postausgang (courses/outbox.py), ``drain_outbox`` stellt sie zu.
+
+Der eindeutige Merker (Anmeldung, Datum der Einheit, Art) sorgt dafür, dass
+niemand zweimal dieselbe Nachricht bekommt, auch wenn ein Job erneut läuft oder
+generate_sessions() die Einheiten des Kurses neu anlegt.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from . import outbox
+from .models import CourseSession, Registration, SessionNotification
+
+BATCH_SIZE = 200
+
+TEMPLATES = {
+    SessionNotification.KIND_CANCELLED: 'session_cancelled',
+    SessionNotification.KIND_REMINDER: 'session_reminder',
+}
+
+
+def reminder_days():
+    return getattr(settings, 'SESSION_REMINDER_DAYS', 2)
+
+
+def cancelled_sessions(today):
+    """Als ausgefallen markierte Einheiten, die noch bevorstehen."""
+    return CourseSession.objects.filter(is_cancelled=True, cancelled_at__isnull=False, date__gte=today)
+
+
+def first_sessions(today, days):
+    """Erste (nicht ausgefallene) Einheit je Kurs, falls sie in den nächsten ``days`` Tagen liegt."""
+    first_date = (
+        CourseSession.objects.filter(course=OuterRef('course'), is_cancelled=False)
+        .order_by('date').values('date')[:1]
+    )
+    return CourseSession.objects.filter(
+        is_cancelled=False, date__gt=today, date__lte=today + timedelta(days=days),
+        date=Subquery(first_date),
+    )
+
+
+def notify_cancelled_sessions(now=None):
+    """Ausfall-Mails für alle neu ausgefallenen Einheiten; gibt die Zahl der Mails zurück."""
+    today = timezone.localdate(now)
+    return notify(cancelled_sessions(today), SessionNotification.KIND_CANCELLED)
+
+
+def send_session_reminders(now=None, days=None):
+    """Erinnerung vor der ersten Einheit; gibt die Zahl der Mails zurück."""
+    days = reminder_days() if days is None else days
+    if days <= 0:
+        return 0
+    today = timezone.localdate(now)
+    return notify(first_sessions(today, days), SessionNotification.KIND_REMINDER)
+
+
+def notify(sessions, kind):
+    """Benachrichtigt alle bestätigten Teilnehmer der ``sessions`` (einmal je Art)."""
+    with transaction.atomic():
+        # Sperrt die Einheiten, damit parallele Läufe nicht doppelt versenden
+        sessions = list(
+            sessions.select_for_update(of=('self',))
+            .select_related('course').order_by('course_id', 'date')
+        )
+        if not sessions:
+            return 0
+        course_ids = {session.course_id for session in sessions}
+        recipients = defaultdict(list)
+        for registration in (
+            Registration.objects.filter(course_id__in=course_ids, status='CONFIRMED')
+            .select_related('course').order_by('course_id', 'created')
+        ):
+            recipients[registration.course_id].append(registration)
+        done = set(
+            SessionNotification.objects.filter(
+                registration__course_id__in=course_ids, date__in={session.date for session in sessions}, kind=kind,
+            ).values_list('registration_id', 'date')
+        )
+        pending = []
+        for session in sessions:
+            for registration in recipients[session.course_id]:
+                key = (registration.pk, session.date)
+                if key not in done:  # auch zwei Einheiten am selben Tag: eine Mail
+                    done.add(key)
+                    pending.append((session, registration))
+        if not pending:
+            return 0
+        messages = session_messages(pending, kind)
+        SessionNotification.objects.bulk_create(
+            [SessionNotification(registration=r, date=s.date, kind=kind) for s, r in pending],
+            batch_size=BATCH_SIZE,
+        )
+        for start in range(0, len(messages), BATCH_SIZE):
+            outbox.enqueue(messages[start:start + BATCH_SIZE])
+    return len(messages)
+
+
+def session_messages(pending, kind):
+    """Baut die Mails zu (Einheit, Anmeldung)-Paaren, ein Stapel je Einheit."""
+    from itertools import groupby
+    from . import emails
+    emails.course_contexts({s.course_id: s.course for s, _r in pending}.values())  # Orte: eine Abfrage
+    messages = []
+    for session, group in groupby(pending, key=lambda pair: pair[0]):
+        messages.extend(emails.build_messages(
+            TEMPLATES[kind], [registration for _session, registration in group], session=session,
+        ))
+    return messages
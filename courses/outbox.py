@@ -0,0 +1,133 @@
+"""
+Postausgang: E-Mails in der Datenbank ablegen und im Hintergrund zustellen.
+
+Mit ``EMAIL_BACKEND=courses.outbox.OutboxBackend`` landet jede Mail der App
+(Anmeldebestätigung, Nachrücker, Einheiten-Hinweise) zuerst in der Tabelle
+``OutboxEmail`` – ein INSERT statt eines Graph-/SMTP-Roundtrips im Request.
+Der Scheduler-Job ``drain_outbox`` (courses/jobs.py) stellt sie mit dem
+eigentlichen Backend (``OUTBOX_DELIVERY_BACKEND``) zu. Schlägt eine Mail fehl,
+wird sie mit wachsendem Abstand erneut versucht (1, 2, 4, ... Minuten), nach
+``OUTBOX_MAX_ATTEMPTS`` Versuchen bleibt sie mit Fehlertext liegen (Admin).
+
+Zustellung höchstens einmal je Versuch: drain() reserviert einen Block in einer
+eigenen, kurzen Transaktion (``attempts + 1``, ``next_attempt`` um
+``CLAIM_TIMEOUT`` nach hinten), erst danach wird versendet – ein zweiter
+Scheduler oder ``run_scheduler --run drain_outbox`` sieht die Zeilen nicht
+mehr. ``sent_at`` bzw. der Fehler wird nach jeder einzelnen Mail gespeichert.
+Bricht der Prozess mitten im Block ab, werden nur die noch nicht versendeten
+Mails nach Ablauf der Reservierung erneut versucht.
+
+    EMAIL_BACKEND=courses.outbox.OutboxBackend
+    OUTBOX_DELIVERY_BACKEND=kursanmeldung.graph_email_backend.GraphEmailBackend
+"""
+
+import pickle
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+# Reservierung eines Blocks; muss laenger sein als das Versenden von ``limit`` Mails
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def max_attempts():
+    return getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+
+
+def delivery_backend():
+    return getattr(settings, 'OUTBOX_DELIVERY_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+
+
+def enqueue(email_messages, when=None):
+    """Legt Nachrichten in den Postausgang (ein INSERT) und gibt deren Anzahl zurück."""
+    when = when or timezone.now()
+    rows = []
+    for message in email_messages:
+        connection, message.connection = message.connection, None  # Verbindung nicht pickeln
+        try:
+            data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            message.connection = connection
+        rows.append(OutboxEmail(
+            subject=str(message.subject)[:255],
+            recipients=', '.join(message.recipients()),
+            message=data,
+            next_attempt=when,
+        ))
+    OutboxEmail.objects.bulk_create(rows)
+    return len(rows)
+
+
+def claim(limit=100, now=None):
+    """Reserviert bis zu ``limit`` fällige Nachrichten für diesen Prozess und gibt sie zurück."""
+    now = now or timezone.now()
+    using = router.db_for_write(OutboxEmail)
+    with transaction.atomic(using=using):
+        due = (
+            OutboxEmail.objects.using(using)
+            .filter(sent_at__isnull=True, next_attempt__lte=now, attempts__lt=max_attempts())
+            .order_by('next_attempt', 'pk')
+        )
+        if connections[using].features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)  # PostgreSQL; SQLite sperrt die ganze DB
+        rows = list(due[:limit])
+        if rows:
+            OutboxEmail.objects.using(using).filter(pk__in=[row.pk for row in rows]).update(
+                attempts=F('attempts') + 1, next_attempt=now + CLAIM_TIMEOUT,
+            )
+        for row in rows:
+            row.attempts += 1
+        return rows
+
+
+def drain(limit=100, now=None):
+    """Stellt fällige Nachrichten zu; gibt (versendet, fehlgeschlagen) zurück."""
+    now = now or timezone.now()
+    claimed = claim(limit, now)
+    if not claimed:
+        return 0, 0
+    sent = failed = 0
+    with get_connection(backend=delivery_backend(), fail_silently=False) as connection:
+        for row in claimed:
+            try:
+                message = pickle.loads(bytes(row.message))
+                if not connection.send_messages([message]):
+                    raise RuntimeError('Backend hat die Nachricht nicht angenommen.')
+            except Exception as exc:
+                OutboxEmail.objects.filter(pk=row.pk).update(
+                    last_error=f'{type(exc).__name__}: {exc}'[:2000],
+                    next_attempt=now + timedelta(minutes=2 ** (row.attempts - 1)),
+                )
+                failed += 1
+            else:
+                OutboxEmail.objects.filter(pk=row.pk).update(sent_at=timezone.now(), last_error='')
+                sent += 1
+    return sent, failed
+
+
+def prune(older_than, now=None):
+    """Versendete Nachrichten nach ``older_than`` (timedelta) löschen."""
+    now = now or timezone.now()
+    deleted, _per_model = OutboxEmail.objects.filter(sent_at__lt=now - older_than).delete()
+    return deleted
+
+
+class OutboxBackend(BaseEmailBackend):
+    """E-Mail-Backend, das nur in den Postausgang schreibt (Zustellung: drain())."""
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        try:
+            return enqueue(email_messages)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
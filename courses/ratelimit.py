@@ -0,0 +1,301 @@
+"""
+Rate-Limiting für die anonymen POST-Endpunkte (Anmeldung, Storno).
+
+Token-Bucket pro Policy und Schlüssel (IP-Adresse, E-Mail), je nach
+``RATELIMIT_STORE`` im Django-Cache ``ratelimit`` oder in einer eigenen
+SQLite-Datei (siehe unten). Die Prüfung läuft vor der View, also vor
+Formularvalidierung, ORM-Zugriff und Mailversand; abgelehnte Requests bekommen
+sofort ein schlankes 429 mit ``Retry-After``.
+
+Policies in settings.RATELIMIT_POLICIES, z.B.:
+    'register': {'ip': '10/m', 'email': '5/10m'}
+
+Rate-Format: ``<Anzahl>/<Zeitraum>`` mit Zeitraum ``s``, ``m``, ``h``, ``d`` und
+optionalem Faktor (``5/10m`` = 5 pro 10 Minuten). Die Anzahl ist zugleich die
+Burst-Größe; danach füllt sich der Bucket gleichmäßig wieder auf.
+
+Ein Token wird nur abgebucht, wenn *alle* Buckets der Policy eines haben –
+eine wegen der E-Mail abgelehnte Anmeldung kostet also kein IP-Token.
+
+Stores (``RATELIMIT_STORE``):
+
+``sqlite``
+    Für Produktion. Buckets in ``RATELIMIT_SQLITE`` (eigene Datei wie der
+    Warteraum, WAL + BEGIN IMMEDIATE): von allen Gunicorn-Workern geteilt,
+    atomar, und abgelehnte Requests konkurrieren nicht mit Anmeldungen um
+    die Schreibsperre der Haupt-Datenbank.
+``locmem`` / ``file``
+    Django-Cache; jeder Bucket wird unter einer kurzen Sperre (``cache.add``
+    auf ``<key>:lock``) gelesen und geschrieben. ``locmem`` zählt pro Worker
+    (wirksame Grenze: Worker × Anzahl), beim ``file``-Store ist ``add`` nicht
+    ganz atomar, ein gleichzeitiger Burst kann die Grenze knapp überschreiten.
+"""
+
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache, wraps
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+CACHE_ALIAS = 'ratelimit'
+
+LOCK_TIMEOUT = 2     # Sekunden; verfällt auch, wenn ein Worker mitten drin abbricht
+LOCK_WAIT = 0.5      # so lange wird höchstens auf die Sperre gewartet
+LOCK_POLL = 0.005
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+
+
+def parse_rate(rate):
+    """'5/10m' -> (5, 600.0): Kapazität und Zeitraum in Sekunden."""
+    match = _RATE_RE.match(rate.replace(' ', ''))
+    if not match:
+        raise ValueError(f'Ungültige Rate "{rate}" (erwartet z.B. "10/m" oder "5/10m").')
+    count, factor, unit = match.groups()
+    return int(count), float(int(factor or 1) * _PERIODS[unit])
+
+
+def client_ip(request):
+    """IP des Clients. Hinter Nginx steht sie in X-Real-IP (siehe nginx.conf)."""
+    return request.META.get('HTTP_X_REAL_IP') or request.META.get('REMOTE_ADDR', '')
+
+
+def _key_value(request, kind):
+    if kind == 'ip':
+        return client_ip(request)
+    if kind == 'email':
+        return request.POST.get('email', '').strip().lower()
+    raise ValueError(f'Unbekannter Rate-Limit-Schlüssel "{kind}".')
+
+
+def _buckets(policy, request):
+    """Liefert (Cache-Key, Kapazität, Zeitraum) für alle Schlüssel der Policy."""
+    for kind, rate in getattr(settings, 'RATELIMIT_POLICIES', {}).get(policy, {}).items():
+        value = _key_value(request, kind)
+        if not value:
+            continue
+        # Gehashed: keine personenbezogenen Daten und keine Sonderzeichen im Cache-Key
+        digest = hashlib.sha256(value.encode()).hexdigest()[:32]
+        capacity, period = parse_rate(rate)
+        yield f'rl:{policy}:{kind}:{digest}', capacity, period
+
+
+def _take(state, capacity, period, now):
+    """Token-Bucket-Schritt. Gibt (neuer Zustand oder None, Wartezeit in s) zurück."""
+    refill = capacity / period
+    if state is None:
+        tokens = float(capacity)
+    else:
+        tokens, updated = state
+        tokens = min(float(capacity), tokens + max(0.0, now - updated) * refill)
+    if tokens < 1:
+        return None, (1 - tokens) / refill
+    return (tokens - 1, now), 0.0
+
+
+def _enabled():
+    return getattr(settings, 'RATELIMIT_ENABLED', True)
+
+
+def _evaluate(buckets, states, now):
+    """Prüft alle Buckets. Gibt (neue Zustände, 0) zurück, wenn jeder ein Token hat, sonst (None, Wartezeit)."""
+    updated, wait = {}, 0.0
+    for key, capacity, period in buckets:
+        state, retry_after = _take(states.get(key), capacity, period, now)
+        if state is None:
+            wait = max(wait, retry_after)
+        else:
+            updated[key] = state
+    if wait:
+        return None, wait
+    return updated, 0.0
+
+
+def _ttl(buckets):
+    return int(max(period for _key, _capacity, period in buckets)) + 1
+
+
+def _acquire(cache, lock):
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock, 1, timeout=LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(LOCK_POLL)
+    return True
+
+
+async def _aacquire(cache, lock):
+    deadline = time.monotonic() + LOCK_WAIT
+    while not await cache.aadd(lock, 1, timeout=LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(LOCK_POLL)
+    return True
+
+
+class BucketStore:
+    """Token-Buckets in einer lokalen SQLite-Datei (``RATELIMIT_STORE=sqlite``)."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+            except sqlite3.OperationalError:
+                pass  # neue Datei: ein anderer Worker stellt gerade auf WAL um (wartet nicht)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def take(self, buckets, now=None):
+        """Wie check(), für (Key, Kapazität, Zeitraum)-Tripel; eine Transaktion."""
+        keys = [key for key, _capacity, _period in buckets]
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time() if now is None else now  # erst mit der Sperre
+            rows = conn.execute(
+                f'SELECT key, tokens, updated FROM bucket WHERE key IN ({", ".join("?" * len(keys))})', keys,
+            ).fetchall()
+            states, retry_after = _evaluate(buckets, {key: (tokens, updated) for key, tokens, updated in rows}, now)
+            if states:
+                expires = now + _ttl(buckets)
+                conn.executemany(
+                    'INSERT INTO bucket (key, tokens, updated, expires) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, '
+                    'updated = excluded.updated, expires = excluded.expires',
+                    [(key, tokens, updated, expires) for key, (tokens, updated) in states.items()],
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return retry_after
+
+    def prune(self, now=None):
+        """Abgelaufene Buckets löschen (Scheduler-Job, courses/jobs.py)."""
+        now = time.time() if now is None else now
+        return self._connection().execute('DELETE FROM bucket WHERE expires < ?', [now]).rowcount
+
+
+@lru_cache(maxsize=4)
+def _bucket_store(path):
+    return BucketStore(path)
+
+
+def get_store():
+    """BucketStore bei ``RATELIMIT_STORE=sqlite``, sonst None (Django-Cache)."""
+    if getattr(settings, 'RATELIMIT_STORE', 'locmem') != 'sqlite':
+        return None
+    return _bucket_store(str(settings.RATELIMIT_SQLITE))
+
+
+def check(policy, request):
+    """Verbraucht je Schlüssel ein Token. Gibt 0 zurück oder die Wartezeit bis zum nächsten Token."""
+    if not _enabled():
+        return 0.0
+    buckets = sorted(_buckets(policy, request))  # feste Reihenfolge der Sperren
+    if not buckets:
+        return 0.0
+    store = get_store()
+    if store is not None:
+        return store.take(buckets)
+    cache = caches[CACHE_ALIAS]
+    locks = []
+    try:
+        for key, _capacity, _period in buckets:
+            if not _acquire(cache, f'{key}:lock'):
+                return LOCK_WAIT  # Burst auf denselben Schlüssel: gleich noch einmal versuchen
+            locks.append(f'{key}:lock')
+        states, retry_after = _evaluate(buckets, cache.get_many([key for key, _c, _p in buckets]), time.time())
+        if states:
+            cache.set_many(states, timeout=_ttl(buckets))
+        return retry_after
+    finally:
+        if locks:
+            cache.delete_many(locks)
+
+
+async def acheck(policy, request):
+    """Async-Variante von check() (SQLite-Store und Datei-Cache nicht direkt im Event-Loop)."""
+    if not _enabled():
+        return 0.0
+    buckets = sorted(_buckets(policy, request))
+    if not buckets:
+        return 0.0
+    store = get_store()
+    if store is not None:
+        return await sync_to_async(store.take, thread_sensitive=False)(buckets)
+    cache = caches[CACHE_ALIAS]
+    locks = []
+    try:
+        for key, _capacity, _period in buckets:
+            if not await _aacquire(cache, f'{key}:lock'):
+                return LOCK_WAIT
+            locks.append(f'{key}:lock')
+        states = await cache.aget_many([key for key, _c, _p in buckets])
+        states, retry_after = _evaluate(buckets, states, time.time())
+        if states:
+            await cache.aset_many(states, timeout=_ttl(buckets))
+        return retry_after
+    finally:
+        if locks:
+            await cache.adelete_many(locks)
+
+
+def too_many_requests(retry_after):
+    response = HttpResponse(
+        'Zu viele Anfragen – bitte kurz warten und erneut versuchen.',
+        status=429, content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+
+def ratelimit(policy, methods=('POST',)):
+    """View-Decorator (sync und async): prüft die Policy für die angegebenen Methoden."""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method in methods:
+                    retry_after = await acheck(policy, request)
+                    if retry_after:
+                        return too_many_requests(retry_after)
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                retry_after = check(policy, request)
+                if retry_after:
+                    return too_many_requests(retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,142 @@
+"""
+Saisonwechsel: Folgekurse für eine ganze Auswahl von Kursen anlegen.
+
+Je Kurs entsteht eine Kopie "<Name> (Folgekurs)", gesperrt (``is_closed``)
+bis die Verwaltung sie freigibt, mit denselben Orten und allen aktiven
+Teilnehmern (nicht storniert) als Warteliste. Bestätigt wird danach wie
+bisher mit der Aktion "Auswahl bestätigen + Info-Mail senden".
+
+Mit ``offset`` (z. B. 26 Wochen) werden Beginn, Ende und "Sichtbar ab"
+verschoben und die Einheiten sofort geplant – mit einer einzigen
+Feiertagsabfrage für alle Kurse. Ohne Verschiebung bleiben die Daten leer
+wie beim bisherigen Kopieren eines einzelnen Kurses.
+
+Alles läuft in einer Transaktion mit Mengen-Inserts (Kurse, Orte über die
+Zwischentabelle, Teilnehmer in Blöcken, Einheiten) statt Objekt für Objekt.
+"""
+
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Course, CourseSession, Registration, nrw_holidays
+
+SUFFIX = ' (Folgekurs)'
+
+# Werden 1:1 übernommen; Daten, Sperre und Einheiten setzt rollover()
+COURSE_FIELDS = (
+    'description', 'start_time', 'end_time', 'days', 'max_participants',
+    'price_member', 'price_non_member', 'allow_half', 'close_on_start',
+    'instructor', 'instructor_user_id', 'session_mode', 'num_sessions', 'course_type',
+)
+REGISTRATION_FIELDS = (
+    'first_name', 'last_name', 'email', 'phone', 'iban', 'bic', 'account_holder',
+    'terms_accepted', 'is_member', 'half_course', 'custom_price',
+)
+
+
+@dataclass
+class RolloverResult:
+    courses: list = field(default_factory=list)  # neue Kurse, Reihenfolge wie die Auswahl
+    registrations: int = 0
+    sessions: int = 0
+
+
+def _shift(value, offset):
+    return value + offset if value and offset else None
+
+
+def rollover(courses, offset=None, chunk_size=1000):
+    """Legt Folgekurse für ``courses`` (Queryset) an; ``offset`` ist ein timedelta oder None."""
+    originals = list(courses.order_by('start_date', 'pk'))
+    result = RolloverResult()
+    if not originals:
+        return result
+    through = Course.locations.through
+
+    with transaction.atomic():
+        new_courses = []
+        for original in originals:
+            copy = Course(
+                name=f'{original.name}{SUFFIX}'[:Course._meta.get_field('name').max_length],
+                start_date=_shift(original.start_date, offset),
+                end_date=_shift(original.end_date, offset),
+                publish_from=_shift(original.publish_from, offset),
+                is_closed=True,  # geschlossen bis Admin alles eingerichtet hat
+                **{name: getattr(original, name) for name in COURSE_FIELDS},
+            )
+            copy.sync_days_mask()  # bulk_create umgeht Course.save()
+            new_courses.append(copy)
+        Course.objects.bulk_create(new_courses)
+        new_id = {original.pk: copy.pk for original, copy in zip(originals, new_courses)}
+        result.courses = new_courses
+
+        through.objects.bulk_create([
+            through(course_id=new_id[course_id], location_id=location_id)
+            for course_id, location_id in through.objects.filter(course_id__in=new_id)
+            .values_list('course_id', 'location_id')
+        ], batch_size=chunk_size)
+
+        # Alte Anmeldereihenfolge bleibt über die Primärschlüssel erhalten
+        # (created ist für alle Kopien gleich, confirm_waitlisted sortiert nach pk)
+        active = (
+            Registration.objects.filter(course_id__in=new_id).exclude(status='CANCELLED')
+            .order_by('course_id', 'created', 'pk')
+            .values_list('course_id', *REGISTRATION_FIELDS)
+        )
+        batch = []
+        for course_id, *values in active.iterator(chunk_size=chunk_size):
+            batch.append(Registration(
+                course_id=new_id[course_id], status='WAITLIST',
+                **dict(zip(REGISTRATION_FIELDS, values)),
+            ))
+            if len(batch) >= chunk_size:
+                Registration.objects.bulk_create(batch)
+                result.registrations += len(batch)
+                batch = []
+        Registration.objects.bulk_create(batch)
+        result.registrations += len(batch)
+
+        if offset:
+            result.sessions = _plan_sessions(originals, new_courses, offset, chunk_size)
+    return result
+
+
+def _plan_sessions(originals, new_courses, offset, chunk_size):
+    """Einheiten aller Folgekurse planen; Feiertage einmal für den ganzen Zeitraum."""
+    dated = [c for c in new_courses if c.start_date]
+    if not dated:
+        return 0
+    first_year = min(c.start_date.year for c in dated)
+    last_year = max((c.end_date or c.start_date).year for c in dated) + 1
+    holidays = nrw_holidays(first_year, last_year)
+
+    sessions, moved_end = [], []
+    manual = {}
+    for original, copy in zip(originals, new_courses):
+        if copy.session_mode == Course.SESSION_MODE_MANUAL:
+            manual[original.pk] = copy
+            continue
+        old_end_date = copy.end_date
+        planned = copy.plan_sessions(holidays)
+        sessions.extend(planned or ())
+        if copy.end_date != old_end_date:
+            moved_end.append(copy)
+    # Manuelle Einheiten werden mit verschoben (inkl. Ausfall-Markierung und Hinweis).
+    # bulk_create umgeht CourseSession.save(), daher cancelled_at selbst setzen –
+    # sonst geht für die ausgefallene Einheit nie eine Ausfall-Mail raus.
+    if manual:
+        now = timezone.now()
+        for course_id, day, cancelled, cancelled_at, note in (
+            CourseSession.objects.filter(course_id__in=manual)
+            .values_list('course_id', 'date', 'is_cancelled', 'cancelled_at', 'note')
+        ):
+            sessions.append(CourseSession(
+                course=manual[course_id], date=day + offset, is_cancelled=cancelled,
+                cancelled_at=(cancelled_at or now) if cancelled else None, note=note,
+            ))
+    if moved_end:
+        Course.objects.bulk_update(moved_end, ['end_date'], batch_size=chunk_size)
+    CourseSession.objects.bulk_create(sessions, batch_size=chunk_size)
+    return len(sessions)
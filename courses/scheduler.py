@@ -0,0 +1,175 @@
+"""
+Leichter Scheduler für zeitabhängige Aufgaben (``python manage.py run_scheduler``).
+
+Ein einzelner Hintergrundprozess erledigt die periodischen Aufgaben (Jobs in
+courses/jobs.py): Postausgang zustellen, Einheiten-Mails versenden,
+abgelaufene Cache-Einträge und alte Daten löschen. "Sichtbar ab" und
+"bei Kursbeginn sperren" wertet die App weiterhin direkt aus dem Datum aus,
+die eingegebenen Werte bleiben dabei unverändert.
+
+Jobs
+----
+Jeder Job hat einen Namen und ein Intervall; Stand, Dauer und letzter Fehler
+stehen in der Tabelle ``ScheduledJob`` (Admin: "Geplante Jobs"). Ein Job,
+der eine Ausnahme wirft, wird protokolliert und beim nächsten Intervall
+erneut versucht, die anderen Jobs laufen weiter.
+
+Leader
+------
+Es dürfen mehrere Scheduler-Prozesse laufen (z. B. einer je Server), aber
+nur einer führt Jobs aus: Er hält die Zeile ``SchedulerLease('scheduler')``
+und verlängert sie bei jedem Durchlauf per bedingtem UPDATE (``holder = ich
+ODER abgelaufen``). Stirbt er, übernimmt ein anderer nach ``SCHEDULER_LEASE_TTL``.
+Lange Jobs verlängern die Lease zwischendurch mit ``renew_lease()``.
+
+Betrieb als systemd-Dienst, siehe DEPLOYMENT.md.
+"""
+
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger('courses.scheduler')
+
+LEASE_NAME = 'scheduler'
+
+# (holder, ttl) des Leaders waehrend run_due(), fuer renew_lease()
+_lease = None
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    func: Callable
+    interval: timedelta
+    description: str = ''
+
+
+JOBS = {}
+
+
+def job(name, every):
+    """Dekorator: registriert ``func(now)`` als periodischen Job (Intervall in Sekunden)."""
+    def decorator(func):
+        JOBS[name] = Job(name, func, timedelta(seconds=every), (func.__doc__ or '').strip().split('\n')[0])
+        return func
+    return decorator
+
+
+def load_jobs():
+    from . import jobs  # noqa: F401 – registriert die Jobs per @job
+    return JOBS
+
+
+def holder_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def acquire_lease(holder, ttl, now=None):
+    """Uebernimmt oder verlaengert die Leader-Lease; True = dieser Prozess ist Leader."""
+    from .models import SchedulerLease
+    now = now or timezone.now()
+    expires = now + ttl
+    updated = (
+        SchedulerLease.objects.filter(name=LEASE_NAME)
+        .filter(Q(holder=holder) | Q(expires__lt=now))
+        .update(holder=holder, expires=expires)
+    )
+    if updated:
+        return True
+    try:
+        with transaction.atomic():
+            SchedulerLease.objects.create(name=LEASE_NAME, holder=holder, expires=expires)
+    except IntegrityError:
+        return False  # ein anderer Prozess haelt die Lease
+    return True
+
+
+def renew_lease():
+    """Verlängert die Lease innerhalb eines Jobs; False = Lease verloren, Job abbrechen.
+
+    Ohne Lease (``run_scheduler --run``, Tests) immer True.
+    """
+    if _lease is None:
+        return True
+    holder, ttl = _lease
+    return acquire_lease(holder, ttl)
+
+
+def release_lease(holder):
+    from .models import SchedulerLease
+    SchedulerLease.objects.filter(name=LEASE_NAME, holder=holder).delete()
+
+
+def run_due(now=None, only=None):
+    """Fuehrt alle faelligen Jobs aus (nur als Leader aufrufen); gibt {Name: Ergebnis} zurueck."""
+    from .models import ScheduledJob
+    now = now or timezone.now()
+    jobs = load_jobs()
+    state = {row.name: row for row in ScheduledJob.objects.filter(name__in=list(jobs))}
+    results = {}
+    for name, spec in jobs.items():
+        if only is not None and name not in only:
+            continue
+        row = state.get(name) or ScheduledJob(name=name)
+        if only is None and row.next_run and row.next_run > now:
+            continue
+        started = time.monotonic()
+        try:
+            result = spec.func(now)
+        except Exception as exc:
+            logger.exception('Job %s fehlgeschlagen', name)
+            row.last_error = f'{type(exc).__name__}: {exc}'
+            row.last_result = ''
+        else:
+            row.last_error = ''
+            row.last_result = str(result if result is not None else 'ok')[:200]
+            results[name] = result
+        row.last_run = now
+        row.last_duration = round(time.monotonic() - started, 3)
+        row.next_run = now + spec.interval
+        row.run_count += 1
+        row.save()
+    return results
+
+
+def run_forever(tick=None, ttl=None, stop=lambda: False, log=logger.info):
+    """Hauptschleife des Scheduler-Prozesses; endet, wenn ``stop()`` True liefert."""
+    from django.db import close_old_connections
+    tick = tick or getattr(settings, 'SCHEDULER_TICK', 30)
+    ttl = timedelta(seconds=ttl or getattr(settings, 'SCHEDULER_LEASE_TTL', 90))
+    global _lease
+    holder = holder_id()
+    leader = False
+    try:
+        while not stop():
+            close_old_connections()
+            try:
+                is_leader = acquire_lease(holder, ttl)
+                if is_leader != leader:
+                    log(f'Scheduler {holder}: ' + ('Leader' if is_leader else 'Standby'))
+                    leader = is_leader
+                if leader:
+                    _lease = (holder, ttl)
+                    try:
+                        run_due()
+                    finally:
+                        _lease = None
+            except Exception:
+                logger.exception('Scheduler-Durchlauf fehlgeschlagen')
+            deadline = time.monotonic() + tick
+            while not stop() and time.monotonic() < deadline:
+                time.sleep(min(1.0, tick))
+    finally:
+        if leader:
+            release_lease(holder)
@@ -0,0 +1,178 @@
+"""
+Volltextsuche über Anmeldungen (Admin → Anmeldungen, Suchfeld).
+
+Die Standardsuche des Admins macht aus ``search_fields`` vier ``icontains``-
+Bedingungen und liest dafür jede Anmeldung aller Jahrgänge. Stattdessen:
+
+SQLite
+    FTS5-Tabelle ``courses_registration_fts`` (externer Inhalt: die
+    Anmeldungstabelle selbst) über Vorname, Nachname, E-Mail und Telefon.
+    Trigger auf ``courses_registration`` halten sie synchron – auch bei
+    ``bulk_create``/``update``. Jeder Suchbegriff wird Präfix-Suche
+    (``"mül"*``), Umlaute/Akzente werden ignoriert, sortiert nach bm25
+    (Namen zählen mehr als E-Mail und Telefon).
+
+PostgreSQL
+    GIN-Trigramm-Index (``pg_trgm``) auf dem zusammengesetzten, klein
+    geschriebenen Text; jeder Suchbegriff wird ``LIKE '%begriff%'`` über den
+    Index, sortiert nach ``word_similarity``.
+
+Tabelle, Trigger und Index legt ``install()`` nach jedem ``migrate`` an
+(post_migrate, siehe apps.py) – auch wenn eine spätere Migration die
+Anmeldungstabelle unter SQLite neu aufbaut und dabei die Trigger verwirft.
+Fehlt FTS5 bzw. pg_trgm, greift die normale Admin-Suche.
+"""
+
+import logging
+import re
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import CharField, FloatField
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'courses_registration'
+FTS_TABLE = 'courses_registration_fts'
+COLUMNS = ('first_name', 'last_name', 'email', 'phone')
+# bm25-Gewichte in Reihenfolge von COLUMNS
+WEIGHTS = (5.0, 5.0, 2.0, 1.0)
+TRIGRAM_INDEX = 'reg_search_trgm_idx'
+
+_WORD = re.compile(r'\w+')
+
+
+def document_sql(table=''):
+    """Durchsuchter Text (PostgreSQL); muss dem Ausdruck des Trigramm-Index entsprechen."""
+    prefix = f'{table}.' if table else ''
+    return 'lower(' + " || ' ' || ".join(prefix + column for column in COLUMNS) + ')'
+
+
+_SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {', '.join(COLUMNS)},
+        content='{TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + c for c in COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + c for c in COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {', '.join(COLUMNS)} ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + c for c in COLUMNS)});
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + c for c in COLUMNS)});
+    END""",
+]
+
+_POSTGRES_SCHEMA = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON {TABLE} USING gin (({document_sql()}) gin_trgm_ops)',
+]
+
+# Datenbank-Alias -> Suche verfuegbar? (je Prozess einmal geprueft)
+_available = {}
+
+
+def _sqlite_triggers(cursor):
+    cursor.execute(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s AND name LIKE %s",
+        [TABLE, f'{FTS_TABLE}_%'],
+    )
+    return cursor.fetchone()[0]
+
+
+def install(using='default', **kwargs):
+    """Legt Suchtabelle/-index an (idempotent); post_migrate-Empfänger."""
+    connection = connections[using]
+    _available.pop(using, None)
+    if TABLE not in connection.introspection.table_names():
+        return False
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                complete = FTS_TABLE in connection.introspection.table_names() and _sqlite_triggers(cursor) == 3
+                if not complete:
+                    for statement in _SQLITE_SCHEMA:
+                        cursor.execute(statement)
+                    # Bestand (neu) einlesen, z. B. nach Neuaufbau der Tabelle
+                    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            elif connection.vendor == 'postgresql':
+                for statement in _POSTGRES_SCHEMA:
+                    cursor.execute(statement)
+            else:
+                return False
+    except DatabaseError as exc:
+        logger.warning('Volltextsuche nicht verfügbar (%s), Admin nutzt die Standardsuche.', exc)
+        return False
+    return True
+
+
+def rebuild(using='default'):
+    """FTS-Tabelle aus den Anmeldungen neu aufbauen (nur SQLite, z. B. nach Restore)."""
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and available(using):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def available(using='default'):
+    if using not in _available:
+        connection = connections[using]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'sqlite':
+                    _available[using] = (
+                        FTS_TABLE in connection.introspection.table_names(cursor)
+                        and _sqlite_triggers(cursor) == 3
+                    )
+                elif connection.vendor == 'postgresql':
+                    cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [TRIGRAM_INDEX])
+                    _available[using] = cursor.fetchone() is not None
+                else:
+                    _available[using] = False
+        except DatabaseError:
+            _available[using] = False
+    return _available[using]
+
+
+def terms(search_term):
+    """Suchbegriffe (Wörter); Sonderzeichen trennen wie im Index (anna@ex → anna, ex)."""
+    return _WORD.findall(search_term.lower())
+
+
+def search(queryset, search_term):
+    """Filtert Anmeldungen auf Treffer (alle Begriffe, als Präfix) und annotiert ``search_rank``.
+
+    ``search_term`` muss mindestens einen Begriff enthalten (siehe terms()).
+    """
+    words = terms(search_term)
+    table = connections[queryset.db].ops.quote_name(TABLE)
+    if connections[queryset.db].vendor == 'sqlite':
+        # Join statt Unterabfrage je Zeile: MATCH laeuft einmal, bm25 kommt aus
+        # demselben Durchlauf (negativ = besser, deshalb umgedreht)
+        match = ' '.join(f'"{word}"*' for word in words)
+        weights = ', '.join(str(w) for w in WEIGHTS)
+        return queryset.extra(
+            select={'search_rank': f'-bm25({FTS_TABLE}, {weights})'},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        )
+    document = document_sql(table)
+    queryset = queryset.alias(search_document=RawSQL(document, [], output_field=CharField()))
+    for word in words:
+        queryset = queryset.filter(search_document__contains=word)
+    return queryset.annotate(
+        search_rank=RawSQL(f'word_similarity(%s, {document})', [' '.join(words)], output_field=FloatField()),
+    )
+
+
+def is_ranked(queryset):
+    """Hat search() den Queryset erzeugt (``search_rank`` vorhanden)?"""
+    return 'search_rank' in queryset.query.annotations or 'search_rank' in queryset.query.extra_select
@@ -0,0 +1,62 @@
+"""
+``{% picture %}``: responsive Bilder aus ``manage.py build_images``.
+
+    {% load responsive_images %}
+    {% picture 'courses/img/kursplan.png' alt='Kursplan' sizes='(max-width: 992px) 100vw, 960px' class='img-fluid' %}
+
+Erzeugt ``<picture>`` mit AVIF- und WebP-``<source>``, PNG-Fallback mit
+``srcset``, ``width``/``height`` (kein Layout-Springen) und
+``loading="lazy"``. Für Bilder im sichtbaren Bereich ``loading='eager'``
+übergeben. Ohne Build (Manifest fehlt) bleibt es beim bisherigen ``<img>``.
+"""
+
+import json
+import os
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+
+@lru_cache(maxsize=2)
+def _load(path, mtime):
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def _manifest():
+    path = os.path.join(settings.RESPONSIVE_IMAGES_DIR, 'manifest.json')
+    try:
+        return _load(path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return {}
+
+
+def _srcset(variants):
+    return ', '.join(f'{static(path)} {width}w' for width, path in variants)
+
+
+@register.simple_tag
+def picture(name, alt='', sizes='100vw', loading='lazy', **attrs):
+    entry = _manifest().get(name)
+    extra = format_html_join('', ' {}="{}"', ((key.rstrip('_').replace('_', '-'), value) for key, value in attrs.items()))
+    if entry is None:
+        return format_html('<img src="{}" alt="{}" loading="{}"{}>', static(name), alt, loading, extra)
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime, _srcset(entry['variants'][fmt]), sizes) for fmt, mime in _TYPES.items() if entry['variants'].get(fmt)),
+    )
+    fallback = entry['variants']['png']
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" '
+        'loading="{}" decoding="async"{}></picture>',
+        sources, static(fallback[-1][1]), _srcset(fallback), sizes,
+        entry['width'], entry['height'], alt, loading, extra,
+    )
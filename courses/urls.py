@@ -12,4 +12,6 @@ urlpatterns = [
     path('auth/login/', views.oidc_login, name='oidc_login'),
     path('auth/callback/', views.oidc_callback, name='oidc_callback'),
     path('api/sync-user/', views.clubauth_sync_user, name='clubauth_sync_user'),
+    path('api/sync-users/', views.clubauth_sync_users, name='clubauth_sync_users'),
+    path('api/metrics/', views.metrics_export, name='metrics'),
 ]
@@ -1,22 +1,25 @@
 import secrets as _secrets
 import urllib.parse as _urlparse
-import requests as _requests
 import hmac
+import uuid
 import json
-from django.shortcuts import render, get_object_or_404, redirect
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
+from kursanmeldung import metrics
+from . import admission, clubauth
+from .ratelimit import ratelimit
 from .models import Course, Registration
 from django.utils.translation import gettext_lazy as _
 from .forms import RegistrationForm
 from allauth.account.adapter import DefaultAccountAdapter
 from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, transaction
 from django.contrib import messages
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from django.core.mail import get_connection
 from django.conf import settings as django_settings
-from django.urls import reverse
 
 
 class NoSignupAdapter(DefaultAccountAdapter):
@@ -25,47 +28,42 @@ class NoSignupAdapter(DefaultAccountAdapter):
         return False
 
 
-def _send_confirmation_email(request, registration):
-    """Bestaetigung per E-Mail mit Storno-Link an den Anmelder senden."""
-    cancel_url = request.build_absolute_uri(
-        reverse('course_cancel', args=[registration.cancel_token])
-    )
-    days = ', '.join(registration.course.days)
-    locations = ', '.join(loc.name for loc in registration.course.locations.all())
-
-    ical_url = request.build_absolute_uri(
-        reverse('course_ical', args=[registration.course.id])
-    ) if registration.status == 'CONFIRMED' else None
-
-    subject = render_to_string(
-        'courses/email/confirmation_subject.txt',
-        {'registration': registration}
-    ).strip()
-    body = render_to_string(
-        'courses/email/confirmation_body.txt',
-        {'registration': registration, 'cancel_url': cancel_url,
-         'days': days, 'locations': locations, 'ical_url': ical_url}
-    )
-    send_mail(
-        subject=subject,
-        message=body,
-        from_email=django_settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[registration.email],
-        fail_silently=True,
+def _build_confirmation_email(request, registration):
+    """Baut die Bestaetigungsmail mit Storno-Link fuer den Anmelder."""
+    from . import emails
+    message, = emails.build_messages(
+        'confirmation', [registration], site_url=request.build_absolute_uri('/'),
     )
+    return message
+
+
+async def _asend_messages(email_messages):
+    """Versendet E-Mails aus einer async View, ohne den Event-Loop zu blockieren.
+
+    Backends mit eigener Async-Variante (GraphEmailBackend) werden direkt
+    awaited, alle anderen laufen in einem Thread.
+    """
+    connection = get_connection(fail_silently=True)
+    if hasattr(connection, 'asend_messages'):
+        return await connection.asend_messages(email_messages)
+    return await sync_to_async(connection.send_messages, thread_sensitive=False)(email_messages)
 
 
 # frontend views
 
-def course_list(request):
+async def course_list(request):
     from datetime import date
-    from django.db.models import Q
+    from django.db.models import Count, Q
     today = date.today()
 
+    # Belegung, Orte und Einheiten vorab laden: Das Template fragt pro Kurs
+    # is_full, free_spots, locations und session_dates ab.
     courses = (
         Course.objects
         .filter(end_date__gte=today)
         .filter(Q(publish_from__isnull=True) | Q(publish_from__lte=today))
+        .annotate(confirmed_count=Count('registration', filter=Q(registration__status='CONFIRMED')))
+        .prefetch_related('locations', 'sessions')
         .order_by('start_date')
     )
 
@@ -73,11 +71,13 @@ def course_list(request):
     day_filter  = request.GET.get('day', '')
     type_filter = request.GET.get('type', '')
     if day_filter:
-        courses = courses.filter(days__contains=day_filter)
+        courses = courses.on_weekday(day_filter)
     if type_filter:
         courses = courses.filter(course_type=type_filter)
+    courses = [course async for course in courses]
 
-    return render(request, 'courses/course_list.html', {
+    # render() laeuft im Thread: Context-Prozessoren laden Session und User synchron
+    return await sync_to_async(render)(request, 'courses/course_list.html', {
         'courses': courses,
         'day_filter': day_filter,
         'type_filter': type_filter,
@@ -89,9 +89,67 @@ def course_list(request):
     })
 
 
-def register(request, course_id):
+def _submission_key(value):
+    """Idempotenz-Schluessel aus dem Formular als UUID, oder None."""
+    try:
+        return uuid.UUID(value) if value else None
+    except ValueError:
+        return None
+
+
+def _save_registration(request, form, course):
+    """Validiert und speichert eine Anmeldung (synchroner Teil von register).
+
+    Gibt (Anmeldung, Bestaetigungsmail) zurueck, oder (None, None) wenn das
+    Formular erneut angezeigt werden muss. Ist die Anmeldung zu diesem
+    Formular bereits parallel angelegt worden, kommt (Anmeldung, None) zurueck.
+    """
+    if not form.is_valid():
+        return None, None
+    with transaction.atomic():
+        # Kurszeile sperren: Parallele Anmeldungen fuer denselben Kurs laufen
+        # nacheinander durch die Platzpruefung, sonst koennen zwei Worker den
+        # letzten Platz gleichzeitig vergeben (PostgreSQL; SQLite serialisiert
+        # Schreiber ohnehin per BEGIN IMMEDIATE).
+        locked_course = Course.objects.select_for_update().get(pk=course.pk)
+        reg = form.save(commit=False)
+        reg.course = course
+        reg.terms_accepted = True
+        reg.submission_key = form.cleaned_data.get('submission_key')
+        if locked_course.is_full():
+            reg.status = 'WAITLIST'
+        try:
+            with transaction.atomic():
+                reg.save()
+        except IntegrityError:
+            # Doppel-Anmeldung: der Unique-Constraint auf aktive (Kurs, E-Mail)
+            # bzw. den Formular-Schluessel hat gegriffen – ohne Vorab-Query
+            if reg.submission_key:
+                original = Registration.objects.filter(submission_key=reg.submission_key).first()
+                if original is not None:
+                    return original, None
+            messages.error(request, _("Mit dieser E-Mail-Adresse besteht bereits eine Anmeldung für diesen Kurs."))
+            return None, None
+    return reg, _build_confirmation_email(request, reg)
+
+
+@ratelimit('register')
+async def register(request, course_id):
     from datetime import date
-    course = get_object_or_404(Course, id=course_id)
+
+    if request.method == 'POST':
+        # Erneut abgeschicktes Formular (Doppelklick, Reload nach langsamer
+        # Antwort): urspruengliches Ergebnis zeigen, nichts neu anlegen/mailen
+        key = _submission_key(request.POST.get('submission_key'))
+        if key:
+            original = await (
+                Registration.objects.filter(course_id=course_id, submission_key=key)
+                .only('cancel_token').afirst()
+            )
+            if original is not None:
+                return redirect('course_confirmation', token=original.cancel_token)
+
+    course = await aget_object_or_404(Course, id=course_id)
 
     # Anmeldung manuell gesperrt
     if course.is_closed:
@@ -99,37 +157,67 @@ def register(request, course_id):
         return redirect('course_list')
 
     # Automatische Sperre: Kurs hat bereits begonnen (nur wenn aktiviert)
-    if course.close_on_start and course.start_date and course.start_date <= date.today():
+    if course.closed_by_start:
         messages.error(request, _("Die Anmeldung für diesen Kurs ist nicht mehr möglich, da der Kurs bereits begonnen hat."))
         return redirect('course_list')
 
+    # Warteraum beim Anmeldestart (siehe courses/admission.py)
+    ticket = token = None
+    if admission.enabled():
+        ticket = admission.admitted_ticket(request, course.id)
+        if ticket is None:
+            if request.method == 'POST':
+                messages.warning(request, _("Ihre Zeit für die Anmeldung ist abgelaufen. Bitte versuchen Sie es erneut."))
+                return redirect('course_register', course_id=course.id)
+            ticket = admission.new_ticket(request, course.id)
+            status = await sync_to_async(admission.get_store().enter, thread_sensitive=False)(course.id, ticket)
+            if not status.admitted:
+                return await _waiting_room(request, course, ticket, status)
+            token = admission.issue_token(course.id, ticket)
+
     if request.method == 'POST':
         form = RegistrationForm(request.POST, course=course)
-        if form.is_valid():
-            email = form.cleaned_data['email']
-            # Doppel-Anmeldung verhindern (ignoriere stornierte)
-            if Registration.objects.filter(course=course, email__iexact=email).exclude(status='CANCELLED').exists():
-                messages.error(request, _("Mit dieser E-Mail-Adresse besteht bereits eine Anmeldung für diesen Kurs."))
-                return render(request, 'courses/register.html', {'course': course, 'form': form})
-            reg = form.save(commit=False)
-            reg.course = course
-            reg.terms_accepted = True
-            if course.is_full():
-                reg.status = 'WAITLIST'
-            reg.save()
-            _send_confirmation_email(request, reg)
-            return redirect('course_confirmation', token=reg.cancel_token)
+        reg, email_message = await sync_to_async(_save_registration)(request, form, course)
+        if reg is not None:
+            if email_message is not None:
+                await _asend_messages([email_message])
+            response = redirect('course_confirmation', token=reg.cancel_token)
+            if ticket is not None:
+                await sync_to_async(admission.get_store().release, thread_sensitive=False)(course.id, ticket)
+                admission.clear_cookies(response, course.id, request.path)
+            return response
     else:
         form = RegistrationForm(course=course)
-    return render(request, 'courses/register.html', {'course': course, 'form': form})
+    response = await sync_to_async(render)(request, 'courses/register.html', {'course': course, 'form': form})
+    if token is not None:
+        admission.set_cookies(response, course.id, ticket, request.path, token)
+    return response
 
 
-def course_confirmation(request, token):
+async def _waiting_room(request, course, ticket, status):
+    """Warteraum-Seite mit Position; laedt sich per Refresh-Header selbst neu."""
+    poll = admission.poll_interval()
+    response = await sync_to_async(render)(request, 'courses/waiting_room.html', {
+        'course': course,
+        'status': status,
+        'eta_minutes': (status.eta + 59) // 60,
+        'poll': poll,
+    })
+    response['Refresh'] = str(poll)
+    response['Cache-Control'] = 'no-store'
+    return admission.set_cookies(response, course.id, ticket, request.path)
+
+
+async def course_confirmation(request, token):
     """Bestaetigung nach erfolgreicher Anmeldung."""
-    registration = get_object_or_404(Registration, cancel_token=token)
-    return render(request, 'courses/confirmation.html', {'registration': registration})
+    registration = await aget_object_or_404(
+        Registration.objects.select_related('course').prefetch_related('course__locations'),
+        cancel_token=token,
+    )
+    return await sync_to_async(render)(request, 'courses/confirmation.html', {'registration': registration})
 
 
+@ratelimit('cancel')
 def course_cancel(request, token):
     """Storno-Seite: setzt Status auf CANCELLED statt Loeschen.
     Stornierung ist nur bis 48 Stunden vor Kursbeginn möglich."""
@@ -159,12 +247,14 @@ def course_cancel(request, token):
     return render(request, 'courses/cancel_confirm.html', {'registration': registration})
 
 
-def course_ical(request, course_id):
+async def course_ical(request, course_id):
     """Gibt eine .ics-Datei mit allen Kurseinheiten zum Kalender-Import zurueck."""
     from datetime import datetime, timezone as dt_tz
     import icalendar
 
-    course = get_object_or_404(Course, id=course_id)
+    course = await aget_object_or_404(
+        Course.objects.prefetch_related('locations', 'sessions'), id=course_id,
+    )
     cal = icalendar.Calendar()
     cal.add('prodid', '-//Kursanmeldung//DE')
     cal.add('version', '2.0')
@@ -209,16 +299,64 @@ def impressum(request):
 # Interner Webhook: User-Sync von ClubAuth
 # ---------------------------------------------------------------------------
 
+SYNC_ACTIONS = ('upsert', 'remove', 'delete')
+
+
+def _internal_api_authorized(request):
+    """Prüft den INTERNAL_API_KEY im Authorization-Header (Bearer)."""
+    expected_key = getattr(django_settings, 'INTERNAL_API_KEY', '')
+    auth_header  = request.META.get('HTTP_AUTHORIZATION', '')
+    token        = auth_header.removeprefix('Bearer ').strip()
+    return bool(expected_key) and hmac.compare_digest(token, expected_key)
+
+
+def _apply_sync_operations(operations):
+    """Wendet Sync-Operationen von ClubAuth gesammelt an.
+
+    Pro E-Mail zählt die letzte Operation im Batch. Gibt pro Operation ein
+    Ergebnis-Dict zurück (gleiche Reihenfolge wie die Eingabe).
+    """
+    # Einmal je Operation normalisieren: (E-Mail oder None, Aktion)
+    normalized = []
+    for op in operations:
+        email = op.get('email') if isinstance(op, dict) else None
+        if isinstance(email, str) and email.strip():
+            normalized.append((email.lower().strip(), op.get('action', 'upsert')))
+        else:
+            normalized.append((None, None))
+
+    last_op = {}
+    for index, (email, action) in enumerate(normalized):
+        if email and action in SYNC_ACTIONS:
+            last_op[email] = index
+
+    winners = [(normalized[i], operations[i]) for i in last_op.values()]
+    plan = clubauth.UserSyncPlan(
+        [{**op, 'email': email} for (email, action), op in winners if action == 'upsert'],
+        removals=[email for (email, action), _op in winners if action == 'remove'],
+        deletions=[email for (email, action), _op in winners if action == 'delete'],
+    )
+    plan.apply()
+
+    results = []
+    for index, (email, action) in enumerate(normalized):
+        if email is None:
+            results.append({'status': 'error', 'error': 'Missing email'})
+        elif action not in SYNC_ACTIONS:
+            results.append({'status': 'error', 'email': email, 'error': 'Unknown action'})
+        elif last_op[email] != index:
+            results.append({'status': 'superseded', 'email': email})
+        else:
+            results.append({'status': plan.results[email], 'email': email})
+    return results
+
+
 @csrf_exempt
 @require_POST
 def clubauth_sync_user(request):
     """Empfängt eine User-Anlage/-Aktualisierung von ClubAuth.
     Gesichert via INTERNAL_API_KEY im Authorization-Header."""
-    expected_key = getattr(django_settings, 'INTERNAL_API_KEY', '')
-    auth_header  = request.META.get('HTTP_AUTHORIZATION', '')
-    token        = auth_header.removeprefix('Bearer ').strip()
-
-    if not expected_key or not hmac.compare_digest(token, expected_key):
+    if not _internal_api_authorized(request):
         return JsonResponse({'error': 'Unauthorized'}, status=401)
 
     try:
@@ -291,6 +429,45 @@ def clubauth_sync_user(request):
     return JsonResponse({'status': 'created' if created else 'updated', 'email': email})
 
 
+@csrf_exempt
+@require_POST
+def clubauth_sync_users(request):
+    """Batch-Variante des Sync-Webhooks für komplette Replays von ClubAuth.
+
+    Erwartet {"operations": [{"action": ..., "email": ..., ...}, ...]} und
+    wendet alle Operationen in einer Transaktion mit Bulk-Queries an.
+    Antwortet mit einem Ergebnis pro Operation; unveränderte User werden
+    nicht geschrieben, Replays sind damit billig.
+    """
+    if not _internal_api_authorized(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+    try:
+        payload = json.loads(request.body)
+    except (ValueError, KeyError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    operations = payload.get('operations') if isinstance(payload, dict) else payload
+    if not isinstance(operations, list):
+        return JsonResponse({'error': 'Missing operations'}, status=400)
+
+    return JsonResponse({'results': _apply_sync_operations(operations)})
+
+
+# ---------------------------------------------------------------------------
+# Interner Endpoint: Prometheus-Metriken
+# ---------------------------------------------------------------------------
+
+def metrics_export(request):
+    """Prometheus-Scrape-Endpoint (Text-Format), gesichert via INTERNAL_API_KEY."""
+    if not _internal_api_authorized(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+    if not metrics.enabled():
+        return JsonResponse({'error': 'Metriken deaktiviert (METRICS=False)'}, status=404)
+    body, content_type = metrics.render_latest()
+    return HttpResponse(body, content_type=content_type)
+
+
 # ---------------------------------------------------------------------------
 # OIDC-Integration mit ClubAuth
 # ---------------------------------------------------------------------------
@@ -325,16 +502,15 @@ def oidc_login(request):
     return redirect(f'{base_url}/o/authorize/?{params}')
 
 
-def oidc_callback(request):
+async def oidc_callback(request):
     """Empfängt den OIDC-Callback, legt den Django-User an und loggt ihn ein."""
-    from django.contrib.auth.models import User, Group
-    from django.contrib.auth import login as auth_login
+    from django.contrib.auth import alogin
 
     # State-Validierung (verhindert CSRF-Angriffe auf den OAuth-Flow)
     # WICHTIG: Bei Fehler auf die Startseite leiten, NICHT auf /admin/login/,
     # da das erneut den OIDC-Flow auslöst und eine Redirect-Schleife erzeugt.
     state = request.GET.get('state')
-    if not state or state != request.session.pop('oidc_state', None):
+    if not state or state != await request.session.apop('oidc_state', None):
         messages.error(request, 'Anmeldung fehlgeschlagen – bitte erneut versuchen.')
         return redirect('course_list')
 
@@ -343,33 +519,9 @@ def oidc_callback(request):
         messages.error(request, 'Kein Authentifizierungscode erhalten.')
         return redirect('course_list')
 
-    # OIDC_INTERNAL_URL: interne Adresse für Server-zu-Server-Anfragen (z.B. http://127.0.0.1:8010)
-    # Fällt auf OIDC_BASE_URL zurück wenn nicht gesetzt.
-    internal_url = getattr(django_settings, 'OIDC_INTERNAL_URL',
-                           getattr(django_settings, 'OIDC_BASE_URL', '')).rstrip('/')
     try:
-        token_resp = _requests.post(
-            f'{internal_url}/o/token/',
-            data={
-                'grant_type': 'authorization_code',
-                'code': code,
-                'redirect_uri': getattr(django_settings, 'OIDC_REDIRECT_URI', ''),
-                'client_id': getattr(django_settings, 'OIDC_CLIENT_ID', ''),
-                'client_secret': getattr(django_settings, 'OIDC_CLIENT_SECRET', ''),
-            },
-            timeout=10,
-        )
-        token_resp.raise_for_status()
-        access_token = token_resp.json().get('access_token', '')
-
-        userinfo_resp = _requests.get(
-            f'{internal_url}/o/userinfo/',
-            headers={'Authorization': f'Bearer {access_token}'},
-            timeout=10,
-        )
-        userinfo_resp.raise_for_status()
-        userinfo = userinfo_resp.json()
-    except (_requests.RequestException, ValueError) as e:
+        userinfo = await clubauth.exchange_code(code)
+    except clubauth.ClubAuthError:
         messages.error(request, 'Fehler bei der Verbindung zum Authentifizierungsserver.')
         return redirect('course_list')
     email = userinfo.get('email', '').lower().strip()
@@ -386,52 +538,13 @@ def oidc_callback(request):
     first_name = parts[0] if parts else ''
     last_name = parts[1] if len(parts) > 1 else ''
 
-    # Django-User suchen oder neu anlegen.
-    # Reihenfolge: 1) username=email (Sync-Konvention), 2) email-Suche, 3) anlegen.
-    # So werden Duplikate (manuell angelegte User mit anderem username) sicher gefunden.
-    try:
-        user = User.objects.get(username=email)
-    except User.DoesNotExist:
-        users_by_email = User.objects.filter(email__iexact=email)
-        if users_by_email.exists():
-            # Bevorzuge den mit username=email, sonst den ältesten
-            user = users_by_email.filter(username=email).first() \
-                   or users_by_email.order_by('date_joined').first()
-        else:
-            user = User.objects.create_user(
-                username=email,
-                email=email,
-                first_name=first_name,
-                last_name=last_name,
-            )
-
-    # Zugriffsrechte setzen
-    user.is_staff = True
-    user.is_active = True
-    # 'admin'-Rolle bekommt Superuser-Status (voller Zugriff)
-    user.is_superuser = (ka_role == 'admin')
-    if first_name:
-        user.first_name = first_name
-    if last_name:
-        user.last_name = last_name
-    user.save(update_fields=['is_staff', 'is_active', 'is_superuser', 'first_name', 'last_name'])
-
-    # Gruppen synchronisieren — immer vollständig setzen/entfernen
-    kursleitung_group, _ = Group.objects.get_or_create(name='Kursleitung')
-    kassierer_group, _   = Group.objects.get_or_create(name='Kassierer')
-
-    if ka_role == 'kursleitung':
-        user.groups.add(kursleitung_group)
-        user.groups.remove(kassierer_group)
-    elif ka_role == 'kassierer':
-        user.groups.add(kassierer_group)
-        user.groups.remove(kursleitung_group)
-    else:
-        # 'admin' und 'verwaltung': keine einschränkende Gruppe nötig
-        user.groups.remove(kursleitung_group)
-        user.groups.remove(kassierer_group)
+    # 'admin'-Rolle bekommt Superuser-Status (voller Zugriff);
+    # 'admin' und 'verwaltung' bekommen keine einschränkende Gruppe.
+    user = await sync_to_async(clubauth.upsert_staff_user)(
+        email, first_name, last_name, ka_role, is_superuser=(ka_role == 'admin'),
+    )
 
-    auth_login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+    await alogin(request, user, backend='django.contrib.auth.backends.ModelBackend')
 
-    next_url = request.session.pop('oidc_next', '/admin/')
+    next_url = await request.session.apop('oidc_next', '/admin/')
     return redirect(next_url)
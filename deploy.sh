@@ -14,6 +14,9 @@ pip install -r requirements.txt --quiet
 echo "==> Datenbankmigrationen ausführen..."
 python manage.py migrate --noinput
 
+echo "==> Bildvarianten erzeugen..."
+python manage.py build_images
+
 echo "==> Static files sammeln..."
 python manage.py collectstatic --noinput
 
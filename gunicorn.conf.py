@@ -0,0 +1,24 @@
+"""
+Gunicorn-Hooks (wird automatisch aus dem Arbeitsverzeichnis geladen).
+
+Nur relevant für Prometheus-Metriken mit mehreren Workern
+(PROMETHEUS_MULTIPROC_DIR gesetzt, siehe kursanmeldung/metrics.py).
+"""
+
+import os
+import shutil
+
+
+def on_starting(server):
+    """Alte mmap-Dateien vom letzten Lauf entfernen, sonst zählen Zähler weiter."""
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Gauges eines beendeten Workers aufräumen (Zähler/Histogramme bleiben erhalten)."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
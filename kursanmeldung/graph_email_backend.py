@@ -10,17 +10,34 @@ Benötigte .env-Einstellungen:
 
 Benötigte API-Berechtigung in der Azure App-Registrierung:
     Graph API → Application permissions → Mail.Send
+
+Neben dem synchronen ``send_messages`` gibt es ``asend_messages`` für async
+Views (ASGI-Betrieb): Der Versand läuft dann über httpx, ohne den Event-Loop
+bzw. einen Worker zu blockieren.
 """
 
+import time
+
+import httpx
 import requests
 from django.conf import settings
 from django.core.mail.backends.base import BaseEmailBackend
 
+from kursanmeldung import instrumentation, metrics
+
+TOKEN_URL = 'https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token'
+SEND_MAIL_URL = 'https://graph.microsoft.com/v1.0/users/{sender}/sendMail'
+
+# Access-Token pro Prozess zwischenspeichern (gültig ca. 60 Minuten),
+# damit nicht jede Mail einen zusätzlichen Roundtrip zu Azure kostet.
+_token_cache = {'token': '', 'expires_at': 0.0}
+
 
 class GraphEmailBackend(BaseEmailBackend):
     """Sendet E-Mails über Microsoft Graph API mit App-only-Authentifizierung."""
 
-    def _get_access_token(self) -> str:
+    def _token_request(self):
+        """Gibt (URL, Formulardaten) für den client-credentials-Token-Abruf zurück."""
         tenant_id     = getattr(settings, 'MS_TENANT_ID', '')
         client_id     = getattr(settings, 'MS_CLIENT_ID', '')
         client_secret = getattr(settings, 'MS_CLIENT_SECRET', '')
@@ -30,29 +47,100 @@ class GraphEmailBackend(BaseEmailBackend):
                 'Microsoft Graph nicht konfiguriert. '
                 'MS_TENANT_ID, MS_CLIENT_ID und MS_CLIENT_SECRET in .env setzen.'
             )
-
-        resp = requests.post(
-            f'https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token',
-            data={
-                'grant_type':    'client_credentials',
-                'client_id':     client_id,
-                'client_secret': client_secret,
-                'scope':         'https://graph.microsoft.com/.default',
-            },
-            timeout=10,
-        )
-        resp.raise_for_status()
-        token = resp.json().get('access_token', '')
+        return TOKEN_URL.format(tenant_id=tenant_id), {
+            'grant_type':    'client_credentials',
+            'client_id':     client_id,
+            'client_secret': client_secret,
+            'scope':         'https://graph.microsoft.com/.default',
+        }
+
+    @staticmethod
+    def _cached_token() -> str:
+        if _token_cache['token'] and _token_cache['expires_at'] > time.monotonic():
+            return _token_cache['token']
+        return ''
+
+    @staticmethod
+    def _store_token(data, text) -> str:
+        token = data.get('access_token', '')
         if not token:
-            raise RuntimeError(f'Kein Access-Token erhalten: {resp.text}')
+            raise RuntimeError(f'Kein Access-Token erhalten: {text}')
+        # 60 Sekunden Puffer, damit kein Token kurz vor Ablauf verwendet wird
+        _token_cache['token'] = token
+        _token_cache['expires_at'] = time.monotonic() + int(data.get('expires_in', 0)) - 60
         return token
 
+    def _get_access_token(self) -> str:
+        token = self._cached_token()
+        if token:
+            return token
+        url, data = self._token_request()
+        resp = requests.post(url, data=data, timeout=10, hooks=instrumentation.requests_hooks('graph'))
+        resp.raise_for_status()
+        return self._store_token(resp.json(), resp.text)
+
+    async def _aget_access_token(self, client) -> str:
+        token = self._cached_token()
+        if token:
+            return token
+        url, data = self._token_request()
+        resp = await client.post(url, data=data, timeout=10)
+        resp.raise_for_status()
+        return self._store_token(resp.json(), resp.text)
+
+    @staticmethod
+    def _build_payload(msg) -> dict:
+        content_type = 'HTML' if getattr(msg, 'content_subtype', 'plain') == 'html' else 'Text'
+
+        payload = {
+            'message': {
+                'subject': msg.subject,
+                'body': {
+                    'contentType': content_type,
+                    'content': msg.body,
+                },
+                'toRecipients': [
+                    {'emailAddress': {'address': addr}} for addr in msg.to
+                ],
+            },
+            'saveToSentItems': False,
+        }
+
+        if msg.cc:
+            payload['message']['ccRecipients'] = [
+                {'emailAddress': {'address': addr}} for addr in msg.cc
+            ]
+        if msg.bcc:
+            payload['message']['bccRecipients'] = [
+                {'emailAddress': {'address': addr}} for addr in msg.bcc
+            ]
+        return payload
+
+    @staticmethod
+    def _sender() -> str:
+        return getattr(settings, 'MS_SENDER', getattr(settings, 'DEFAULT_FROM_EMAIL', ''))
+
+    def _check_response(self, resp) -> bool:
+        if resp.status_code == 202:
+            return True
+        if not self.fail_silently:
+            raise RuntimeError(
+                f'Graph API Fehler {resp.status_code}: {resp.text}'
+            )
+        return False
+
     def send_messages(self, email_messages) -> int:
         if not email_messages:
             return 0
+        started = time.monotonic()
+        sent = 0
+        try:
+            sent = self._send_messages(email_messages)
+        finally:
+            metrics.observe_email('graph', sent, len(email_messages) - sent, time.monotonic() - started)
+        return sent
 
-        sender = getattr(settings, 'MS_SENDER', getattr(settings, 'DEFAULT_FROM_EMAIL', ''))
-
+    def _send_messages(self, email_messages) -> int:
         try:
             token = self._get_access_token()
         except Exception as exc:
@@ -60,52 +148,63 @@ class GraphEmailBackend(BaseEmailBackend):
                 raise
             return 0
 
+        url = SEND_MAIL_URL.format(sender=self._sender())
         sent = 0
-        for msg in email_messages:
-            content_type = 'HTML' if getattr(msg, 'content_subtype', 'plain') == 'html' else 'Text'
-
-            payload = {
-                'message': {
-                    'subject': msg.subject,
-                    'body': {
-                        'contentType': content_type,
-                        'content': msg.body,
-                    },
-                    'toRecipients': [
-                        {'emailAddress': {'address': addr}} for addr in msg.to
-                    ],
-                },
-                'saveToSentItems': False,
-            }
-
-            if msg.cc:
-                payload['message']['ccRecipients'] = [
-                    {'emailAddress': {'address': addr}} for addr in msg.cc
-                ]
-            if msg.bcc:
-                payload['message']['bccRecipients'] = [
-                    {'emailAddress': {'address': addr}} for addr in msg.bcc
-                ]
+        # Eine Session für alle Mails: Keep-Alive statt neuer TLS-Verbindung pro Nachricht
+        with requests.Session() as session:
+            session.hooks = instrumentation.requests_hooks('graph')
+            for msg in email_messages:
+                try:
+                    resp = session.post(
+                        url,
+                        json=self._build_payload(msg),
+                        headers={'Authorization': f'Bearer {token}'},
+                        timeout=15,
+                    )
+                    if self._check_response(resp):
+                        sent += 1
+                except Exception:
+                    if not self.fail_silently:
+                        raise
+
+        return sent
 
+    async def asend_messages(self, email_messages) -> int:
+        """Async-Variante von send_messages() für async Views."""
+        if not email_messages:
+            return 0
+        started = time.monotonic()
+        sent = 0
+        try:
+            sent = await self._asend_messages(email_messages)
+        finally:
+            metrics.observe_email('graph', sent, len(email_messages) - sent, time.monotonic() - started)
+        return sent
+
+    async def _asend_messages(self, email_messages) -> int:
+        url = SEND_MAIL_URL.format(sender=self._sender())
+        sent = 0
+        async with httpx.AsyncClient(
+            timeout=15, event_hooks=instrumentation.httpx_event_hooks('graph', is_async=True),
+        ) as client:
             try:
-                resp = requests.post(
-                    f'https://graph.microsoft.com/v1.0/users/{sender}/sendMail',
-                    json=payload,
-                    headers={
-                        'Authorization': f'Bearer {token}',
-                        'Content-Type': 'application/json',
-                    },
-                    timeout=15,
-                )
-                if resp.status_code == 202:
-                    sent += 1
-                else:
-                    if not self.fail_silently:
-                        raise RuntimeError(
-                            f'Graph API Fehler {resp.status_code}: {resp.text}'
-                        )
+                token = await self._aget_access_token(client)
             except Exception:
                 if not self.fail_silently:
                     raise
+                return 0
+
+            for msg in email_messages:
+                try:
+                    resp = await client.post(
+                        url,
+                        json=self._build_payload(msg),
+                        headers={'Authorization': f'Bearer {token}'},
+                    )
+                    if self._check_response(resp):
+                        sent += 1
+                except Exception:
+                    if not self.fail_silently:
+                        raise
 
         return sent
@@ -0,0 +1,299 @@
+"""
+Per-Request-Messung: SQL-Queries, DB-Zeit, doppelte Queries, Template-Rendering
+und ausgehende HTTP-Aufrufe (Graph, ClubAuth).
+
+Aktivierung per .env (ohne Flag meldet sich die Middleware per
+MiddlewareNotUsed ab und kostet nichts):
+    INSTRUMENTATION=True
+
+Die Werte landen als ``Server-Timing``-Header in der Antwort (sichtbar in den
+Browser-Devtools unter "Timing") und als JSON-Logzeile im Logger
+``kursanmeldung.instrumentation``.
+
+Stichproben-Profiling (unabhängig von INSTRUMENTATION):
+    PROFILE_SAMPLE_RATE=0.01      # 1 % der Requests profilieren
+    PROFILER=cprofile             # oder: pyinstrument (falls installiert)
+    PROFILE_DIR=/var/tmp/kursanmeldung-profiles
+
+Es läuft höchstens ein Profiler je Prozess: Überlappt ein gezogener Request mit
+einem bereits profilierten (ASGI: alle Requests im selben Event-Loop-Thread),
+wird er normal ohne Profil beantwortet.
+
+Die HTTP-Hooks (``httpx_event_hooks``/``requests_hooks``) sind immer aktiv und
+speisen zusätzlich ``kursanmeldung.metrics``.
+
+Die Messwerte hängen an einer ContextVar – sie folgen dem Request auch durch
+async Views und sync_to_async-Threads.
+"""
+
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from kursanmeldung.metrics import observe_http
+
+logger = logging.getLogger('kursanmeldung.instrumentation')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_hooks_installed = False
+# Nur ein Profiler gleichzeitig (cProfile/pyinstrument lehnen einen zweiten ab)
+_profiling = threading.Lock()
+
+
+class RequestMetrics:
+    """Sammelt die Messwerte eines Requests."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.sql_seen = Counter()
+        self.template_time = 0.0
+        self.http = defaultdict(lambda: [0, 0.0])  # Dienst -> [Aufrufe, Sekunden]
+
+    def add_query(self, sql, params, seconds):
+        self.queries += 1
+        self.db_time += seconds
+        self.sql_seen[(sql, str(params))] += 1
+
+    @property
+    def duplicate_queries(self):
+        return sum(count - 1 for count in self.sql_seen.values() if count > 1)
+
+    def server_timing(self, total):
+        parts = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries, {self.duplicate_queries} dup"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+        ]
+        for service, (calls, seconds) in sorted(self.http.items()):
+            parts.append(f'http-{service};dur={seconds * 1000:.1f};desc="{calls}x"')
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+    def as_dict(self, total):
+        return {
+            'queries': self.queries,
+            'duplicate_queries': self.duplicate_queries,
+            'db_ms': round(self.db_time * 1000, 1),
+            'template_ms': round(self.template_time * 1000, 1),
+            'http': {s: {'calls': c, 'ms': round(t * 1000, 1)} for s, (c, t) in self.http.items()},
+            'total_ms': round(total * 1000, 1),
+        }
+
+
+# ── Erfassung ─────────────────────────────────────────────────────────────────
+
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, params, time.perf_counter() - started)
+
+
+def _install_execute_wrapper(connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def record_http(service, seconds):
+    """Verbucht einen ausgehenden HTTP-Aufruf beim laufenden Request (falls gemessen)
+    und in den Prometheus-Metriken (falls aktiviert)."""
+    observe_http(service, seconds)
+    metrics = _current.get()
+    if metrics is not None:
+        calls = metrics.http[service]
+        calls[0] += 1
+        calls[1] += seconds
+
+
+def httpx_event_hooks(service, is_async=False):
+    """event_hooks für httpx.Client/AsyncClient, die die Dauer jedes Aufrufs verbuchen."""
+    def on_request(request):
+        request.extensions['instrumentation_started'] = time.perf_counter()
+
+    def on_response(response):
+        started = response.request.extensions.get('instrumentation_started')
+        if started is not None:
+            record_http(service, time.perf_counter() - started)
+
+    if not is_async:
+        return {'request': [on_request], 'response': [on_response]}
+
+    async def aon_request(request):
+        on_request(request)
+
+    async def aon_response(response):
+        on_response(response)
+
+    return {'request': [aon_request], 'response': [aon_response]}
+
+
+def requests_hooks(service):
+    """hooks für requests.post()/Session, die die Dauer jedes Aufrufs verbuchen."""
+    def on_response(response, *args, **kwargs):
+        record_http(service, response.elapsed.total_seconds())
+    return {'response': [on_response]}
+
+
+def _install_hooks():
+    """Einmalig: DB-Wrapper auf allen (auch künftigen) Verbindungen, Template-Timing."""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    from django.template.backends.django import Template
+
+    connection_created.connect(_install_execute_wrapper, dispatch_uid='instrumentation')
+    for connection in connections.all(initialized_only=True):
+        _install_execute_wrapper(connection)
+
+    original_render = Template.render
+
+    def timed_render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return original_render(self, context, request)
+        started = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+    Template.render = timed_render
+    _hooks_installed = True
+
+
+# ── Profiling ─────────────────────────────────────────────────────────────────
+
+class _Profiler:
+    """cProfile oder pyinstrument für einen einzelnen Request; schreibt nach PROFILE_DIR.
+
+    Hält während der Messung ``_profiling``; der Aufrufer hat die Sperre bereits.
+    """
+
+    def __init__(self, request, kind, directory):
+        self.request = request
+        self.kind = kind
+        self.directory = Path(directory)
+        self.profiler = None
+
+    def __enter__(self):
+        try:
+            if self.kind == 'pyinstrument':
+                from pyinstrument import Profiler
+                profiler = Profiler(async_mode='enabled')
+                profiler.start()
+            else:
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+        except Exception as exc:  # z. B. anderes Profiling-Werkzeug aktiv
+            _profiling.release()
+            logger.warning('Profiling übersprungen: %s', exc)
+            return self
+        self.profiler = profiler
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is None:
+            return False
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            slug = self.request.path.strip('/').replace('/', '_') or 'root'
+            base = self.directory / (
+                f'{time.strftime("%Y%m%d-%H%M%S")}-{self.request.method}-{slug}-{uuid.uuid4().hex[:8]}'
+            )
+            if self.kind == 'pyinstrument':
+                self.profiler.stop()
+                base.with_suffix('.html').write_text(self.profiler.output_html(), encoding='utf-8')
+            else:
+                self.profiler.disable()
+                self.profiler.dump_stats(base.with_suffix('.prof'))
+        finally:
+            _profiling.release()
+        return False
+
+
+# ── Middleware ────────────────────────────────────────────────────────────────
+
+class InstrumentationMiddleware:
+    """Misst jeden Request und gibt die Werte als Server-Timing-Header und Logzeile aus."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.enabled = getattr(settings, 'INSTRUMENTATION', False)
+        self.sample_rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0.0)
+        if not (self.enabled or self.sample_rate):
+            raise MiddlewareNotUsed
+        self.profiler = getattr(settings, 'PROFILER', 'cprofile')
+        self.profile_dir = getattr(settings, 'PROFILE_DIR', '')
+        self.get_response = get_response
+        if self.enabled:
+            _install_hooks()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _profiler(self, request):
+        if self.sample_rate and random.random() < self.sample_rate and _profiling.acquire(blocking=False):
+            return _Profiler(request, self.profiler, self.profile_dir)
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics() if self.enabled else None
+        token = _current.set(metrics)
+        try:
+            profiler = self._profiler(request)
+            if profiler:
+                with profiler:
+                    response = self.get_response(request)
+            else:
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics() if self.enabled else None
+        token = _current.set(metrics)
+        try:
+            profiler = self._profiler(request)
+            if profiler:
+                with profiler:
+                    response = await self.get_response(request)
+            else:
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics)
+
+    def _finish(self, request, response, metrics):
+        if metrics is None:
+            return response
+        total = time.perf_counter() - metrics.started
+        response['Server-Timing'] = metrics.server_timing(total)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **metrics.as_dict(total),
+        }))
+        return response
@@ -0,0 +1,188 @@
+"""
+Prometheus-Metriken: Request-Latenz je View, Anmeldungen je Kurs/Status,
+Wartelisten, Nachrück-Vorgänge, Mailversand und OIDC-/HTTP-Laufzeiten.
+
+Aktivierung per .env:
+    METRICS=True
+    PROMETHEUS_MULTIPROC_DIR=/var/tmp/kursanmeldung-metrics   # bei mehreren Gunicorn-Workern
+
+Mit PROMETHEUS_MULTIPROC_DIR schreibt jeder Worker seine Zähler in
+mmap-Dateien in diesem Verzeichnis; der Scrape-Endpoint fasst alle Worker
+zusammen (``gunicorn.conf.py`` leert das Verzeichnis beim Start und räumt
+beendete Worker auf). Ohne das Verzeichnis zählt jeder Prozess für sich
+(runserver, Tests).
+
+Anmeldungen und Wartelisten werden nicht mitgezählt, sondern beim Scrape mit
+einer einzigen Aggregat-Query aus der Datenbank gelesen – das ist immer
+konsistent und kostet im Anmelde-Pfad nichts.
+
+Endpoint: GET /api/metrics/ mit ``Authorization: Bearer <INTERNAL_API_KEY>``.
+Ist prometheus_client nicht installiert, sind alle Funktionen hier No-ops.
+"""
+
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+try:
+    from prometheus_client import Counter, Histogram
+except ImportError:  # optionale Abhängigkeit
+    Counter = Histogram = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Label "method": beliebige Verben vom Client wuerden unbegrenzt Zeitreihen anlegen
+HTTP_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'})
+
+if Counter is not None:
+    REQUEST_LATENCY = Histogram(
+        'kursanmeldung_request_duration_seconds', 'Antwortzeit je View',
+        ['view', 'method'], buckets=LATENCY_BUCKETS,
+    )
+    PROMOTIONS = Counter(
+        'kursanmeldung_waitlist_promotions_total', 'Nachrücker von der Warteliste',
+        ['source'],
+    )
+    EMAILS = Counter(
+        'kursanmeldung_emails_total', 'Versandversuche je Backend und Ergebnis',
+        ['backend', 'result'],
+    )
+    EMAIL_LATENCY = Histogram(
+        'kursanmeldung_email_send_duration_seconds', 'Dauer eines Mailversand-Aufrufs',
+        ['backend'], buckets=LATENCY_BUCKETS,
+    )
+    HTTP_LATENCY = Histogram(
+        'kursanmeldung_outbound_http_duration_seconds', 'Dauer ausgehender HTTP-Aufrufe',
+        ['service'], buckets=LATENCY_BUCKETS,
+    )
+    OIDC_LATENCY = Histogram(
+        'kursanmeldung_oidc_exchange_duration_seconds',
+        'OIDC-Code-Tausch inkl. Token-Prüfung bzw. Userinfo',
+        ['result'], buckets=LATENCY_BUCKETS,
+    )
+
+
+def enabled():
+    return Counter is not None and getattr(settings, 'METRICS', False)
+
+
+# ── Erfassung (No-op, wenn deaktiviert) ──────────────────────────────────────
+
+def observe_request(view, method, seconds):
+    if enabled():
+        REQUEST_LATENCY.labels(view, method if method in HTTP_METHODS else 'other').observe(seconds)
+
+
+def inc_promotions(source, count=1):
+    if enabled() and count:
+        PROMOTIONS.labels(source).inc(count)
+
+
+def observe_email(backend, sent, failed, seconds):
+    if enabled():
+        if sent:
+            EMAILS.labels(backend, 'sent').inc(sent)
+        if failed:
+            EMAILS.labels(backend, 'failed').inc(failed)
+        EMAIL_LATENCY.labels(backend).observe(seconds)
+
+
+def observe_http(service, seconds):
+    if enabled():
+        HTTP_LATENCY.labels(service).observe(seconds)
+
+
+def observe_oidc(result, seconds):
+    if enabled():
+        OIDC_LATENCY.labels(result).observe(seconds)
+
+
+# ── Scrape ────────────────────────────────────────────────────────────────────
+
+class RegistrationCollector:
+    """Liest Anmeldungen je Kurs/Status aus der DB (nur laufende und kommende Kurse)."""
+
+    def collect(self):
+        from datetime import date
+
+        from django.db.models import Count, Q
+        from prometheus_client.core import GaugeMetricFamily
+
+        from courses.models import Registration
+
+        registrations = GaugeMetricFamily(
+            'kursanmeldung_registrations', 'Anmeldungen je Kurs und Status',
+            labels=['course_id', 'course', 'status'],
+        )
+        waitlist = GaugeMetricFamily(
+            'kursanmeldung_waitlist_length', 'Länge der Warteliste je Kurs',
+            labels=['course_id', 'course'],
+        )
+        rows = (
+            Registration.objects
+            .filter(Q(course__end_date__isnull=True) | Q(course__end_date__gte=date.today()))
+            .values('course_id', 'course__name', 'status')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            course_id, name = str(row['course_id']), row['course__name']
+            registrations.add_metric([course_id, name, row['status']], row['n'])
+            if row['status'] == 'WAITLIST':
+                waitlist.add_metric([course_id, name], row['n'])
+        yield registrations
+        yield waitlist
+
+
+def render_latest():
+    """Gibt (Inhalt, Content-Type) für den Scrape-Endpoint zurück."""
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    db_registry = CollectorRegistry(auto_describe=False)
+    db_registry.register(RegistrationCollector())
+    return generate_latest(registry) + generate_latest(db_registry), CONTENT_TYPE_LATEST
+
+
+# ── Middleware ────────────────────────────────────────────────────────────────
+
+class MetricsMiddleware:
+    """Misst die Antwortzeit je View (Label = URL-Name, nicht der Pfad)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _observe(request, started):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else '') or 'unmatched'
+        observe_request(view, request.method, time.perf_counter() - started)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, started)
+        return response
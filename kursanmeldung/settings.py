@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 from pathlib import Path
 from decouple import config, Csv
 
+from kursanmeldung.database import postgres_database, sqlite_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -66,6 +68,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Opt-in (INSTRUMENTATION / PROFILE_SAMPLE_RATE), sonst inaktiv – siehe kursanmeldung/instrumentation.py
+    'kursanmeldung.instrumentation.InstrumentationMiddleware',
+    # Opt-in (METRICS), Prometheus-Latenz je View – siehe kursanmeldung/metrics.py
+    'kursanmeldung.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -78,6 +84,36 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
+# Request-Messung (Server-Timing-Header + JSON-Log) und Stichproben-Profiling
+INSTRUMENTATION = config('INSTRUMENTATION', default=False, cast=bool)
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0.0, cast=float)
+PROFILER = config('PROFILER', default='cprofile')
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+
+# Prometheus-Metriken unter /api/metrics/ (INTERNAL_API_KEY); bei mehreren
+# Workern zusätzlich PROMETHEUS_MULTIPROC_DIR als Umgebungsvariable setzen
+METRICS = config('METRICS', default=False, cast=bool)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'kursanmeldung.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'courses.scheduler': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'kursanmeldung.urls'
 
 TEMPLATES = [
@@ -101,18 +137,72 @@ WSGI_APPLICATION = 'kursanmeldung.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-        'OPTIONS': {
-            # Verhindert "database is locked"-Fehler bei gleichzeitigen Requests
-            # (z.B. ClubAuth-Sync-Webhook parallel zum OIDC-Callback)
-            'timeout': 20,
-        },
+# Ohne DATABASE_URL: SQLite, Profil siehe kursanmeldung/database.py
+# (WAL, BEGIN IMMEDIATE, Pragmas). Mit DATABASE_URL: PostgreSQL.
+DATABASE_URL = config('DATABASE_URL', default='')
+DB_PROFILE = config('DB_PROFILE', default='production')
+if DATABASE_URL:
+    DATABASES = {
+        'default': postgres_database(
+            DATABASE_URL,
+            pool=config('DB_POOL', default=False, cast=bool),
+            pool_max_size=config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            conn_max_age=config('CONN_MAX_AGE', default=60, cast=int),
+        ),
+    }
+else:
+    DATABASES = {
+        'default': sqlite_database(BASE_DIR / 'db.sqlite3', profile=DB_PROFILE),
     }
+
+
+# Cache
+# "ratelimit" haelt die Token-Buckets aus courses/ratelimit.py. locmem zaehlt
+# pro Worker-Prozess (bei 4 Workern also 4 x die Rate); "file" teilt die Buckets
+# zwischen allen Gunicorn-Workern. In Produktion "sqlite" verwenden: eigene
+# Datei (RATELIMIT_SQLITE), atomar und ohne die Haupt-Datenbank zu belasten;
+# der Cache "ratelimit" bleibt dann ungenutzt.
+RATELIMIT_STORE = config('RATELIMIT_STORE', default='locmem')
+RATELIMIT_SQLITE = config('RATELIMIT_SQLITE', default=str(BASE_DIR / '.cache' / 'ratelimit.sqlite3'))
+_RATELIMIT_CACHES = {
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ratelimit'},
+    'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+             'LOCATION': config('RATELIMIT_CACHE_DIR', default=str(BASE_DIR / '.cache' / 'ratelimit'))},
+}
+_RATELIMIT_CACHES['sqlite'] = _RATELIMIT_CACHES['locmem']
+CACHES = {
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ratelimit'},
+    'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+             'LOCATION': config('RATELIMIT_CACHE_DIR', default=str(BASE_DIR / '.cache' / 'ratelimit'))},
+    'db': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'ratelimit_cache'},
+}
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'ratelimit': _RATELIMIT_CACHES[RATELIMIT_STORE],
+}
+
+RATELIMIT_ENABLED = config('RATELIMIT_ENABLED', default=True, cast=bool)
+# Pro Endpoint: Schluessel ("ip", "email") -> Rate, siehe courses/ratelimit.py
+RATELIMIT_POLICIES = {
+    'register': {'ip': '10/m', 'email': '5/10m'},
+    'cancel': {'ip': '20/m'},
 }
 
+# Warteraum beim Anmeldestart, siehe courses/admission.py
+ADMISSION_ENABLED = config('ADMISSION_ENABLED', default=False, cast=bool)
+ADMISSION_SLOTS = config('ADMISSION_SLOTS', default=25, cast=int)  # gleichzeitige Formulare je Kurs
+ADMISSION_TTL = config('ADMISSION_TTL', default=900, cast=int)  # Sekunden zum Ausfuellen
+ADMISSION_POLL = config('ADMISSION_POLL', default=5, cast=int)
+ADMISSION_SESSION_ESTIMATE = config('ADMISSION_SESSION_ESTIMATE', default=180, cast=int)
+ADMISSION_STORE = config('ADMISSION_STORE', default=str(BASE_DIR / '.cache' / 'admission.sqlite3'))
+
+# Hintergrund-Jobs (python manage.py run_scheduler), siehe courses/scheduler.py
+SCHEDULER_TICK = config('SCHEDULER_TICK', default=30, cast=int)  # Sekunden zwischen Durchlaeufen
+SCHEDULER_LEASE_TTL = config('SCHEDULER_LEASE_TTL', default=90, cast=int)  # Leader-Uebernahme nach Ausfall
+
+# Bankleitzahl -> BIC (python manage.py import_bic_table), siehe courses/iban.py
+BIC_TABLE = config('BIC_TABLE', default=str(BASE_DIR / 'data' / 'bic_table.bin'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -175,6 +265,13 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = 'bootstrap5'
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# Gehashte Dateinamen + .gz/.br-Varianten beim collectstatic (kursanmeldung/storage.py)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'kursanmeldung.storage.CompressedManifestStaticFilesStorage'},
+}
+# Ausgabe von manage.py build_images (AVIF/WebP/PNG-Varianten + manifest.json)
+RESPONSIVE_IMAGES_DIR = BASE_DIR / 'static' / 'courses' / 'img' / 'responsive'
 
 # E-Mail-Konfiguration
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
@@ -184,6 +281,16 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@westfalia-osterwick.de')
+# Postausgang (EMAIL_BACKEND=courses.outbox.OutboxBackend): Zustellung per Scheduler-Job
+OUTBOX_DELIVERY_BACKEND = config(
+    'OUTBOX_DELIVERY_BACKEND',
+    default=EMAIL_BACKEND if EMAIL_BACKEND != 'courses.outbox.OutboxBackend'
+    else 'django.core.mail.backends.console.EmailBackend',
+)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+OUTBOX_RETENTION_DAYS = config('OUTBOX_RETENTION_DAYS', default=30, cast=int)
+# Erinnerung X Tage vor der ersten Einheit (0 = aus), siehe courses/notifications.py
+SESSION_REMINDER_DAYS = config('SESSION_REMINDER_DAYS', default=2, cast=int)
 
 # Microsoft Graph API (App-Registrierung) für E-Mail-Versand
 MS_TENANT_ID     = config('MS_TENANT_ID', default='')
@@ -199,4 +306,7 @@ OIDC_INTERNAL_URL  = config('OIDC_INTERNAL_URL', default='')   # interne URL (f
 OIDC_CLIENT_ID     = config('OIDC_CLIENT_ID', default='')
 OIDC_CLIENT_SECRET = config('OIDC_CLIENT_SECRET', default='')
 OIDC_REDIRECT_URI  = config('OIDC_REDIRECT_URI', default='')
+# ID-Token per JWKS prüfen; enthält es E-Mail + Rollen, entfällt der Userinfo-Aufruf
+OIDC_VALIDATE_ID_TOKEN = config('OIDC_VALIDATE_ID_TOKEN', default=False, cast=bool)
+OIDC_ISSUER        = config('OIDC_ISSUER', default='')         # erwarteter "iss"-Claim, leer = nicht prüfen
 INTERNAL_API_KEY   = config('INTERNAL_API_KEY', default='')    # geteilter Key für ClubAuth app-users API
@@ -0,0 +1,82 @@
+"""
+Static-Files-Storage: Dateinamen mit Inhalts-Hash plus vorkomprimierte Varianten.
+
+``collectstatic`` schreibt jede Datei zusätzlich als ``name.<hash>.ext``
+(Manifest: ``staticfiles/staticfiles.json``), ``{% static %}`` liefert den
+gehashten Namen. Weil sich der Name mit jeder Änderung ändert, darf Nginx
+diese Dateien ein Jahr lang als ``immutable`` ausliefern – der Browser fragt
+bei Folgebesuchen gar nicht mehr nach (kein 304-Roundtrip).
+
+Für komprimierbare Dateien (CSS, JS, SVG, ...) entstehen beim Sammeln
+außerdem ``.gz`` und – falls das Paket ``brotli`` installiert ist – ``.br``.
+Nginx liefert sie per ``gzip_static``/``brotli_static`` direkt aus, statt
+bei jedem Request neu zu komprimieren (siehe nginx.conf).
+
+Ohne ``collectstatic`` (Entwicklung, Tests) fehlt das Manifest; dann
+liefert ``{% static %}`` den ungehashten Namen statt eines Fehlers.
+"""
+
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+COMPRESSIBLE = {'.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.ttf', '.otf'}
+# Kleine Dateien passen ohnehin in ein TCP-Paket
+MIN_SIZE = 512
+# Variante nur behalten, wenn sie mindestens 5 % kleiner ist
+MAX_RATIO = 0.95
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compress_file(path):
+    """Schreibt ``path.gz`` (und ``path.br``) neben die Datei, gibt die Endungen zurück."""
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    if len(data) < MIN_SIZE:
+        return []
+    variants = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    brotli = _brotli()
+    if brotli is not None:
+        variants.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+    written = []
+    for suffix, compress in variants:
+        compressed = compress(data)
+        target = path + suffix
+        if len(compressed) <= len(data) * MAX_RATIO:
+            with open(target, 'wb') as fh:
+                fh.write(compressed)
+            written.append(suffix)
+        elif os.path.exists(target):
+            os.remove(target)  # veraltete Variante würde sonst ausgeliefert
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                processed_names.update(n for n in (name, hashed_name) if n)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(processed_names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE and self.exists(name):
+                compress_file(self.path(name))
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if self.hashed_files:
+                raise  # Manifest vorhanden, Datei fehlt wirklich
+            return name